@@ -0,0 +1,571 @@
+"""
+Cliente HTTP compartido para APITube.io
+
+Mantiene una única sesión por proceso con pool de conexiones keep-alive,
+cabeceras de autenticación precalculadas y reintentos con backoff para
+respuestas 5xx. Los 429 no se reintentan: los gestiona el limitador de
+llamadas (rate_limit.py), que bloquea hasta el Retry-After en lugar de
+dormir la petición. Expone estadísticas del pool para poder dimensionarlo.
+
+Incluye también una variante asíncrona (solo biblioteca estándar) cuyo pool
+vive en un bucle de eventos propio del proceso, de modo que las vistas async
+de Flask, que crean un bucle por petición, comparten las mismas conexiones.
+
+Con APITUBE_FIXTURES_MODE=record o replay ambos clientes graban las
+respuestas en APITUBE_FIXTURES_PATH o las reproducen desde ahí sin red
+(news_fixtures).
+"""
+
+import asyncio
+import json
+import os
+import ssl
+import threading
+import time
+import logging
+from urllib.parse import urlencode, urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.poolmanager import PoolManager
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+from news_fixtures import FixtureAdapter, FixtureArchive, FixtureNotFound, REPLAY
+
+logger = logging.getLogger(__name__)
+
+# Estados HTTP que merecen un reintento (errores del servidor; los 429 los gestiona rate_limit)
+RETRY_STATUSES = (500, 502, 503, 504)
+
+
+class PoolStats:
+    """
+    Contadores del pool de conexiones, compartidos entre hilos
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.acquired = 0
+        self.released = 0
+        self.waited = 0
+        self.overflow = 0
+
+    def record(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def snapshot(self, idle=0):
+        with self._lock:
+            in_use = max(self.acquired - self.released, 0)
+            return {
+                'open': in_use + idle,
+                'in_use': in_use,
+                'idle': idle,
+                'opened': self.opened,
+                'reused': max(self.acquired - self.opened, 0),
+                'waited': self.waited,
+                'overflow': self.overflow,
+            }
+
+
+class _InstrumentedPoolMixin:
+    """
+    Añade contadores a los pools de urllib3 sin cambiar su comportamiento
+    """
+
+    stats = None
+
+    def _new_conn(self):
+        if self.stats is not None:
+            self.stats.record('opened')
+        return super()._new_conn()
+
+    def _get_conn(self, timeout=None):
+        if self.stats is not None:
+            # Si la cola está vacía todas las conexiones están en uso:
+            # en modo bloqueante toca esperar, si no se abre una extra
+            if self.pool is not None and self.pool.empty():
+                self.stats.record('waited' if self.block else 'overflow')
+            self.stats.record('acquired')
+        return super()._get_conn(timeout)
+
+    def _put_conn(self, conn):
+        if self.stats is not None:
+            self.stats.record('released')
+        return super()._put_conn(conn)
+
+    def idle_connections(self):
+        if self.pool is None:
+            return 0
+        return sum(1 for conn in list(self.pool.queue) if conn is not None)
+
+
+class _InstrumentedHTTPConnectionPool(_InstrumentedPoolMixin, HTTPConnectionPool):
+    pass
+
+
+class _InstrumentedHTTPSConnectionPool(_InstrumentedPoolMixin, HTTPSConnectionPool):
+    pass
+
+
+class _InstrumentedPoolManager(PoolManager):
+    def __init__(self, *args, stats=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = stats
+        # Copia propia: el diccionario por defecto es global en urllib3
+        self.pool_classes_by_scheme = {
+            'http': _InstrumentedHTTPConnectionPool,
+            'https': _InstrumentedHTTPSConnectionPool,
+        }
+
+    def _new_pool(self, scheme, host, port, request_context=None):
+        pool = super()._new_pool(scheme, host, port, request_context)
+        pool.stats = self.stats
+        return pool
+
+    def idle_connections(self):
+        with self.pools.lock:
+            pools = list(self.pools._container.values())
+        return sum(pool.idle_connections() for pool in pools)
+
+
+class _InstrumentedAdapter(HTTPAdapter):
+    def __init__(self, stats, **kwargs):
+        self.stats = stats
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        self._pool_connections = connections
+        self._pool_maxsize = maxsize
+        self._pool_block = block
+        self.poolmanager = _InstrumentedPoolManager(
+            num_pools=connections,
+            maxsize=maxsize,
+            block=block,
+            stats=self.stats,
+            **pool_kwargs
+        )
+
+
+class APITubeClient:
+    """
+    Cliente reutilizable para todas las llamadas a APITube.io
+    """
+
+    def __init__(self, api_key=None, pool_connections=4, pool_maxsize=20,
+                 pool_block=False, max_retries=2, backoff_factor=0.3, fixtures=None):
+        self.api_key = api_key
+        self.stats = PoolStats()
+        self.fixtures = fixtures
+
+        retry = Retry(
+            total=max_retries,
+            connect=max_retries,
+            read=max_retries,
+            status=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset(['GET']),
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        self.adapter = _InstrumentedAdapter(
+            self.stats,
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+            max_retries=retry
+        )
+
+        self.session = requests.Session()
+        # Con un archivo de fixtures (news_fixtures.FixtureArchive), grabar o reproducir delante del pool
+        transport = FixtureAdapter(fixtures, self.adapter) if fixtures is not None else self.adapter
+        self.session.mount('https://', transport)
+        self.session.mount('http://', transport)
+
+        # Cabeceras de autenticación construidas una sola vez
+        self.session.headers.update({
+            'Content-Type': 'application/json',
+            'Connection': 'keep-alive'
+        })
+        if api_key:
+            self.session.headers['X-API-Key'] = api_key
+
+    def get(self, url, params=None, timeout=15, **kwargs):
+        """
+        Realiza un GET reutilizando las conexiones del pool
+        """
+        return self.session.get(url, params=params, timeout=timeout, **kwargs)
+
+    def pool_stats(self):
+        """
+        Estado actual del pool: conexiones abiertas, reutilizadas y esperas
+        """
+        return self.stats.snapshot(idle=self.adapter.poolmanager.idle_connections())
+
+    def close(self):
+        self.session.close()
+
+
+def _env_bool(name, default):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+_fixtures = None
+_fixtures_lock = threading.Lock()
+
+
+def get_fixtures():
+    """
+    Archivo de respuestas grabadas según APITUBE_FIXTURES_*, compartido por ambos clientes, o None
+
+    APITUBE_FIXTURES_MODE: record (graba) o replay (reproduce sin red).
+    APITUBE_FIXTURES_LATENCY: 0 responde al momento, 1 con la latencia grabada.
+    """
+    global _fixtures
+    mode = os.environ.get('APITUBE_FIXTURES_MODE', '').strip().lower()
+    if not mode:
+        return None
+    if _fixtures is None:
+        with _fixtures_lock:
+            if _fixtures is None:
+                _fixtures = FixtureArchive(
+                    os.environ.get('APITUBE_FIXTURES_PATH', 'apitube_fixtures.jsonl.gz'),
+                    mode,
+                    latency=float(os.environ.get('APITUBE_FIXTURES_LATENCY', 0))
+                )
+                logger.info(f"Respuestas de APITube.io en modo {mode} ({_fixtures.path})")
+    return _fixtures
+
+
+def client_from_env(api_key=None):
+    """
+    Crea un cliente usando la configuración de las variables de entorno
+    """
+    return APITubeClient(
+        api_key=api_key if api_key is not None else os.environ.get('APITUBE_API_KEY'),
+        pool_connections=int(os.environ.get('APITUBE_POOL_CONNECTIONS', 4)),
+        pool_maxsize=int(os.environ.get('APITUBE_POOL_MAXSIZE', 20)),
+        pool_block=_env_bool('APITUBE_POOL_BLOCK', False),
+        max_retries=int(os.environ.get('APITUBE_MAX_RETRIES', 2)),
+        backoff_factor=float(os.environ.get('APITUBE_BACKOFF_FACTOR', 0.3)),
+        fixtures=get_fixtures()
+    )
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """
+    Devuelve el cliente compartido del proceso, creándolo la primera vez
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = client_from_env()
+                logger.info("Cliente APITube.io inicializado con pool de conexiones")
+    return _client
+
+
+class AsyncHTTPError(Exception):
+    """
+    Error de la ruta asíncrona (conexión, protocolo o estado HTTP >= 400)
+    """
+
+    def __init__(self, message, response=None):
+        super().__init__(message)
+        self.response = response
+
+
+class AsyncTimeoutError(AsyncHTTPError):
+    pass
+
+
+class AsyncResponse:
+    """
+    Respuesta HTTP ya leída por completo, con la interfaz básica de requests
+    """
+
+    def __init__(self, url, status_code, headers, content):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', errors='replace')
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise AsyncHTTPError(f"{self.status_code} Error para la URL: {self.url}", response=self)
+
+
+class AsyncConnectionPool:
+    """
+    Pool de conexiones HTTP/1.1 keep-alive sobre asyncio; usar desde un único bucle
+    """
+
+    def __init__(self, max_connections=100, max_keepalive=20):
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        self._slots = None
+        self._idle = {}
+        self._ssl_context = None
+        self.opened = 0
+        self.reused = 0
+        self.waited = 0
+        self.in_use = 0
+
+    async def acquire(self, scheme, host, port):
+        """
+        Devuelve (reader, writer, reutilizada) respetando el máximo de conexiones
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_connections)
+        if self._slots.locked():
+            self.waited += 1
+        await self._slots.acquire()
+        self.in_use += 1
+        try:
+            idle = self._idle.get((scheme, host, port))
+            while idle:
+                reader, writer = idle.pop()
+                if not reader.at_eof() and not writer.is_closing():
+                    self.reused += 1
+                    return reader, writer, True
+                writer.close()
+            if scheme == 'https' and self._ssl_context is None:
+                self._ssl_context = ssl.create_default_context()
+            reader, writer = await asyncio.open_connection(
+                host, port, ssl=self._ssl_context if scheme == 'https' else None
+            )
+            self.opened += 1
+            return reader, writer, False
+        except BaseException:
+            self._release_slot()
+            raise
+
+    def release(self, scheme, host, port, reader, writer, reusable):
+        idle = self._idle.setdefault((scheme, host, port), [])
+        if reusable and len(idle) < self.max_keepalive and not writer.is_closing():
+            idle.append((reader, writer))
+        else:
+            writer.close()
+        self._release_slot()
+
+    def _release_slot(self):
+        self.in_use -= 1
+        self._slots.release()
+
+    def stats(self):
+        idle = sum(len(conns) for conns in self._idle.values())
+        return {
+            'open': self.in_use + idle,
+            'in_use': self.in_use,
+            'idle': idle,
+            'opened': self.opened,
+            'reused': self.reused,
+            'waited': self.waited,
+        }
+
+    def close(self):
+        for conns in self._idle.values():
+            for _, writer in conns:
+                writer.close()
+        self._idle.clear()
+
+
+async def _read_response_body(reader, headers):
+    """
+    Lee el cuerpo según Content-Length o Transfer-Encoding: chunked
+    """
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        chunks = []
+        while True:
+            size_line = await reader.readline()
+            size = int(size_line.split(b';', 1)[0].strip(), 16)
+            if size == 0:
+                # Saltar posibles trailers hasta la línea vacía
+                while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    pass
+                return b''.join(chunks), True
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+    if 'content-length' in headers:
+        return await reader.readexactly(int(headers['content-length'])), True
+    # Sin longitud conocida: leer hasta que el servidor cierre
+    return await reader.read(), False
+
+
+class AsyncAPITubeClient:
+    """
+    Cliente asíncrono con pool de conexiones keep-alive; usar desde un único bucle
+    """
+
+    def __init__(self, api_key=None, max_connections=100, max_keepalive=20,
+                 max_retries=2, backoff_factor=0.3, fixtures=None):
+        self.pool = AsyncConnectionPool(max_connections, max_keepalive)
+        self.fixtures = fixtures
+        # Cabeceras de autenticación construidas una sola vez
+        headers = 'Content-Type: application/json\r\nConnection: keep-alive\r\n'
+        if api_key:
+            headers += f'X-API-Key: {api_key}\r\n'
+        self._headers = headers
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.requests = 0
+        self.retries = 0
+
+    async def get(self, url, params=None, timeout=15):
+        """
+        GET con reintentos y backoff para respuestas 5xx y errores de conexión
+        """
+        if params:
+            url = f"{url}{'&' if '?' in url else '?'}{urlencode(params)}"
+        fixtures = self.fixtures
+        if fixtures is None:
+            return await self._get(url, timeout)
+        if fixtures.mode == REPLAY:
+            try:
+                status, headers, body, delay = fixtures.lookup(url)
+            except FixtureNotFound as e:
+                raise AsyncHTTPError(str(e)) from e
+            if delay:
+                await asyncio.sleep(delay)
+            return AsyncResponse(url, status, {name.lower(): value for name, value in headers.items()}, body)
+        start = time.perf_counter()
+        response = await self._get(url, timeout)
+        fixtures.record(url, response.status_code, response.headers, response.content, time.perf_counter() - start)
+        return response
+
+    async def _get(self, url, timeout):
+        attempt = 0
+        while True:
+            self.requests += 1
+            try:
+                response = await asyncio.wait_for(self._request(url), timeout)
+            except asyncio.TimeoutError:
+                raise AsyncTimeoutError(f"Timeout tras {timeout}s: {url}") from None
+            except (OSError, asyncio.IncompleteReadError, ValueError) as e:
+                if attempt >= self.max_retries:
+                    raise AsyncHTTPError(f"Error de conexión con {url}: {e}") from e
+                response = None
+            if response is not None and (response.status_code not in RETRY_STATUSES
+                                         or attempt >= self.max_retries):
+                return response
+            delay = self.backoff_factor * (2 ** attempt)
+            retry_after = response.headers.get('retry-after', '') if response is not None else ''
+            if retry_after.isdigit():
+                delay = max(delay, int(retry_after))
+            attempt += 1
+            self.retries += 1
+            await asyncio.sleep(delay)
+
+    async def _request(self, url):
+        parts = urlsplit(url)
+        scheme = parts.scheme
+        host = parts.hostname
+        port = parts.port or (443 if scheme == 'https' else 80)
+        target = parts.path or '/'
+        if parts.query:
+            target += '?' + parts.query
+        request = f'GET {target} HTTP/1.1\r\nHost: {parts.netloc}\r\n{self._headers}\r\n'.encode('utf-8')
+
+        while True:
+            reader, writer, reused = await self.pool.acquire(scheme, host, port)
+            reusable = False
+            try:
+                writer.write(request)
+                status_line = await reader.readline()
+                if not status_line:
+                    raise asyncio.IncompleteReadError(b'', None)
+                status_code = int(status_line.split(None, 2)[1])
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                content, reusable = await _read_response_body(reader, headers)
+                if headers.get('connection', '').lower() == 'close':
+                    reusable = False
+                return AsyncResponse(url, status_code, headers, content)
+            except (OSError, asyncio.IncompleteReadError):
+                # Una conexión reutilizada pudo cerrarse en el servidor: reintentar con una nueva
+                if reused:
+                    continue
+                raise
+            finally:
+                self.pool.release(scheme, host, port, reader, writer, reusable)
+
+    def pool_stats(self):
+        stats = self.pool.stats()
+        stats.update({'requests': self.requests, 'retries': self.retries})
+        return stats
+
+    async def aclose(self):
+        self.pool.close()
+
+
+_async_loop = None
+_async_client = None
+_async_lock = threading.Lock()
+
+
+def _get_async_runtime():
+    """
+    Arranca (una vez) el bucle de eventos compartido y su cliente asíncrono
+    """
+    global _async_loop, _async_client
+    if _async_loop is None:
+        with _async_lock:
+            if _async_loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='apitube-async', daemon=True).start()
+                _async_client = asyncio.run_coroutine_threadsafe(
+                    _create_async_client(), loop
+                ).result()
+                _async_loop = loop
+                logger.info("Cliente asíncrono de APITube.io inicializado")
+    return _async_loop, _async_client
+
+
+async def _create_async_client():
+    return AsyncAPITubeClient(
+        api_key=os.environ.get('APITUBE_API_KEY'),
+        max_connections=int(os.environ.get('APITUBE_ASYNC_MAX_CONNECTIONS', 100)),
+        max_keepalive=int(os.environ.get('APITUBE_ASYNC_MAX_KEEPALIVE', 20)),
+        max_retries=int(os.environ.get('APITUBE_MAX_RETRIES', 2)),
+        backoff_factor=float(os.environ.get('APITUBE_BACKOFF_FACTOR', 0.3)),
+        fixtures=get_fixtures()
+    )
+
+
+async def async_get(url, params=None, timeout=15):
+    """
+    GET asíncrono sobre el pool compartido, desde cualquier bucle de eventos
+    """
+    loop, client = _get_async_runtime()
+    if asyncio.get_running_loop() is loop:
+        return await client.get(url, params=params, timeout=timeout)
+    future = asyncio.run_coroutine_threadsafe(client.get(url, params=params, timeout=timeout), loop)
+    return await asyncio.wrap_future(future)
+
+
+def async_pool_stats():
+    if _async_client is None:
+        return None
+    return _async_client.pool_stats()
@@ -1,25 +1,98 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, make_response, Response
+from flask.json.provider import DefaultJSONProvider
+from itsdangerous import URLSafeSerializer, BadSignature
+from markupsafe import Markup
 import requests
+import hashlib
+import math
 import os
+import time
+from contextlib import closing
+from itertools import chain
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime
+from functools import lru_cache
 import logging
 
+from apitube_client import get_client, get_fixtures, async_get, async_pool_stats, AsyncHTTPError, AsyncTimeoutError
+from news_cache import TTLCache, SingleFlight, FRESH, STALE, EXPIRED
+from cache_backends import make_backend
+from news_stream import iter_json_array, ArrayNotFound
+from news_warmer import FeedWarmer
+from article_store import ArticleStore, ArticleIngester
+from search_index import SearchIndex
+from news_clusters import collapse_duplicates
+from news_articles import ArticleColumns
+from news_compress import CompressedBodies, COMPRESSIBLE_TYPES, negotiate
+from news_lookups import lookups
+from rate_limit import UpstreamLimiter, RateLimitExceeded, make_store as make_rate_store
+from circuit_breaker import CircuitBreaker, CircuitOpenError, Hedger
+from news_metrics import MetricsRegistry, RequestMetricsMiddleware, FAST_BUCKETS
+from news_profiler import SamplingProfiler, ProfilerMiddleware, check_token as check_profile_token
+import news_json
+
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+
+class NewsJSONProvider(DefaultJSONProvider):
+    """
+    JSON de Flask (jsonify, request.get_json) sobre el backend de news_json
+
+    Los tipos que solo sabe convertir Flask (fechas, UUID...) y la salida
+    indentada en modo debug siguen pasando por el proveedor por defecto, igual
+    que dumps() con sort_keys o indent. Las claves salen en el orden de
+    inserción, como en los backends rápidos; con sort_keys = True se ordenan.
+    """
+
+    sort_keys = False
+
+    def dumps(self, obj, **kwargs):
+        if kwargs.get('sort_keys', self.sort_keys) or kwargs.get('indent') is not None:
+            return super().dumps(obj, **kwargs)
+        try:
+            return news_json.dumps(obj).decode('utf-8')
+        except TypeError:
+            return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        return news_json.loads(s)
+
+    def response(self, *args, **kwargs):
+        if (self.compact is None and self._app.debug) or self.compact is False or self.sort_keys:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        try:
+            body = news_json.dumps(obj)
+        except TypeError:
+            body = super().dumps(obj, separators=(',', ':')).encode('utf-8')
+        return self._app.response_class(body + b'\n', mimetype=self.mimetype)
+
+
 app = Flask(__name__)
+app.json = NewsJSONProvider(app)
 
 # Configuración más flexible para Vercel
 SECRET_KEY = os.environ.get('SECRET_KEY', 'fallback-secret-key-for-development')
 app.secret_key = SECRET_KEY
 
+# Cursores de paginación firmados (opacos para el cliente)
+cursor_serializer = URLSafeSerializer(SECRET_KEY, salt='news-cursor')
+
 # Configuración para APITube.io
 APITUBE_API_KEY = os.environ.get('APITUBE_API_KEY')
 APITUBE_BASE_URL = 'https://api.apitube.io/v1/news/everything'
 APITUBE_CATEGORIES_URL = 'https://api.apitube.io/v1/news/category'
 APITUBE_TOP_HEADLINES_URL = 'https://api.apitube.io/v1/news/top-headlines'
 
+# Vistas asíncronas para / y /api/news (requiere asgiref: pip install "Flask[async]")
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS', '').strip().lower() in ('1', 'true', 'yes', 'on')
+
+# Backend de la caché de noticias: memory, sqlite:///ruta.db o redis://host:6379/0
+NEWS_CACHE_BACKEND = os.environ.get('NEWS_CACHE_BACKEND', 'memory')
+
 # Configuración por defecto
 default_config = {
     'category': 'general',
@@ -29,25 +102,295 @@ default_config = {
     'sortBy': 'published_at'
 }
 
-def fetch_news(query=None, country=None, language='es', category=None, page_size=20):
+# Caché de resultados de noticias (segundos, entradas y bytes)
+NEWS_CACHE_TTL = int(os.environ.get('NEWS_CACHE_TTL', 300))
+NEWS_CACHE_SEARCH_TTL = int(os.environ.get('NEWS_CACHE_SEARCH_TTL', 120))
+NEWS_CACHE_MAX_ENTRIES = int(os.environ.get('NEWS_CACHE_MAX_ENTRIES', 256))
+NEWS_CACHE_MAX_BYTES = int(os.environ.get('NEWS_CACHE_MAX_BYTES', 16 * 1024 * 1024))
+# Ventana para servir obsoleto mientras se refresca, y para usarlo si el upstream falla
+NEWS_CACHE_STALE_TTL = int(os.environ.get('NEWS_CACHE_STALE_TTL', 600))
+NEWS_CACHE_STALE_IF_ERROR_TTL = int(os.environ.get('NEWS_CACHE_STALE_IF_ERROR_TTL', 86400))
+# Espera máxima de las peticiones que comparten una descarga en curso
+NEWS_FETCH_WAIT_TIMEOUT = float(os.environ.get('NEWS_FETCH_WAIT_TIMEOUT', 20))
+
+news_cache = make_backend(
+    NEWS_CACHE_BACKEND,
+    max_entries=NEWS_CACHE_MAX_ENTRIES,
+    max_bytes=NEWS_CACHE_MAX_BYTES,
+    default_ttl=NEWS_CACHE_TTL,
+    stale_ttl=NEWS_CACHE_STALE_TTL,
+    stale_if_error_ttl=NEWS_CACHE_STALE_IF_ERROR_TTL
+)
+news_flight = SingleFlight()
+
+# Peticiones en lote (/api/news/batch): máximo de elementos, hilos y espera total
+NEWS_BATCH_MAX_ITEMS = int(os.environ.get('NEWS_BATCH_MAX_ITEMS', 30))
+NEWS_BATCH_WORKERS = int(os.environ.get('NEWS_BATCH_WORKERS', 16))
+NEWS_BATCH_TIMEOUT = float(os.environ.get('NEWS_BATCH_TIMEOUT', 20))
+
+# Máximo de artículos por petición en modo streaming (format=ndjson) y tamaño de página upstream
+NEWS_STREAM_MAX_LIMIT = int(os.environ.get('NEWS_STREAM_MAX_LIMIT', 500))
+UPSTREAM_PAGE_SIZE = 50
+# Páginas siguientes que se descargan en segundo plano al servir una página
+NEWS_PREFETCH_PAGES = int(os.environ.get('NEWS_PREFETCH_PAGES', 1))
+# Artículos por página en la vista HTML
+INDEX_PAGE_SIZE = 20
+
+# Agrupar noticias casi duplicadas (misma nota en varias fuentes) y similitud mínima
+NEWS_DEDUPE = os.environ.get('NEWS_DEDUPE', '1').strip().lower() in ('1', 'true', 'yes', 'on')
+NEWS_DEDUPE_THRESHOLD = float(os.environ.get('NEWS_DEDUPE_THRESHOLD', 0.6))
+
+# Cache-Control por ruta para navegadores y la CDN de Vercel (s-maxage). Las respuestas
+# con error no se guardan y las obsoletas se sirven con no-cache para que se revaliden
+NEWS_HTTP_CACHE_CONTROL = os.environ.get(
+    'NEWS_HTTP_CACHE_CONTROL',
+    f'public, max-age=60, s-maxage={NEWS_CACHE_SEARCH_TTL}, stale-while-revalidate={NEWS_CACHE_STALE_TTL}'
+)
+INDEX_HTTP_CACHE_CONTROL = os.environ.get(
+    'INDEX_HTTP_CACHE_CONTROL',
+    f'public, max-age=0, s-maxage={NEWS_CACHE_SEARCH_TTL}, stale-while-revalidate={NEWS_CACHE_STALE_TTL}'
+)
+# Listas fijas (/api/categories, /api/countries): solo cambian con un despliegue
+LOOKUP_HTTP_CACHE_CONTROL = os.environ.get('LOOKUP_HTTP_CACHE_CONTROL', 'public, max-age=604800, immutable')
+
+# Compresión de respuestas (gzip, y brotli si está instalado), tamaño mínimo en bytes y
+# memoria para los cuerpos ya comprimidos de las respuestas con ETag
+NEWS_COMPRESSION = os.environ.get('NEWS_COMPRESSION', '1').strip().lower() in ('1', 'true', 'yes', 'on')
+NEWS_COMPRESSION_MIN_SIZE = int(os.environ.get('NEWS_COMPRESSION_MIN_SIZE', 1024))
+NEWS_COMPRESSION_CACHE_BYTES = int(os.environ.get('NEWS_COMPRESSION_CACHE_BYTES', 32 * 1024 * 1024))
+
+compressed_bodies = CompressedBodies(NEWS_COMPRESSION_CACHE_BYTES, ttl=NEWS_CACHE_TTL + NEWS_CACHE_STALE_TTL)
+
+# Presupuestos de llamadas a APITube.io por minuto (0 = sin límite): global del plan y por
+# uso (páginas pedidas por usuarios, precarga y refrescos, ingesta, /test-api y /debug-search).
+# Las páginas de usuarios no se limitan salvo que se configure APITUBE_BUDGET_NEWS.
+# Las cubetas se guardan en APITUBE_RATE_LIMIT_STORE (por defecto el backend de la caché)
+APITUBE_RATE_LIMIT_STORE = os.environ.get('APITUBE_RATE_LIMIT_STORE', NEWS_CACHE_BACKEND)
+APITUBE_PLAN_PER_MINUTE = int(os.environ.get('APITUBE_PLAN_PER_MINUTE', 0))
+APITUBE_BUDGET_NEWS = int(os.environ.get('APITUBE_BUDGET_NEWS', 0))
+APITUBE_BUDGET_BACKGROUND = int(os.environ.get('APITUBE_BUDGET_BACKGROUND', 20))
+APITUBE_BUDGET_INGEST = int(os.environ.get('APITUBE_BUDGET_INGEST', 20))
+APITUBE_BUDGET_DIAGNOSTICS = int(os.environ.get('APITUBE_BUDGET_DIAGNOSTICS', 6))
+
+upstream_limiter = UpstreamLimiter(
+    make_rate_store(APITUBE_RATE_LIMIT_STORE),
+    {
+        'news': APITUBE_BUDGET_NEWS,
+        'background': APITUBE_BUDGET_BACKGROUND,
+        'ingest': APITUBE_BUDGET_INGEST,
+        'diagnostics': APITUBE_BUDGET_DIAGNOSTICS,
+    },
+    plan_per_minute=APITUBE_PLAN_PER_MINUTE
+)
+
+# Circuito del upstream: se abre si en APITUBE_BREAKER_WINDOW segundos hay al menos
+# APITUBE_BREAKER_MIN_CALLS llamadas y fallan (red, timeout o 5xx) la proporción
+# APITUBE_BREAKER_FAILURE_RATE o tardan más de APITUBE_BREAKER_SLOW_CALL segundos la
+# proporción APITUBE_BREAKER_SLOW_RATE. Abierto se responde al momento desde la caché o el
+# almacén; tras APITUBE_BREAKER_OPEN_SECONDS se prueba con APITUBE_BREAKER_PROBES sondas
+APITUBE_BREAKER_ENABLED = os.environ.get('APITUBE_BREAKER_ENABLED', '1').strip().lower() in ('1', 'true', 'yes', 'on')
+APITUBE_BREAKER_WINDOW = float(os.environ.get('APITUBE_BREAKER_WINDOW', 60))
+APITUBE_BREAKER_MIN_CALLS = int(os.environ.get('APITUBE_BREAKER_MIN_CALLS', 10))
+APITUBE_BREAKER_FAILURE_RATE = float(os.environ.get('APITUBE_BREAKER_FAILURE_RATE', 0.5))
+APITUBE_BREAKER_SLOW_CALL = float(os.environ.get('APITUBE_BREAKER_SLOW_CALL', 8))
+APITUBE_BREAKER_SLOW_RATE = float(os.environ.get('APITUBE_BREAKER_SLOW_RATE', 0.8))
+APITUBE_BREAKER_OPEN_SECONDS = float(os.environ.get('APITUBE_BREAKER_OPEN_SECONDS', 30))
+APITUBE_BREAKER_PROBES = int(os.environ.get('APITUBE_BREAKER_PROBES', 1))
+
+upstream_breaker = CircuitBreaker(
+    window=APITUBE_BREAKER_WINDOW,
+    min_calls=APITUBE_BREAKER_MIN_CALLS,
+    failure_rate=APITUBE_BREAKER_FAILURE_RATE,
+    slow_call_seconds=APITUBE_BREAKER_SLOW_CALL,
+    slow_call_rate=APITUBE_BREAKER_SLOW_RATE,
+    open_seconds=APITUBE_BREAKER_OPEN_SECONDS,
+    half_open_probes=APITUBE_BREAKER_PROBES,
+    enabled=APITUBE_BREAKER_ENABLED
+)
+
+# Peticiones de cobertura (opcional): si una llamada tarda más que el percentil
+# APITUBE_HEDGE_PERCENTILE de las latencias recientes (acotado entre APITUBE_HEDGE_MIN_DELAY
+# y APITUBE_HEDGE_MAX_DELAY segundos) se lanza otra igual: en asíncrono se usa la primera que
+# responda y en síncrono la cobertura sustituye a la primera si falla. Cada cobertura gasta una
+# llamada del mismo presupuesto; con los APITUBE_HEDGE_WORKERS hilos ocupados no se cubre
+APITUBE_HEDGE_ENABLED = os.environ.get('APITUBE_HEDGE_ENABLED', '').strip().lower() in ('1', 'true', 'yes', 'on')
+APITUBE_HEDGE_PERCENTILE = float(os.environ.get('APITUBE_HEDGE_PERCENTILE', 0.95))
+APITUBE_HEDGE_MIN_DELAY = float(os.environ.get('APITUBE_HEDGE_MIN_DELAY', 0.05))
+APITUBE_HEDGE_MAX_DELAY = float(os.environ.get('APITUBE_HEDGE_MAX_DELAY', 3))
+APITUBE_HEDGE_WORKERS = int(os.environ.get('APITUBE_HEDGE_WORKERS', 16))
+
+upstream_hedger = Hedger(
+    upstream_breaker,
+    ThreadPoolExecutor(max_workers=APITUBE_HEDGE_WORKERS, thread_name_prefix='news-hedge')
+    if APITUBE_HEDGE_ENABLED else None,
+    percentile=APITUBE_HEDGE_PERCENTILE,
+    min_delay=APITUBE_HEDGE_MIN_DELAY,
+    max_delay=APITUBE_HEDGE_MAX_DELAY,
+    enabled=APITUBE_HEDGE_ENABLED,
+    max_workers=APITUBE_HEDGE_WORKERS
+)
+
+# Upstream no disponible ahora mismo: sin presupuesto de llamadas o con el circuito abierto
+UPSTREAM_UNAVAILABLE = (RateLimitExceeded, CircuitOpenError)
+
+# Perfilador por muestreo (opcional) de /, /api/news y /api/news/batch: la fracción
+# NEWS_PROFILE_RATE de las peticiones y las que traen X-News-Profile con un token firmado
+# con SECRET_KEY (python news_profiler.py token; válido NEWS_PROFILE_TOKEN_MAX_AGE segundos).
+# Toma una muestra cada NEWS_PROFILE_INTERVAL segundos sin ocupar más de
+# NEWS_PROFILE_MAX_OVERHEAD del tiempo, y escribe las pilas colapsadas en NEWS_PROFILE_PATH
+# cada NEWS_PROFILE_FLUSH_SECONDS. /admin/profile (con el mismo token) muestra los marcos más calientes
+NEWS_PROFILE_RATE = float(os.environ.get('NEWS_PROFILE_RATE', 0))
+NEWS_PROFILE_INTERVAL = float(os.environ.get('NEWS_PROFILE_INTERVAL', 0.01))
+NEWS_PROFILE_MAX_OVERHEAD = float(os.environ.get('NEWS_PROFILE_MAX_OVERHEAD', 0.01))
+NEWS_PROFILE_MAX_STACKS = int(os.environ.get('NEWS_PROFILE_MAX_STACKS', 10000))
+NEWS_PROFILE_PATH = os.environ.get('NEWS_PROFILE_PATH', '')
+NEWS_PROFILE_FLUSH_SECONDS = float(os.environ.get('NEWS_PROFILE_FLUSH_SECONDS', 60))
+NEWS_PROFILE_TOKEN_MAX_AGE = int(os.environ.get('NEWS_PROFILE_TOKEN_MAX_AGE', 3600))
+# Con la clave de desarrollo cualquiera podría firmar tokens: solo se aceptan con SECRET_KEY configurada
+NEWS_PROFILE_SIGNED = 'SECRET_KEY' in os.environ
+
+profiler = SamplingProfiler(
+    interval=NEWS_PROFILE_INTERVAL,
+    max_overhead=NEWS_PROFILE_MAX_OVERHEAD,
+    max_stacks=NEWS_PROFILE_MAX_STACKS,
+    path=NEWS_PROFILE_PATH,
+    flush_seconds=NEWS_PROFILE_FLUSH_SECONDS
+)
+
+
+def profile_token_valid(token):
     """
-    Función para obtener noticias de APITube.io
+    True si el token de X-News-Profile es válido (firmado con SECRET_KEY y no caducado)
+    """
+    return NEWS_PROFILE_SIGNED and bool(token) and check_profile_token(SECRET_KEY, token, NEWS_PROFILE_TOKEN_MAX_AGE)
+
+
+if NEWS_PROFILE_RATE > 0 or NEWS_PROFILE_SIGNED:
+    app.wsgi_app = ProfilerMiddleware(
+        app.wsgi_app, profiler, ('/', '/api/news', '/api/news/batch'),
+        rate=NEWS_PROFILE_RATE, authorize=profile_token_valid if NEWS_PROFILE_SIGNED else None
+    )
+
+# Métricas de latencia, caché y upstream en /metrics (formato de Prometheus); NEWS_METRICS=0 las desactiva
+NEWS_METRICS = os.environ.get('NEWS_METRICS', '1').strip().lower() in ('1', 'true', 'yes', 'on')
+
+metrics = MetricsRegistry(enabled=NEWS_METRICS)
+# Su _count es el número de peticiones por endpoint, método y estado
+HTTP_REQUEST_SECONDS = metrics.histogram(
+    'newsapi_http_request_seconds', 'Tiempo hasta tener la respuesta, con la compresión (sin enviarla)',
+    ('endpoint', 'method', 'status'))
+UPSTREAM_SECONDS = metrics.histogram(
+    'newsapi_upstream_seconds', 'Espera de las llamadas a APITube.io por presupuesto', ('budget',))
+UPSTREAM_RESPONSES = metrics.counter(
+    'newsapi_upstream_responses_total', 'Respuestas de APITube.io por estado HTTP (error = sin respuesta)', ('status',))
+UPSTREAM_REJECTED = metrics.counter(
+    'newsapi_upstream_rejected_total', 'Llamadas a APITube.io no hechas (rate_limit, circuit_open)', ('reason',))
+UPSTREAM_IN_FLIGHT = metrics.gauge('newsapi_upstream_in_flight', 'Llamadas a APITube.io en curso')
+JSON_DECODE_SECONDS = metrics.histogram(
+    'newsapi_json_decode_seconds', 'Decodificación de las páginas de APITube.io', buckets=FAST_BUCKETS)
+NORMALIZE_SECONDS = metrics.histogram(
+    'newsapi_normalize_seconds', 'Normalización de los artículos de una página', buckets=FAST_BUCKETS)
+INDEX_RENDER_SECONDS = metrics.histogram(
+    'newsapi_index_render_seconds', 'Render de la página principal (salvo página en caché)', buckets=FAST_BUCKETS)
+JSONIFY_SECONDS = metrics.histogram(
+    'newsapi_jsonify_seconds', 'Serialización de las respuestas de /api/news', buckets=FAST_BUCKETS)
+NEWS_LOOKUPS = metrics.counter(
+    'newsapi_news_lookups_total', 'Búsquedas de noticias por origen (hit, stale, shared, miss, store, error)',
+    ('source',))
+metrics.gauge('newsapi_news_cache_entries', 'Entradas en la caché de noticias',
+              function=lambda: news_cache.stats().get('entries'))
+metrics.gauge('newsapi_upstream_circuit_open', 'Circuito del upstream abierto (1) o no (0)',
+              function=lambda: int(upstream_breaker.state == 'open'))
+
+if NEWS_METRICS:
+    request_metrics = RequestMetricsMiddleware(app.wsgi_app, HTTP_REQUEST_SECONDS, app.url_map)
+    app.wsgi_app = request_metrics
+    metrics.before_render(request_metrics.flush)
+    metrics.gauge('newsapi_http_requests_in_flight', 'Peticiones HTTP en curso',
+                  function=lambda: len(request_metrics.active))
+
+# Fragmentos HTML de la página principal (resultados por contenido) y, opcionalmente,
+# la página entera por ETag; memoria máxima para ambos
+NEWS_PAGE_CACHE = os.environ.get('NEWS_PAGE_CACHE', '').strip().lower() in ('1', 'true', 'yes', 'on')
+NEWS_FRAGMENT_CACHE_BYTES = int(os.environ.get('NEWS_FRAGMENT_CACHE_BYTES', 16 * 1024 * 1024))
+
+fragment_cache = TTLCache(
+    max_entries=2048,
+    max_bytes=NEWS_FRAGMENT_CACHE_BYTES,
+    default_ttl=NEWS_CACHE_TTL + NEWS_CACHE_STALE_TTL,
+    sizeof=len
+)
+
+# Precalentador en segundo plano: mantiene en caché la portada, cada categoría y
+# las búsquedas más pedidas. Intervalo en segundos (por defecto el 80% del TTL),
+# jitter relativo, descargas simultáneas, llamadas por minuto, tamaño del top-N,
+# peticiones mínimas para entrar en él y búsquedas distintas que se cuentan como máximo
+NEWS_WARMER_ENABLED = os.environ.get('NEWS_WARMER_ENABLED', '').strip().lower() in ('1', 'true', 'yes', 'on')
+NEWS_WARMER_INTERVAL = int(os.environ.get('NEWS_WARMER_INTERVAL', NEWS_CACHE_TTL * 4 // 5))
+NEWS_WARMER_JITTER = float(os.environ.get('NEWS_WARMER_JITTER', 0.1))
+NEWS_WARMER_CONCURRENCY = int(os.environ.get('NEWS_WARMER_CONCURRENCY', 2))
+NEWS_WARMER_CALLS_PER_MINUTE = int(os.environ.get('NEWS_WARMER_CALLS_PER_MINUTE', 30))
+NEWS_WARMER_TOP_N = int(os.environ.get('NEWS_WARMER_TOP_N', 10))
+NEWS_WARMER_MIN_HITS = int(os.environ.get('NEWS_WARMER_MIN_HITS', 2))
+NEWS_WARMER_MAX_TRACKED = int(os.environ.get('NEWS_WARMER_MAX_TRACKED', 1000))
+
+# Almacén local de artículos (SQLite; vacío = desactivado). Las búsquedas sin texto se
+# sirven desde él si su feed se ingirió con éxito hace menos de NEWS_STORE_MAX_AGE segundos
+NEWS_STORE_PATH = os.environ.get('NEWS_STORE_PATH', '')
+NEWS_STORE_MAX_AGE = int(os.environ.get('NEWS_STORE_MAX_AGE', 900))
+NEWS_STORE_RETENTION_DAYS = int(os.environ.get('NEWS_STORE_RETENTION_DAYS', 7))
+# Ingesta en segundo plano: idiomas, segundos entre pasadas y páginas máximas por feed
+NEWS_INGEST_ENABLED = os.environ.get('NEWS_INGEST_ENABLED', '').strip().lower() in ('1', 'true', 'yes', 'on')
+NEWS_INGEST_LANGUAGES = [lang.strip().lower() for lang in
+                         os.environ.get('NEWS_INGEST_LANGUAGES', 'es').split(',') if lang.strip()]
+NEWS_INGEST_INTERVAL = int(os.environ.get('NEWS_INGEST_INTERVAL', 300))
+NEWS_INGEST_MAX_PAGES = int(os.environ.get('NEWS_INGEST_MAX_PAGES', 3))
+
+article_store = ArticleStore(NEWS_STORE_PATH, retention_days=NEWS_STORE_RETENTION_DAYS) if NEWS_STORE_PATH else None
+
+# Índice de búsqueda sobre el almacén para q= (vacío = desactivado) y máximo de resultados por búsqueda
+NEWS_SEARCH_INDEX_PATH = os.environ.get('NEWS_SEARCH_INDEX_PATH', f'{NEWS_STORE_PATH}.idx' if NEWS_STORE_PATH else '')
+NEWS_SEARCH_MAX_HITS = int(os.environ.get('NEWS_SEARCH_MAX_HITS', 1000))
+
+
+def load_search_index():
+    """
+    Abre el índice de búsqueda; si aún no existe lo construye a partir del almacén
+    """
+    if article_store is None or not NEWS_SEARCH_INDEX_PATH:
+        return None
+    try:
+        index = SearchIndex(NEWS_SEARCH_INDEX_PATH)
+    except (OSError, ValueError) as e:
+        logger.warning(f"No se pudo abrir el índice de búsqueda, se reconstruye: {str(e)}")
+        index = SearchIndex()
+        index.path = NEWS_SEARCH_INDEX_PATH
+    if not len(index):
+        for article_id, language, article, body in article_store.iter_articles():
+            index.add(article_id, language, article.get('title'), article.get('description'), body)
+        if len(index):
+            index.save()
+            logger.info(f"Índice de búsqueda reconstruido con {len(index)} artículos")
+    return index
+
+
+search_index = load_search_index()
+
+batch_executor = ThreadPoolExecutor(max_workers=NEWS_BATCH_WORKERS, thread_name_prefix='news-batch')
+
+def build_news_params(query=None, country=None, language='es', category=None, page_size=20, page=1):
+    """
+    Construye los parámetros de búsqueda para APITube.io
     """
-    if not APITUBE_API_KEY:
-        logger.error("APITUBE_API_KEY no está configurada")
-        return [], "La clave de API de APITube.io no está configurada."
-    
-    # Configurar headers de autenticación
-    headers = {
-        'X-API-Key': APITUBE_API_KEY,
-        'Content-Type': 'application/json'
-    }
-    
     # Parámetros base - más conservadores
     params = {
         'limit': min(page_size, 50)  # Limitar para evitar problemas
     }
     
+    # Paginación de APITube.io (1 = primera página)
+    if page and page > 1:
+        params['page'] = page
+    
     # Configurar idioma - múltiples variaciones
     if language:
         params['language'] = language
@@ -74,49 +417,753 @@ def fetch_news(query=None, country=None, language='es', category=None, page_size
         # Solo filtrar por idioma sin búsqueda específica
         logger.info(f"Obteniendo noticias generales en idioma '{language}'")    
     
+    return params
+
+
+def process_news_data(data):
+    """
+    Convierte la respuesta de APITube.io al formato que esperan el template y la API
+    """
+    # APITube.io usa 'results' NO 'data'
+    return process_news_page(*news_json.split_news_page(data))
+
+
+def process_news_page(info, columns):
+    """
+    Como process_news_data, a partir de la salida de news_json.decode_news_page
+    """
+    if not info.get('status', True):
+        error_msg = info.get('message', 'Error desconocido de la API')
+        logger.error(f"Error de API: {error_msg}")
+        return [], f"Error de la API de APITube.io: {error_msg}"
+    
+    processed_articles = normalize_columns(columns)
+    
+    if NEWS_DEDUPE:
+        processed_articles = collapse_duplicates(processed_articles, NEWS_DEDUPE_THRESHOLD)
+    
+    return processed_articles, None
+
+
+def normalize_article(article):
+    """
+    Formatea un artículo de APITube.io; devuelve None si no tiene título
+    """
+    if article.get('title') and article.get('title').strip():
+        # Formatear datos para compatibilidad con el template
+        return {
+            'title': article.get('title', ''),
+            'description': article.get('description', ''),
+            'url': article.get('href', ''),
+            'publishedAt': format_date(article.get('published_at')),
+            'source': {
+                'name': article.get('source', {}).get('name', 'Fuente desconocida')
+            },
+            'urlToImage': article.get('image', ''),
+            'content': article.get('body', '')[:200] + '...' if article.get('body') else None
+        }
+    return None
+
+
+ARTICLE_FIELDS = ('title', 'description', 'url', 'publishedAt', 'source', 'urlToImage', 'content')
+
+
+def titled_articles(articles):
+    """
+    Artículos crudos que normalize_article no descartaría (con título)
+    """
+    return [article for article in articles if news_json.is_titled(article)]
+
+
+def normalize_articles(articles, columnar=False):
+    """
+    Normaliza de una vez el array 'results' de APITube.io
+
+    Da el mismo resultado que normalize_article artículo a artículo, pero
+    recorre cada campo una sola vez y formatea las fechas con memoria (se
+    repiten mucho). Con columnar=True devuelve un dict campo -> lista en
+    lugar de una lista de dicts.
+    """
+    return normalize_columns(news_json.raw_columns(articles), columnar)
+
+
+def normalize_columns(raw, columnar=False):
+    """
+    normalize_articles sobre columnas crudas (news_json.raw_columns o decode_news_page)
+    """
+    columns = (
+        raw['title'],
+        raw['description'],
+        raw['href'],
+        list(map(format_date, raw['published_at'])),
+        [{'name': name} for name in raw['source_name']],
+        raw['image'],
+        [body[:200] + '...' if body else None for body in raw['body']]
+    )
+    if columnar:
+        return dict(zip(ARTICLE_FIELDS, columns))
+    return [
+        {'title': title, 'description': description, 'url': url, 'publishedAt': published_at,
+         'source': source, 'urlToImage': image, 'content': content}
+        for title, description, url, published_at, source, image, content in zip(*columns)
+    ]
+
+
+def news_page_info(data, articles, page_size, page=1):
+    """
+    Total de resultados y existencia de más páginas según la respuesta del upstream
+
+    data puede ser la respuesta completa o la info de news_json.decode_news_page.
+    """
+    total = None
+    for field in ('total_results', 'totalResults', 'total'):
+        if isinstance(data.get(field), int):
+            total = data[field]
+            break
+    # Resultados que devolvió el upstream, antes de descartar artículos o agrupar duplicados
+    result_count = data['result_count'] if 'result_count' in data else len(data.get('results', []))
+    result_count = max(result_count, len(articles))
+    has_next = data.get('has_next_pages')
+    if has_next is None:
+        has_next = result_count >= min(page_size, 50)
+    if total is None:
+        # Sin total explícito solo se conoce una cota inferior; con más páginas, al menos uno más
+        total = (page - 1) * min(page_size, 50) + result_count + bool(has_next)
+    return {'total': total, 'page': page, 'has_next': bool(has_next)}
+
+
+def _news_page(content, page_size, page):
+    """
+    Página de noticias a partir del cuerpo crudo (bytes) de la respuesta de APITube.io
+    """
+    with JSON_DECODE_SECONDS.time():
+        info, columns = news_json.decode_news_page(content)
+    with NORMALIZE_SECONDS.time():
+        articles, error_message = process_news_page(info, columns)
+        if error_message:
+            return None, error_message
+        result = news_page_info(info, articles, page_size, page)
+        # Por columnas mientras viven en la caché; se vuelven dicts al responder
+        result['articles'] = ArticleColumns.from_dicts(articles)
+        # Se guarda con la página para no serializar los artículos en cada ETag
+        result['digest'] = articles_digest(result['articles'])
+    return result, None
+
+
+def _reserve_upstream_call(budget):
+    """
+    Reserva la llamada en el circuito y en el presupuesto, o lanza una de UPSTREAM_UNAVAILABLE
+    """
+    try:
+        upstream_breaker.before()
+    except CircuitOpenError:
+        UPSTREAM_REJECTED.labels('circuit_open').inc()
+        raise
+    try:
+        upstream_limiter.acquire(budget)
+    except RateLimitExceeded:
+        upstream_breaker.release()
+        UPSTREAM_REJECTED.labels('rate_limit').inc()
+        raise
+
+
+def _record_upstream(budget, status, ok, start):
+    elapsed = time.monotonic() - start
+    upstream_breaker.record(ok, elapsed)
+    UPSTREAM_SECONDS.labels(budget).observe(elapsed)
+    UPSTREAM_RESPONSES.labels(status).inc()
+
+
+def _recorded(budget, call):
+    """
+    Envuelve un intento de llamada para que cuente en el circuito y en las métricas
+
+    Cada intento por separado: la llamada y, si la hay, su cobertura.
+    """
+    def attempt():
+        UPSTREAM_IN_FLIGHT.inc()
+        start = time.monotonic()
+        try:
+            response = call()
+        except Exception:
+            _record_upstream(budget, 'error', False, start)
+            raise
+        finally:
+            UPSTREAM_IN_FLIGHT.dec()
+        _record_upstream(budget, response.status_code, response.status_code < 500, start)
+        return response
+    return attempt
+
+
+def _recorded_async(budget, call):
+    """
+    Variante de _recorded para llamadas que devuelven una corrutina
+    """
+    async def attempt():
+        UPSTREAM_IN_FLIGHT.inc()
+        start = time.monotonic()
+        try:
+            response = await call()
+        except Exception:
+            _record_upstream(budget, 'error', False, start)
+            raise
+        finally:
+            UPSTREAM_IN_FLIGHT.dec()
+        _record_upstream(budget, response.status_code, response.status_code < 500, start)
+        return response
+    return attempt
+
+
+def _hedge_allowed(budget):
+    def allow():
+        try:
+            upstream_limiter.acquire(budget)
+        except RateLimitExceeded:
+            return False
+        return True
+    return allow
+
+
+def upstream_get(url, params, timeout=15, budget='news', stream=False, check_limits=True):
+    """
+    GET a APITube.io pasando por el circuito, el limitador y, si procede, una petición de cobertura
+
+    Lanza CircuitOpenError o RateLimitExceeded sin llamar si el upstream no
+    está disponible (con check_limits, también si responde 429), y las
+    excepciones de requests si la llamada falla, que cuentan como error en
+    el circuito igual que los 5xx. La cobertura cuenta en el circuito y en
+    las métricas igual que la llamada principal.
+    """
+    _reserve_upstream_call(budget)
+    if stream:
+        response = _recorded(budget, lambda: get_client().get(url, params=params, timeout=timeout, stream=True))()
+    else:
+        response = upstream_hedger.call(
+            _recorded(budget, lambda: get_client().get(url, params=params, timeout=timeout)),
+            _hedge_allowed(budget),
+            lambda: upstream_limiter.release(budget)
+        )
+    if check_limits:
+        upstream_limiter.check_response(response)
+    else:
+        upstream_limiter.observe(response.headers, response.status_code)
+    return response
+
+
+async def upstream_get_async(url, params, timeout=15, budget='news'):
+    """
+    Variante asíncrona de upstream_get sobre el pool asíncrono compartido
+    """
+    _reserve_upstream_call(budget)
+    response = await upstream_hedger.call_async(
+        _recorded_async(budget, lambda: async_get(url, params=params, timeout=timeout)),
+        _hedge_allowed(budget)
+    )
+    upstream_limiter.check_response(response)
+    return response
+
+
+def fetch_news_page(query=None, country=None, language='es', category=None, page_size=20, page=1,
+                    budget='news'):
+    """
+    Obtiene una página de noticias de APITube.io
+
+    Devuelve ({'articles', 'total', 'page', 'has_next'}, None) o (None, error).
+    Lanza RateLimitExceeded si el presupuesto 'budget' o el del plan están
+    agotados y CircuitOpenError si el circuito del upstream está abierto.
+    """
+    if not APITUBE_API_KEY:
+        logger.error("APITUBE_API_KEY no está configurada")
+        return None, "La clave de API de APITube.io no está configurada."
+    
+    params = build_news_params(query, country, language, category, page_size, page)
+    
     try:
-        response = requests.get(APITUBE_BASE_URL, params=params, headers=headers, timeout=15)
+        response = upstream_get(APITUBE_BASE_URL, params, timeout=15, budget=budget)
         response.raise_for_status()
-        data = response.json()
-        
-        if not data.get('status', True):
-            error_msg = data.get('message', 'Error desconocido de la API')
-            logger.error(f"Error de API: {error_msg}")
-            return [], f"Error de la API de APITube.io: {error_msg}"
-        
-        # APITube.io usa 'results' NO 'data'
-        articles = data.get('results', [])        # Procesar y filtrar artículos
-        processed_articles = []
-        for article in articles:
-            if article.get('title') and article.get('title').strip():
-                # Formatear datos para compatibilidad con el template
-                processed_article = {
-                    'title': article.get('title', ''),
-                    'description': article.get('description', ''),
-                    'url': article.get('href', ''),
-                    'publishedAt': format_date(article.get('published_at')),
-                    'source': {
-                        'name': article.get('source', {}).get('name', 'Fuente desconocida')
-                    },
-                    'urlToImage': article.get('image', ''),
-                    'content': article.get('body', '')[:200] + '...' if article.get('body') else None
-                }
-                processed_articles.append(processed_article)
-        
-        return processed_articles, None
+        return _news_page(response.content, page_size, page)
         
+    except UPSTREAM_UNAVAILABLE:
+        raise
     except requests.exceptions.Timeout:
         error_msg = "Timeout al conectar con la API de APITube.io"
         logger.error(error_msg)
-        return [], error_msg
+        return None, error_msg
     except requests.exceptions.RequestException as e:
         error_msg = f"Error al conectar con la API de APITube.io: {str(e)}"
         logger.error(error_msg)
-        return [], error_msg
+        return None, error_msg
     except Exception as e:
         error_msg = f"Error inesperado: {str(e)}"
         logger.error(error_msg)
-        return [], error_msg
+        return None, error_msg
+
+
+def fetch_ingest_page(endpoint, language, country, category, page):
+    """
+    Página cruda de un feed ('everything' o 'top-headlines') para el ingestor: (resultados, hay_mas, error)
+    """
+    if not APITUBE_API_KEY:
+        return [], False, "La clave de API de APITube.io no está configurada."
+    
+    url = APITUBE_TOP_HEADLINES_URL if endpoint == 'top-headlines' else APITUBE_BASE_URL
+    params = build_news_params(None, country, language, category, UPSTREAM_PAGE_SIZE, page)
+    
+    try:
+        response = upstream_get(url, params, timeout=15, budget='ingest')
+        response.raise_for_status()
+        data = news_json.loads(response.content)
+    except UPSTREAM_UNAVAILABLE as e:
+        return [], False, str(e)
+    except requests.exceptions.RequestException as e:
+        return [], False, f"Error al conectar con la API de APITube.io: {str(e)}"
+    except ValueError as e:
+        return [], False, f"Respuesta no válida de APITube.io: {str(e)}"
+    
+    if not data.get('status', True):
+        return [], False, f"Error de la API de APITube.io: {data.get('message', 'Error desconocido de la API')}"
+    results = data.get('results', [])
+    has_next = data.get('has_next_pages')
+    if has_next is None:
+        has_next = len(results) >= UPSTREAM_PAGE_SIZE
+    return results, bool(has_next), None
+
+
+def fetch_news(query=None, country=None, language='es', category=None, page_size=20):
+    """
+    Función para obtener noticias de APITube.io
+    """
+    try:
+        result, error_message = fetch_news_page(query, country, language, category, page_size)
+    except UPSTREAM_UNAVAILABLE as e:
+        return [], str(e)
+    return (list(result['articles']) if result else []), error_message
+
+
+async def fetch_news_page_async(query=None, country=None, language='es', category=None, page_size=20, page=1,
+                                budget='news'):
+    """
+    Variante asíncrona de fetch_news_page sobre el pool asíncrono compartido
+    """
+    if not APITUBE_API_KEY:
+        logger.error("APITUBE_API_KEY no está configurada")
+        return None, "La clave de API de APITube.io no está configurada."
+    
+    params = build_news_params(query, country, language, category, page_size, page)
+    
+    try:
+        response = await upstream_get_async(APITUBE_BASE_URL, params, timeout=15, budget=budget)
+        response.raise_for_status()
+        return _news_page(response.content, page_size, page)
+        
+    except UPSTREAM_UNAVAILABLE:
+        raise
+    except AsyncTimeoutError:
+        error_msg = "Timeout al conectar con la API de APITube.io"
+        logger.error(error_msg)
+        return None, error_msg
+    except AsyncHTTPError as e:
+        error_msg = f"Error al conectar con la API de APITube.io: {str(e)}"
+        logger.error(error_msg)
+        return None, error_msg
+    except Exception as e:
+        error_msg = f"Error inesperado: {str(e)}"
+        logger.error(error_msg)
+        return None, error_msg
+
+
+async def fetch_news_async(query=None, country=None, language='es', category=None, page_size=20):
+    """
+    Variante asíncrona de fetch_news
+    """
+    try:
+        result, error_message = await fetch_news_page_async(query, country, language, category, page_size)
+    except UPSTREAM_UNAVAILABLE as e:
+        return [], str(e)
+    return (list(result['articles']) if result else []), error_message
+
+
+class UpstreamError(Exception):
+    pass
+
+
+def iter_news_articles(query=None, country=None, language='es', category=None, limit=20, page=1):
+    """
+    Genera artículos normalizados a medida que llegan del upstream
+
+    Lee la respuesta en streaming y recorre páginas de APITube.io hasta
+    completar 'limit', de modo que la memoria no crece con el límite. Con
+    NEWS_DEDUPE los duplicados se agrupan por página del upstream, como en
+    las páginas en caché, así que cada página se emite al terminar de leerla.
+    Lanza UpstreamError si APITube.io devuelve un error y RateLimitExceeded
+    o CircuitOpenError si el upstream no está disponible.
+    """
+    if not APITUBE_API_KEY:
+        raise UpstreamError("La clave de API de APITube.io no está configurada.")
+    
+    # El tamaño de página debe ser fijo para que 'page' apunte siempre al mismo desplazamiento
+    page_size = min(limit, UPSTREAM_PAGE_SIZE)
+    remaining = limit
+    while remaining > 0:
+        params = build_news_params(query, country, language, category, page_size, page)
+        received = 0
+        try:
+            response = upstream_get(APITUBE_BASE_URL, params, timeout=15, stream=True)
+            page_articles = []
+            with closing(response):
+                response.raise_for_status()
+                for raw_article in iter_json_array(response.iter_content(16384), 'results'):
+                    received += 1
+                    article = normalize_article(raw_article)
+                    if article:
+                        if NEWS_DEDUPE:
+                            page_articles.append(article)
+                        else:
+                            yield article
+                    if received >= remaining:
+                        break
+            if page_articles:
+                yield from collapse_duplicates(page_articles, NEWS_DEDUPE_THRESHOLD)
+        except ArrayNotFound as e:
+            data = e.document if isinstance(e.document, dict) else {}
+            message = data.get('message', 'Error desconocido de la API')
+            raise UpstreamError(f"Error de la API de APITube.io: {message}") from None
+        except requests.exceptions.Timeout:
+            raise UpstreamError("Timeout al conectar con la API de APITube.io") from None
+        except (requests.exceptions.RequestException, ValueError) as e:
+            raise UpstreamError(f"Error al conectar con la API de APITube.io: {str(e)}") from None
+        
+        if received < page_size:
+            break
+        remaining -= received
+        page += 1
+
+
+def stream_news_response(query, country, language, category, limit, page=1):
+    """
+    Respuesta NDJSON: una línea JSON por artículo, enviada en cuanto está lista
+    """
+    limit = max(1, min(limit, NEWS_STREAM_MAX_LIMIT))
+    cached = None
+    if limit <= UPSTREAM_PAGE_SIZE:
+        cached = news_cache.get(news_cache_key(query, country, language, category, limit, page))
+    articles = iter(cached['articles']) if cached is not None else iter_news_articles(
+        query, country, language, category, limit, page
+    )
+    
+    # Obtener el primer artículo antes de responder para poder devolver un 500 limpio
+    try:
+        first = next(articles, None)
+    except UPSTREAM_UNAVAILABLE as e:
+        return retry_later_response(str(e), e.retry_after, e.status_code)
+    except UpstreamError as e:
+        logger.error(str(e))
+        return jsonify({'error': str(e)}), 500
+    
+    def generate():
+        if first is None:
+            return
+        try:
+            for article in chain([first], articles):
+                yield news_json.dumps(article) + b'\n'
+        except (UpstreamError,) + UPSTREAM_UNAVAILABLE as e:
+            logger.error(str(e))
+            yield news_json.dumps({'error': str(e)}) + b'\n'
+    
+    return Response(generate(), mimetype='application/x-ndjson')
+
+
+def news_cache_key(query=None, country=None, language='es', category=None, page_size=20, page=1):
+    """
+    Normaliza los parámetros de búsqueda para usarlos como clave de caché
+    """
+    category = (category or '').strip().lower() or 'general'
+    return (
+        (query or '').strip().lower(),
+        (country or '').strip().upper(),
+        (language or '').strip().lower(),
+        category,
+        min(page_size, 50),
+        max(page, 1)
+    )
+
+
+def _cache_ttl(key):
+    return NEWS_CACHE_SEARCH_TTL if key[0] else NEWS_CACHE_TTL
+
+
+def _fetch_and_store(key, *params, budget='news'):
+    """
+    Descarga una página del upstream y guarda en caché los resultados correctos
+    """
+    result, error_message = fetch_news_page(*params, budget=budget)
+    if not error_message:
+        news_cache.set(key, result, ttl=_cache_ttl(key))
+    return result, error_message
+
+
+async def _fetch_and_store_async(key, *params, budget='news'):
+    result, error_message = await fetch_news_page_async(*params, budget=budget)
+    if not error_message:
+        news_cache.set(key, result, ttl=_cache_ttl(key))
+    return result, error_message
+
+
+def _refresh_in_background(key, params):
+    def refresh():
+        try:
+            result, error_message = _fetch_and_store(key, *params, budget='background')
+        except UPSTREAM_UNAVAILABLE as e:
+            result, error_message = None, str(e)
+        if error_message:
+            logger.warning(f"No se pudo refrescar {key}: {error_message}")
+        return result, error_message
+    
+    return news_flight.do_background(key, refresh)
+
+
+def _news_meta(result, cache, stale):
+    return {
+        'cache': cache,
+        'stale': stale,
+        'total': result['total'],
+        'page': result['page'],
+        'has_next': result['has_next'],
+        # Las páginas del almacén local (y las guardadas antes de existir 'digest') se resumen aquí
+        'digest': result.get('digest') or articles_digest(result['articles'])
+    }
+
+
+def search_store(query, country, language, category, page_size=20, page=1, max_age=NEWS_STORE_MAX_AGE):
+    """
+    Página de resultados del índice local, o None si no puede responder
+
+    Solo responde si el feed está al día (ingerido hace menos de max_age
+    segundos) y hay resultados para esa página; si no, la búsqueda sigue
+    hacia la caché y el upstream.
+    """
+    if search_index is None or not article_store.covers(language, country, category, max_age):
+        return None
+    ids = [doc_id for doc_id, _ in search_index.search(query, language, limit=NEWS_SEARCH_MAX_HITS)]
+    # 'general' con búsqueda de texto no filtra por categoría (igual que el upstream)
+    if ids and (category != 'general' or country):
+        ids = article_store.filter_tagged(ids, language, country, category)
+    offset = (page - 1) * page_size
+    if offset >= len(ids):
+        return None
+    return {
+        'articles': article_store.get_articles(ids[offset:offset + page_size]),
+        'total': len(ids),
+        'page': page,
+        'has_next': offset + page_size < len(ids)
+    }
+
+
+def _serve_from_store(key, max_age=NEWS_STORE_MAX_AGE):
+    """
+    Resuelve desde el almacén local (y su índice para las búsquedas de texto) las de un feed al día
+    """
+    if article_store is None:
+        return None
+    query, country, language, category, page_size, page = key
+    if query:
+        result = search_store(query, country, language, category, page_size, page, max_age)
+    else:
+        result = article_store.query(language, country, category, page_size, page, max_age)
+    if result is None:
+        return None
+    if NEWS_DEDUPE:
+        result['articles'] = collapse_duplicates(result['articles'], NEWS_DEDUPE_THRESHOLD)
+    return result['articles'], None, _news_meta(result, 'store', False)
+
+
+def _serve_cached(key, cached, state, params):
+    """
+    Resuelve la petición desde la caché si la entrada es vigente u obsoleta servible
+    """
+    if state == FRESH:
+        return cached['articles'], None, _news_meta(cached, 'hit', False)
+    if state == STALE:
+        _refresh_in_background(key, params)
+        return cached['articles'], None, _news_meta(cached, 'stale', True)
+    return None
+
+
+def _fetch_result(key, cached, state, result, error_message, shared, unavailable=None):
+    if error_message and state == EXPIRED:
+        logger.warning(f"Sirviendo resultado obsoleto para {key}: {error_message}")
+        return cached['articles'], None, _news_meta(cached, 'stale', True)
+    if error_message:
+        # Sin upstream, mejor el almacén local aunque esté desactualizado que un error
+        served = _serve_from_store(key, max_age=float('inf'))
+        if served:
+            logger.warning(f"Sirviendo {key} desde el almacén local: {error_message}")
+            articles, _, meta = served
+            meta['stale'] = True
+            return articles, None, meta
+        meta = {'cache': 'miss', 'stale': False, 'total': 0, 'page': key[5], 'has_next': False}
+        if unavailable is not None:
+            # Sin presupuesto o con el circuito abierto y sin nada guardado: 429/503 con Retry-After
+            meta['retry_after'] = unavailable.retry_after
+            meta['status'] = unavailable.status_code
+        return [], error_message, meta
+    
+    return result['articles'], None, _news_meta(result, 'shared' if shared else 'miss', False)
+
+
+def get_news(query=None, country=None, language='es', category=None, page_size=20, page=1):
+    """
+    Obtiene noticias pasando por la caché; solo se guardan resultados sin error
+
+    Devuelve (articulos, error, meta); meta incluye el total del upstream, la
+    página y si hay más. Las descargas concurrentes de una misma clave se
+    agrupan en una sola, las entradas recién caducadas se sirven al instante
+    mientras se refrescan en segundo plano, y si el upstream falla se devuelve
+    el último resultado bueno con meta['stale'] = True.
+    """
+    params = (query, country, language, category, page_size, page)
+    key = news_cache_key(*params)
+    feed_warmer.record(params)
+    served = _serve_from_store(key)
+    if served:
+        return served
+    cached, state = news_cache.lookup(key)
+    served = _serve_cached(key, cached, state, params)
+    if served:
+        return served
+    
+    try:
+        (result, error_message), shared = news_flight.do(
+            key,
+            lambda: _fetch_and_store(key, *params),
+            timeout=NEWS_FETCH_WAIT_TIMEOUT
+        )
+    except TimeoutError:
+        result, shared = None, True
+        error_message = "Timeout esperando la respuesta de APITube.io"
+    except UPSTREAM_UNAVAILABLE as e:
+        return _fetch_result(key, cached, state, None, str(e), False, unavailable=e)
+    
+    return _fetch_result(key, cached, state, result, error_message, shared)
+
+
+async def get_news_async(query=None, country=None, language='es', category=None, page_size=20, page=1):
+    """
+    Variante asíncrona de get_news con la misma caché y agrupación de descargas
+    """
+    params = (query, country, language, category, page_size, page)
+    key = news_cache_key(*params)
+    feed_warmer.record(params)
+    served = _serve_from_store(key)
+    if served:
+        return served
+    cached, state = news_cache.lookup(key)
+    served = _serve_cached(key, cached, state, params)
+    if served:
+        return served
+    
+    try:
+        (result, error_message), shared = await news_flight.do_async(
+            key,
+            lambda: _fetch_and_store_async(key, *params),
+            timeout=NEWS_FETCH_WAIT_TIMEOUT
+        )
+    except TimeoutError:
+        result, shared = None, True
+        error_message = "Timeout esperando la respuesta de APITube.io"
+    except UPSTREAM_UNAVAILABLE as e:
+        return _fetch_result(key, cached, state, None, str(e), False, unavailable=e)
+    
+    return _fetch_result(key, cached, state, result, error_message, shared)
+
+
+def warm_news(params):
+    """
+    Refresca una búsqueda para el precalentador; devuelve el error o None
+    """
+    key = news_cache_key(*params)
+    try:
+        (result, error_message), _ = news_flight.do(
+            key,
+            lambda: _fetch_and_store(key, *params, budget='background'),
+            timeout=NEWS_FETCH_WAIT_TIMEOUT
+        )
+    except TimeoutError:
+        error_message = "Timeout esperando la respuesta de APITube.io"
+    except UPSTREAM_UNAVAILABLE as e:
+        error_message = str(e)
+    return error_message
+
+
+feed_warmer = FeedWarmer(
+    warm_news,
+    news_cache_key,
+    interval=NEWS_WARMER_INTERVAL,
+    jitter=NEWS_WARMER_JITTER,
+    max_concurrency=NEWS_WARMER_CONCURRENCY,
+    max_calls_per_minute=NEWS_WARMER_CALLS_PER_MINUTE,
+    top_n=NEWS_WARMER_TOP_N,
+    min_hits=NEWS_WARMER_MIN_HITS,
+    max_tracked=NEWS_WARMER_MAX_TRACKED,
+    expires_in=news_cache.expires_in,
+    # Las búsquedas que siguen en caché se refrescan cuando les queda lo que el intervalo deja del TTL
+    refresh_ahead=max(NEWS_CACHE_TTL - NEWS_WARMER_INTERVAL, 10)
+)
+
+
+def prefetch_next_pages(query, country, language, category, page_size, meta):
+    """
+    Descarga en segundo plano las páginas siguientes para que 'siguiente' salga de caché
+    """
+    # Las páginas del almacén local ya son instantáneas
+    if NEWS_PREFETCH_PAGES <= 0 or not meta.get('has_next') or meta.get('cache') == 'store':
+        return 0
+    page_size = min(page_size, 50)
+    started = 0
+    for offset in range(1, NEWS_PREFETCH_PAGES + 1):
+        page = meta['page'] + offset
+        # has_next garantiza la siguiente; más allá solo si el total lo confirma
+        if offset > 1 and (page - 1) * page_size >= meta['total']:
+            break
+        params = (query, country, language, category, page_size, page)
+        key = news_cache_key(*params)
+        if news_cache.get(key) is not None:
+            continue
+        fetch = lambda key=key, params=params: _fetch_and_store(key, *params, budget='background')  # noqa: E731
+        if news_flight.do_background(key, fetch):
+            started += 1
+    return started
+
+
+def encode_cursor(query, country, language, category, page_size, page):
+    """
+    Cursor opaco y firmado con la búsqueda normalizada y la página
+    """
+    return cursor_serializer.dumps(list(news_cache_key(query, country, language, category, page_size, page)))
+
+
+def decode_cursor(cursor):
+    """
+    Devuelve (query, country, language, category, page_size, page) o lanza ValueError
+    """
+    try:
+        values = cursor_serializer.loads(cursor)
+        query, country, language, category, page_size, page = values
+        return str(query), str(country), str(language), str(category), int(page_size), max(int(page), 1)
+    except (BadSignature, TypeError, ValueError):
+        raise ValueError('Cursor no válido') from None
+
+
+def pagination_links(query, country, language, category, page_size, meta):
+    page = meta['page']
+    return {
+        'page': page,
+        'total': meta['total'],
+        'next_cursor': encode_cursor(query, country, language, category, page_size, page + 1)
+        if meta['has_next'] else None,
+        'prev_cursor': encode_cursor(query, country, language, category, page_size, page - 1)
+        if page > 1 else None
+    }
 
 
 def fetch_categories():
@@ -124,57 +1171,78 @@ def fetch_categories():
     Función para obtener las categorías disponibles de APITube.io
     """
     if not APITUBE_API_KEY:
-        return []
-    
-    # Categorías disponibles en APITube.io según su documentación
-    categories = [
-        {'id': 'general', 'name': 'General'},
-        {'id': 'business', 'name': 'Negocios'},
-        {'id': 'entertainment', 'name': 'Entretenimiento'},
-        {'id': 'health', 'name': 'Salud'},
-        {'id': 'science', 'name': 'Ciencia'},
-        {'id': 'sports', 'name': 'Deportes'},
-        {'id': 'technology', 'name': 'Tecnología'},
-        {'id': 'politics', 'name': 'Política'},
-        {'id': 'finance', 'name': 'Finanzas'},
-        {'id': 'education', 'name': 'Educación'},
-        {'id': 'travel', 'name': 'Viajes'},
-        {'id': 'food', 'name': 'Comida'},
-        {'id': 'lifestyle', 'name': 'Estilo de vida'}
-    ]
+        return ()
     
-    return categories
+    return lookups.categories
+
+
+def start_feed_warmer():
+    """
+    Registra la portada y cada categoría como búsquedas fijas y arranca el precalentador
+    """
+    base = (default_config['q'], default_config['country'], default_config['language'])
+    feed_warmer.add_static(base + (default_config['category'], INDEX_PAGE_SIZE, 1))
+    for category in fetch_categories():
+        feed_warmer.add_static(base + (category['id'], INDEX_PAGE_SIZE, 1))
+    feed_warmer.start()
+
+
+if NEWS_WARMER_ENABLED and APITUBE_API_KEY:
+    start_feed_warmer()
+
+
+def normalize_feed_page(results):
+    """
+    Pares (artículo crudo, normalizado) de una página de un feed para el ingestor
+    """
+    kept = titled_articles(results)
+    return list(zip(kept, normalize_articles(kept)))
+
+
+def ingest_feeds():
+    """
+    Feeds del ingestor: titulares y cada categoría, por idioma configurado
+
+    Los titulares se etiquetan como 'general' para alimentar la portada.
+    """
+    country = (default_config['country'] or '').strip().upper()
+    feeds = []
+    for language in NEWS_INGEST_LANGUAGES:
+        feeds.append(('top-headlines', language, country, 'general'))
+        for category in fetch_categories():
+            feeds.append(('everything', language, country, category['id']))
+    return feeds
+
+
+article_ingester = ArticleIngester(
+    article_store,
+    fetch_ingest_page,
+    normalize_feed_page,
+    ingest_feeds(),
+    interval=NEWS_INGEST_INTERVAL,
+    max_pages=NEWS_INGEST_MAX_PAGES,
+    index=search_index
+) if article_store is not None else None
+
+if article_ingester is not None and NEWS_INGEST_ENABLED and APITUBE_API_KEY:
+    article_ingester.start()
 
 
 def get_countries():
     """
     Lista de países disponibles para filtrar noticias
     """
-    countries = [
-        {'code': '', 'name': 'Todos los países'},
-        {'code': 'es', 'name': 'España'},
-        {'code': 'mx', 'name': 'México'},
-        {'code': 'ar', 'name': 'Argentina'},
-        {'code': 'co', 'name': 'Colombia'},
-        {'code': 'pe', 'name': 'Perú'},
-        {'code': 'cl', 'name': 'Chile'},
-        {'code': 'us', 'name': 'Estados Unidos'},
-        {'code': 'gb', 'name': 'Reino Unido'},
-        {'code': 'fr', 'name': 'Francia'},
-        {'code': 'de', 'name': 'Alemania'},
-        {'code': 'it', 'name': 'Italia'},
-        {'code': 'br', 'name': 'Brasil'},
-        {'code': 'cn', 'name': 'China'},
-        {'code': 'jp', 'name': 'Japón'},
-        {'code': 'in', 'name': 'India'}
-    ]
-    return countries
+    return lookups.countries
 
 
-def format_date(date_string):
+def get_languages():
     """
-    Formatea la fecha de APITube.io al formato deseado
+    Idiomas del selector de la página principal
     """
+    return lookups.languages
+
+
+def _format_date(date_string):
     if not date_string:
         return 'Fecha no disponible'
     
@@ -189,44 +1257,352 @@ def format_date(date_string):
         return date_string
 
 
-@app.route('/', methods=['GET', 'POST'])
-def index():
+_format_date_cached = lru_cache(maxsize=4096)(_format_date)
+
+
+def format_date(date_string):
+    """
+    Formatea la fecha de APITube.io al formato deseado (memorizada: las fechas se repiten mucho)
+
+    Solo se memorizan las cadenas; cualquier otro valor se formatea sin caché
+    """
+    if isinstance(date_string, str):
+        return _format_date_cached(date_string)
+    return _format_date(date_string)
+
+
+def template_version(*names):
+    """
+    Hash de los templates: cambia el ETag de / y las claves de fragmentos con cada despliegue
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    for name in names:
+        with open(os.path.join(app.root_path, app.template_folder, name), 'rb') as template_file:
+            digest.update(template_file.read())
+    return digest.hexdigest()
+
+
+INDEX_TEMPLATE_VERSION = template_version('index.html', '_results.html', '_select_options.html')
+RESULTS_TEMPLATE_VERSION = template_version('_results.html')
+
+
+def articles_digest(articles):
+    """
+    Resumen del contenido de una lista de artículos, para content_etag
+    """
+    return hashlib.blake2b(news_json.dumps(articles), digest_size=16).hexdigest()
+
+
+def content_etag(*parts):
+    """
+    ETag estable entre workers: hash del JSON de las partes (parámetros, meta y resumen de los artículos)
+    """
+    return hashlib.blake2b(news_json.dumps(parts), digest_size=16).hexdigest()
+
+
+def conditional_response(build, etag, cache_control):
+    """
+    Respuesta con ETag y Cache-Control; si If-None-Match coincide, 304 sin construir el cuerpo
+
+    La CDN usa la URL completa (con la query) como clave, así que solo varía
+    por Accept-Encoding. Si ya hay un cuerpo comprimido para este ETag se
+    sirve directamente, sin construirlo ni comprimirlo otra vez.
+    """
+    if request.if_none_match.contains_weak(etag):
+        response = app.response_class(status=304)
+    else:
+        response = precompressed_response(etag) or make_response(build())
+    # Cada codificación es una representación distinta: el ETag de las comprimidas es débil
+    response.set_etag(etag, weak='Content-Encoding' in response.headers)
+    response.headers['Cache-Control'] = cache_control
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def precompressed_response(etag):
+    """
+    Respuesta con el cuerpo comprimido guardado para este ETag, o None
+    """
+    encoding = negotiate(request.accept_encodings) if NEWS_COMPRESSION else None
+    cached = compressed_bodies.get(etag, encoding) if encoding else None
+    if cached is None:
+        return None
+    mimetype, body = cached
+    response = app.response_class(body, mimetype=mimetype)
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+@app.after_request
+def compress_response(response):
+    """
+    Comprime las respuestas de texto con la codificación que acepte el cliente
+
+    Las respuestas en streaming (NDJSON) se envían tal cual. Las que llevan
+    ETag guardan el resultado en compressed_bodies para las siguientes.
+    """
+    if (not NEWS_COMPRESSION or response.status_code != 200 or response.direct_passthrough
+            or response.is_streamed or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_TYPES):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate(request.accept_encodings)
+    data = response.get_data()
+    if not encoding or len(data) < NEWS_COMPRESSION_MIN_SIZE:
+        return response
+    etag, weak = response.get_etag()
+    response.set_data(compressed_bodies.compress(etag, encoding, response.mimetype, data))
+    response.headers['Content-Encoding'] = encoding
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def no_store(response, status=None):
+    """
+    Marca una respuesta (errores, POST) para que ni el navegador ni la CDN la guarden
+    """
+    response = make_response(response, status) if status else make_response(response)
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+
+def read_index_config():
+    """
+    Lee la configuración de búsqueda del formulario (POST) o de la URL (GET)
+    """
     # Configuración por defecto
     config = default_config.copy()
-    articles = []
-    categories = fetch_categories()
-    countries = get_countries()
-    error_message = None
+    config['page'] = 1
     
     if request.method == 'POST':
         # Obtener parámetros del formulario
-        config['category'] = request.form.get('category', default_config['category'])
-        config['country'] = request.form.get('country', default_config['country'])
-        config['q'] = request.form.get('q', default_config['q'])
-        config['language'] = request.form.get('language', default_config['language'])
+        source = request.form
     else:
         # Para GET, usar parámetros de URL si están presentes
-        config['category'] = request.args.get('category', default_config['category'])
-        config['country'] = request.args.get('country', default_config['country'])
-        config['q'] = request.args.get('q', default_config['q'])
-        config['language'] = request.args.get('language', default_config['language'])
-    
-    # Obtener noticias usando APITube.io
-    articles, error_message = fetch_news(
-        query=config['q'],
-        country=config['country'],
-        language=config['language'],
-        category=config['category']
-    )
+        source = request.args
     
-    return render_template(
-        'index.html', 
-        articles=articles, 
-        config=config, 
-        error_message=error_message, 
-        categories=categories,
-        countries=countries
-    )
+    cursor = source.get('cursor')
+    if cursor:
+        try:
+            query, country, language, category, _, page = decode_cursor(cursor)
+            config.update({'q': query, 'country': country.lower(), 'language': language,
+                           'category': category, 'page': page})
+            return config
+        except ValueError:
+            logger.warning("Cursor de paginación no válido en la página principal")
+    
+    config['category'] = source.get('category', default_config['category'])
+    config['country'] = source.get('country', default_config['country'])
+    config['q'] = source.get('q', default_config['q'])
+    config['language'] = source.get('language', default_config['language'])
+    return config
+
+
+def _index_news_params(config):
+    return (config['q'], config['country'], config['language'], config['category'],
+            INDEX_PAGE_SIZE, config['page'])
+
+
+@lru_cache(maxsize=256)
+def select_options(name, selected):
+    """
+    <option> de un selector del formulario ya renderizadas, una vez por valor seleccionado
+    """
+    if name == 'category':
+        options = [{'value': cat['id'], 'label': cat['name']} for cat in fetch_categories()]
+    elif name == 'country':
+        options = [{'value': country['code'], 'label': country['name']} for country in get_countries()]
+    else:
+        options = [{'value': language['code'], 'label': language['name']} for language in get_languages()]
+    return Markup(render_template('_select_options.html', options=options, selected=selected))
+
+
+def render_results(params, articles, error_message, meta):
+    """
+    Sección de resultados (lista de artículos y paginación), renderizada una vez por contenido
+
+    La clave son los parámetros de la búsqueda y el contenido que se muestra,
+    no el ETag de la página: el formulario, el aviso de datos antiguos o un
+    cambio en index.html no obligan a renderizarla de nuevo.
+    """
+    key = ('results', content_etag(RESULTS_TEMPLATE_VERSION, params, meta['page'], meta['total'],
+                                   meta['has_next'], error_message, meta.get('digest')))
+    results = fragment_cache.get(key)
+    if results is None:
+        results = Markup(render_template(
+            '_results.html',
+            articles=list(articles),
+            error_message=error_message,
+            pagination=None if error_message else pagination_links(*params[:5], meta)
+        ))
+        fragment_cache.set(key, results)
+    return results
+
+
+def render_index_page(etag, config, articles, error_message, meta):
+    """
+    HTML completo de la página principal a partir de los fragmentos en caché
+
+    Con NEWS_PAGE_CACHE=1 se guarda también la página entera (en bytes) por
+    ETag, que ya identifica la configuración normalizada y el contenido.
+    """
+    if NEWS_PAGE_CACHE:
+        page = fragment_cache.get(('page', etag))
+        if page is not None:
+            return page
+    params = _index_news_params(config)
+    with INDEX_RENDER_SECONDS.time():
+        page = render_template(
+            'index.html', 
+            config=config, 
+            category_options=select_options('category', config['category']),
+            country_options=select_options('country', config['country']),
+            language_options=select_options('language', config['language']),
+            results=render_results(params, articles, error_message, meta)
+        ).encode('utf-8')
+    if NEWS_PAGE_CACHE:
+        fragment_cache.set(('page', etag), page)
+    return page
+
+
+def render_index(config, articles, error_message, meta):
+    params = _index_news_params(config)
+    NEWS_LOOKUPS.labels('error' if error_message else meta['cache']).inc()
+    if not error_message:
+        prefetch_next_pages(*params[:5], meta)
+    
+    etag = content_etag(INDEX_TEMPLATE_VERSION, config, meta['total'], meta['has_next'], meta['stale'],
+                        bool(APITUBE_API_KEY), error_message, meta.get('digest'))
+    
+    def build():
+        return render_index_page(etag, config, articles, error_message, meta)
+    
+    # Los resultados de un formulario (POST) y los errores no se guardan en caché
+    if error_message and 'retry_after' in meta:
+        response = no_store(build(), meta['status'])
+        response.headers['Retry-After'] = str(math.ceil(meta['retry_after']))
+        return response
+    if request.method == 'POST' or error_message:
+        return no_store(build())
+    return conditional_response(build, etag, 'no-cache' if meta['stale'] else INDEX_HTTP_CACHE_CONTROL)
+
+
+def invalid_filters_page(config):
+    """
+    Página de error (400) si los filtros no están soportados, sin llamar al upstream; si no, None
+
+    Normaliza en config el país, el idioma y la categoría válidos.
+    """
+    try:
+        config['country'], config['language'], config['category'] = lookups.validate(
+            config['country'], config['language'], config['category']
+        )
+    except ValueError as e:
+        for field in ('country', 'language', 'category'):
+            config[field] = default_config[field]
+        meta = {'total': 0, 'page': config['page'], 'has_next': False, 'stale': False}
+        response = render_index(config, [], str(e), meta)
+        response.status_code = 400
+        return response
+    return None
+
+
+@app.route('/', methods=['GET', 'POST'])
+def index():
+    config = read_index_config()
+    invalid = invalid_filters_page(config)
+    if invalid:
+        return invalid
+    
+    # Obtener noticias usando APITube.io (a través de la caché)
+    articles, error_message, meta = get_news(*_index_news_params(config))
+    
+    return render_index(config, articles, error_message, meta)
+
+
+async def index_async():
+    """
+    Versión asíncrona de index(); se activa con ASYNC_VIEWS=1
+    """
+    config = read_index_config()
+    invalid = invalid_filters_page(config)
+    if invalid:
+        return invalid
+    
+    articles, error_message, meta = await get_news_async(*_index_news_params(config))
+    
+    return render_index(config, articles, error_message, meta)
+
+
+def read_limit(default=20, maximum=UPSTREAM_PAGE_SIZE):
+    try:
+        limit = int(request.args.get('limit', default))
+    except ValueError:
+        limit = default
+    return max(1, min(limit, maximum))
+
+
+def read_news_args():
+    """
+    Parámetros de /api/news: (q, country, language, category, limit, page)
+
+    Un 'cursor' de una respuesta anterior sustituye al resto de parámetros.
+    Lanza ValueError si el cursor o algún filtro no es válido.
+    """
+    cursor = request.args.get('cursor')
+    if cursor:
+        query, country, language, category, page_size, page = decode_cursor(cursor)
+    else:
+        streaming = request.args.get('format') == 'ndjson'
+        query, country, language, category, page_size, page = (
+            request.args.get('q', ''),
+            request.args.get('country', ''),
+            request.args.get('language', 'es'),
+            request.args.get('category', 'general'),
+            read_limit(maximum=NEWS_STREAM_MAX_LIMIT if streaming else UPSTREAM_PAGE_SIZE),
+            1
+        )
+    # Filtros no soportados: 400 sin gastar una llamada al upstream
+    country, language, category = lookups.validate(country, language, category)
+    return query, country, language, category, page_size, page
+
+
+def retry_later_response(message, retry_after, status=429):
+    """
+    429 (sin presupuesto) o 503 (circuito abierto) inmediato con Retry-After
+    """
+    response = no_store(jsonify({'error': message}), status)
+    response.headers['Retry-After'] = str(math.ceil(retry_after))
+    return response
+
+
+def news_response(params, articles, error_message, meta):
+    NEWS_LOOKUPS.labels('error' if error_message else meta['cache']).inc()
+    if error_message:
+        if 'retry_after' in meta:
+            return retry_later_response(error_message, meta['retry_after'], meta['status'])
+        return no_store(jsonify({'error': error_message}), 500)
+    
+    prefetch_next_pages(*params[:5], meta)
+    etag = content_etag(params, meta['total'], meta['has_next'], meta['stale'], meta['digest'])
+    
+    def build():
+        links = pagination_links(*params[:5], meta)
+        start = time.perf_counter()
+        response = jsonify({
+            'status': 'success',
+            'totalResults': meta['total'],
+            'page': meta['page'],
+            'nextCursor': links['next_cursor'],
+            'prevCursor': links['prev_cursor'],
+            'stale': meta['stale'],
+            'articles': list(articles)
+        })
+        JSONIFY_SECONDS.observe(time.perf_counter() - start)
+        return response
+    
+    return conditional_response(build, etag, 'no-cache' if meta['stale'] else NEWS_HTTP_CACHE_CONTROL)
 
 
 @app.route('/api/news', methods=['GET'])
@@ -234,34 +1610,165 @@ def api_news():
     """
     Endpoint de API para obtener noticias en formato JSON usando APITube.io
     """
-    query = request.args.get('q', '')
-    country = request.args.get('country', '')
-    language = request.args.get('language', 'es')
-    category = request.args.get('category', 'general')
+    try:
+        params = read_news_args()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    articles, error_message = fetch_news(query, country, language, category)
+    if request.args.get('format') == 'ndjson':
+        return stream_news_response(*params)
     
-    if error_message:
-        return jsonify({'error': error_message}), 500
+    articles, error_message, meta = get_news(*params)
+    
+    return news_response(params, articles, error_message, meta)
+
+
+async def api_news_async():
+    """
+    Versión asíncrona de api_news(); se activa con ASYNC_VIEWS=1
+    """
+    try:
+        params = read_news_args()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if request.args.get('format') == 'ndjson':
+        return stream_news_response(*params)
+    
+    articles, error_message, meta = await get_news_async(*params)
+    
+    return news_response(params, articles, error_message, meta)
+
+
+# Con ASYNC_VIEWS=1 las rutas principales usan las vistas asíncronas
+# (Flask necesita asgiref para ejecutarlas: pip install "Flask[async]")
+if ASYNC_VIEWS:
+    app.view_functions['index'] = index_async
+    app.view_functions['api_news'] = api_news_async
+
+
+def _batch_item_params(item):
+    """
+    Valida un elemento del lote y devuelve sus parámetros normalizados para get_news
+    """
+    if not isinstance(item, dict):
+        raise ValueError('Cada elemento debe ser un objeto JSON')
+    try:
+        page_size = int(item.get('limit', 20))
+        page = int(item.get('page', 1))
+    except (TypeError, ValueError):
+        raise ValueError("'limit' y 'page' deben ser números enteros") from None
+    if page_size < 1 or page < 1:
+        raise ValueError("'limit' y 'page' deben ser mayores que cero")
+    country, language, category = lookups.validate(
+        str(item.get('country', '') or ''),
+        str(item.get('language', 'es') or ''),
+        str(item.get('category', 'general') or 'general')
+    )
+    return {
+        'query': str(item.get('q', '') or ''),
+        'country': country,
+        'language': language,
+        'category': category,
+        'page_size': page_size,
+        'page': page
+    }
+
+
+def _run_batch_item(params):
+    start = time.perf_counter()
+    articles, error_message, meta = get_news(**params)
+    NEWS_LOOKUPS.labels('error' if error_message else meta['cache']).inc()
+    return articles, error_message, meta, (time.perf_counter() - start) * 1000
+
+
+@app.route('/api/news/batch', methods=['POST'])
+def api_news_batch():
+    """
+    Endpoint para obtener varias búsquedas de noticias en paralelo
+
+    Recibe {"requests": [{"q": ..., "country": ..., "language": ..., "category": ...,
+    "limit": ...}, ...]} y devuelve un resultado por elemento, con su error y su tiempo.
+    """
+    payload = request.get_json(silent=True)
+    items = payload.get('requests') if isinstance(payload, dict) else payload
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': "Se esperaba una lista no vacía en 'requests'"}), 400
+    if len(items) > NEWS_BATCH_MAX_ITEMS:
+        return jsonify({'error': f'Máximo {NEWS_BATCH_MAX_ITEMS} elementos por lote'}), 400
     
+    start = time.perf_counter()
+    results = [None] * len(items)
+    futures = {}
+    for index, item in enumerate(items):
+        try:
+            params = _batch_item_params(item)
+        except ValueError as e:
+            results[index] = {'request': item, 'status': 'error', 'error': str(e)}
+            continue
+        futures[batch_executor.submit(profiler.bind(_run_batch_item), params)] = (index, item)
+    
+    done, not_done = wait(futures, timeout=NEWS_BATCH_TIMEOUT)
+    for future in not_done:
+        index, item = futures[future]
+        future.cancel()
+        results[index] = {'request': item, 'status': 'error', 'error': 'Tiempo de espera agotado'}
+    for future in done:
+        index, item = futures[future]
+        try:
+            articles, error_message, meta, elapsed_ms = future.result()
+        except Exception as e:
+            logger.error(f"Error en elemento del lote {item}: {str(e)}")
+            results[index] = {'request': item, 'status': 'error', 'error': f'Error inesperado: {str(e)}'}
+            continue
+        result = {
+            'request': item,
+            'status': 'error' if error_message else 'success',
+            'elapsedMs': round(elapsed_ms, 1),
+            'cache': meta['cache']
+        }
+        if error_message:
+            result['error'] = error_message
+            if 'retry_after' in meta:
+                result['retryAfter'] = math.ceil(meta['retry_after'])
+        else:
+            result.update({
+                'totalResults': meta['total'],
+                'page': meta['page'],
+                'stale': meta['stale'],
+                'articles': list(articles)
+            })
+        results[index] = result
+    
+    failed = sum(1 for result in results if result['status'] == 'error')
     return jsonify({
-        'status': 'success',
-        'totalResults': len(articles),
-        'articles': articles
+        'status': 'success' if not failed else ('error' if failed == len(results) else 'partial'),
+        'elapsedMs': round((time.perf_counter() - start) * 1000, 1),
+        'errors': failed,
+        'results': results
     })
 
 
+def lookup_response(lookup):
+    """
+    Respuesta de una tabla fija con su JSON y ETag precalculados
+    """
+    return conditional_response(
+        lambda: app.response_class(lookup.body, mimetype='application/json'),
+        lookup.etag,
+        LOOKUP_HTTP_CACHE_CONTROL
+    )
+
+
 @app.route('/api/categories', methods=['GET'])
 def api_categories():
     """
     Endpoint de API para obtener categorías disponibles
     """
-    categories = fetch_categories()
+    if not APITUBE_API_KEY:
+        return jsonify({'status': 'success', 'categories': []})
     
-    return jsonify({
-        'status': 'success',
-        'categories': categories
-    })
+    return lookup_response(lookups.categories_response)
 
 
 @app.route('/api/countries', methods=['GET'])
@@ -269,12 +1776,7 @@ def api_countries():
     """
     Endpoint de API para obtener países disponibles
     """
-    countries = get_countries()
-    
-    return jsonify({
-        'status': 'success',
-        'countries': countries
-    })
+    return lookup_response(lookups.countries_response)
 
 
 @app.route('/health', methods=['GET'])
@@ -289,17 +1791,72 @@ def health_check():
         'api_key_configured': bool(APITUBE_API_KEY),
         'api_key_length': len(APITUBE_API_KEY) if APITUBE_API_KEY else 0,
         'api_key_format': 'Valid' if APITUBE_API_KEY and len(APITUBE_API_KEY) > 20 else 'Invalid',
+        'upstream_pool': get_client().pool_stats(),
+        'upstream_async_pool': async_pool_stats(),
+        'upstream_fixtures': get_fixtures().stats() if get_fixtures() is not None else None,
+        'news_cache': news_cache.stats(),
+        'news_fetches': news_flight.stats(),
+        'feed_warmer': feed_warmer.stats(),
+        'article_store': article_store.stats() if article_store is not None else None,
+        'article_ingester': article_ingester.stats() if article_ingester is not None else None,
+        'search_index': search_index.stats() if search_index is not None else None,
+        'json_backend': news_json.backend.name,
+        'upstream_budgets': upstream_limiter.stats(),
+        'upstream_circuit': upstream_breaker.stats(),
+        'upstream_hedging': upstream_hedger.stats(),
+        'response_compression': compressed_bodies.stats(),
+        'html_fragments': fragment_cache.stats(),
+        'profiler': profiler.stats(),
         'endpoints_available': [
             '/',
             '/api/news',
+            '/api/news/batch',
             '/api/categories', 
             '/api/countries',
             '/health',
+            '/metrics',
             '/test-api'
         ]
     })
 
 
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """
+    Métricas en el formato de texto de Prometheus
+    """
+    if not NEWS_METRICS:
+        return jsonify({'error': 'Las métricas están desactivadas (NEWS_METRICS=0)'}), 404
+    return no_store(Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8'))
+
+
+@app.route('/admin/profile', methods=['GET', 'DELETE'])
+def admin_profile():
+    """
+    Perfil por muestreo: los ?top=N marcos más calientes (?sort=self|total),
+    las pilas colapsadas para un flamegraph (?format=collapsed) o, con DELETE, vaciarlo
+
+    Requiere el token de X-News-Profile en esa cabecera o en ?token=.
+    """
+    if not profile_token_valid(request.headers.get('X-News-Profile') or request.args.get('token')):
+        return jsonify({
+            'error': 'Se necesita un token X-News-Profile válido (python news_profiler.py token)'
+                     if NEWS_PROFILE_SIGNED else 'Configura SECRET_KEY para usar el perfilador'
+        }), 403
+    if request.method == 'DELETE':
+        profiler.reset()
+        return no_store(jsonify({'status': 'reset'}))
+    if request.args.get('format') == 'collapsed':
+        return no_store(Response(profiler.collapsed(), content_type='text/plain; charset=utf-8'))
+    top = min(max(request.args.get('top', 20, type=int), 1), 200)
+    sort = 'total' if request.args.get('sort') == 'total' else 'self'
+    return no_store(jsonify({
+        'profiler': profiler.stats(),
+        'sort': sort,
+        'top': profiler.top(top, sort)
+    }))
+
+
 @app.route('/test-api', methods=['GET'])
 def test_api_connection():
     """
@@ -312,12 +1869,6 @@ def test_api_connection():
             'solution': 'Configura la variable APITUBE_API_KEY en Vercel'
         }), 500
     
-    # Configurar headers de prueba
-    headers = {
-        'X-API-Key': APITUBE_API_KEY,
-        'Content-Type': 'application/json'
-    }
-    
     # Parámetros de prueba mínimos
     params = {
         'limit': 1,
@@ -325,7 +1876,7 @@ def test_api_connection():
     }
     
     try:
-        response = requests.get(APITUBE_BASE_URL, params=params, headers=headers, timeout=10)
+        response = upstream_get(APITUBE_BASE_URL, params, timeout=10, budget='diagnostics', check_limits=False)
         
         return jsonify({
             'status': 'success',
@@ -337,6 +1888,8 @@ def test_api_connection():
             'timestamp': datetime.now().isoformat()
         })
         
+    except UPSTREAM_UNAVAILABLE as e:
+        return retry_later_response(str(e), e.retry_after, e.status_code)
     except requests.exceptions.RequestException as e:
         return jsonify({
             'status': 'error',
@@ -356,12 +1909,6 @@ def debug_search():
     language = request.args.get('language', 'es')
     category = request.args.get('category', 'general')
     
-    # Configurar headers de autenticación
-    headers = {
-        'X-API-Key': APITUBE_API_KEY,
-        'Content-Type': 'application/json'
-    }
-    
     # Parámetros de prueba
     params = {
         'q': query,
@@ -379,7 +1926,7 @@ def debug_search():
         logger.info(f"Probando URL: {APITUBE_BASE_URL}")
         logger.info(f"Con parámetros: {params}")
         
-        response = requests.get(APITUBE_BASE_URL, params=params, headers=headers, timeout=15)
+        response = upstream_get(APITUBE_BASE_URL, params, timeout=15, budget='diagnostics', check_limits=False)
         
         debug_info = {
             'url': response.url,
@@ -405,6 +1952,8 @@ def debug_search():
             
         return jsonify(debug_info)
         
+    except UPSTREAM_UNAVAILABLE as e:
+        return retry_later_response(str(e), e.retry_after, e.status_code)
     except Exception as e:
         return jsonify({
             'error': str(e),
@@ -0,0 +1,430 @@
+"""
+Almacén local de artículos con ingesta incremental
+
+Los artículos descargados de APITube.io se guardan en SQLite, deduplicados
+por URL canónica y por hash del contenido, y etiquetados con el feed
+(idioma, país, categoría) del que llegaron. Un ingestor en segundo plano
+consulta cada feed y solo baja páginas hasta alcanzar la marca de agua de
+published_at de la consulta anterior. /api/news puede servir desde aquí las
+búsquedas sin texto cuyo feed esté al día, sin tocar el upstream.
+"""
+
+import hashlib
+import logging
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from cache_backends import serialize_value, deserialize_value
+
+logger = logging.getLogger(__name__)
+
+# Parámetros de seguimiento que no cambian el artículo al que apunta la URL
+_TRACKING_PARAMS = ('utm_', 'fbclid', 'gclid', 'mc_cid', 'mc_eid', 'ref', 'ocid')
+_SPACES = re.compile(r'\s+')
+
+
+def canonical_url(url):
+    """
+    URL sin fragmento, sin parámetros de seguimiento y con esquema/host en minúsculas
+    """
+    if not url:
+        return ''
+    parts = urlsplit(url.strip())
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+             if not k.lower().startswith(_TRACKING_PARAMS)]
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, urlencode(sorted(query)), ''))
+
+
+def content_hash(article):
+    """
+    Hash del título y la descripción normalizados (detecta copias bajo otra URL)
+    """
+    text = ' '.join((article.get('title') or '', article.get('description') or ''))
+    text = _SPACES.sub(' ', text).strip().lower()
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def normalize_published_at(value):
+    """
+    Convierte published_at a ISO 8601 en UTC ('2024-05-01T10:30:00Z') para ordenar como texto
+    """
+    if not value:
+        return None
+    try:
+        date = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except (TypeError, ValueError):
+        return None
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return date.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def feed_name(endpoint, language, country, category):
+    return f'{endpoint}:{language}:{country}:{category}'
+
+
+class ArticleStore:
+    """
+    Artículos normalizados en SQLite, consultables por (idioma, país, categoría)
+    """
+
+    def __init__(self, path, retention_days=7, clock=time.time):
+        self.path = path
+        self.retention = retention_days * 86400
+        self.clock = clock
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS articles ('
+                ' id INTEGER PRIMARY KEY,'
+                ' url TEXT NOT NULL UNIQUE,'
+                ' content_hash TEXT NOT NULL UNIQUE,'
+                ' published_at TEXT NOT NULL,'
+                ' data BLOB NOT NULL,'
+                ' ingested_at REAL NOT NULL,'
+                ' body TEXT)'
+            )
+            # Almacenes creados antes de guardar el cuerpo completo (se indexa al reconstruir)
+            if 'body' not in {row[1] for row in conn.execute('PRAGMA table_info(articles)')}:
+                conn.execute('ALTER TABLE articles ADD COLUMN body TEXT')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS article_feeds ('
+                ' language TEXT NOT NULL,'
+                ' country TEXT NOT NULL,'
+                ' category TEXT NOT NULL,'
+                ' published_at TEXT NOT NULL,'
+                ' article_id INTEGER NOT NULL,'
+                ' PRIMARY KEY (language, country, category, published_at, article_id))'
+                ' WITHOUT ROWID'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS article_feeds_article ON article_feeds (article_id)')
+            conn.execute('CREATE INDEX IF NOT EXISTS articles_published ON articles (published_at)')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS ingest_state ('
+                ' feed TEXT PRIMARY KEY,'
+                ' language TEXT NOT NULL,'
+                ' country TEXT NOT NULL,'
+                ' category TEXT NOT NULL,'
+                ' high_water TEXT,'
+                ' last_success REAL,'
+                ' last_error TEXT,'
+                ' ingested INTEGER NOT NULL DEFAULT 0,'
+                ' duplicates INTEGER NOT NULL DEFAULT 0)'
+            )
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA mmap_size=67108864')
+            self._local.conn = conn
+        return conn
+
+    def high_water(self, feed):
+        row = self._connect().execute(
+            'SELECT high_water FROM ingest_state WHERE feed = ?', (feed,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def add_articles(self, language, country, category, items, on_added=None):
+        """
+        Guarda los pares (artículo crudo, artículo normalizado) de un feed
+
+        Devuelve (nuevos, duplicados). Un duplicado que llega por otro feed
+        solo añade la etiqueta de ese feed. on_added(id, crudo, normalizado)
+        se llama por cada artículo nuevo.
+        """
+        now = self.clock()
+        fallback = datetime.fromtimestamp(now, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        added = duplicates = 0
+        conn = self._connect()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            for raw, article in items:
+                url = canonical_url(raw.get('href') or article.get('url'))
+                if not url:
+                    continue
+                digest = content_hash(article)
+                published_at = normalize_published_at(raw.get('published_at')) or fallback
+                row = conn.execute(
+                    'SELECT id, published_at FROM articles WHERE url = ? OR content_hash = ?',
+                    (url, digest)
+                ).fetchone()
+                if row:
+                    article_id, published_at = row
+                    duplicates += 1
+                else:
+                    article_id = conn.execute(
+                        'INSERT INTO articles (url, content_hash, published_at, data, ingested_at, body)'
+                        ' VALUES (?, ?, ?, ?, ?, ?)',
+                        (url, digest, published_at, serialize_value(article), now, raw.get('body'))
+                    ).lastrowid
+                    added += 1
+                    if on_added is not None:
+                        on_added(article_id, raw, article)
+                conn.execute(
+                    'INSERT OR IGNORE INTO article_feeds (language, country, category, published_at, article_id)'
+                    ' VALUES (?, ?, ?, ?, ?)',
+                    (language, country, category, published_at, article_id)
+                )
+        return added, duplicates
+
+    def record_ingest(self, feed, language, country, category, high_water=None, error=None,
+                      added=0, duplicates=0):
+        now = self.clock()
+        conn = self._connect()
+        conn.execute(
+            'INSERT OR IGNORE INTO ingest_state (feed, language, country, category) VALUES (?, ?, ?, ?)',
+            (feed, language, country, category)
+        )
+        if error:
+            conn.execute('UPDATE ingest_state SET last_error = ? WHERE feed = ?', (error, feed))
+        else:
+            conn.execute(
+                'UPDATE ingest_state SET high_water = MAX(COALESCE(high_water, \'\'), ?),'
+                ' last_success = ?, last_error = NULL, ingested = ingested + ?,'
+                ' duplicates = duplicates + ? WHERE feed = ?',
+                (high_water or '', now, added, duplicates, feed)
+            )
+
+    def covers(self, language, country, category, max_age):
+        """
+        True si algún feed con esas etiquetas se ingirió con éxito hace menos de max_age segundos
+        """
+        row = self._connect().execute(
+            'SELECT MAX(last_success) FROM ingest_state WHERE language = ? AND country = ? AND category = ?',
+            (language, country, category)
+        ).fetchone()
+        return bool(row and row[0] and self.clock() - row[0] <= max_age)
+
+    def query(self, language, country, category, page_size=20, page=1, max_age=900):
+        """
+        Página de artículos más recientes de un feed al día
+
+        Devuelve {'articles', 'total', 'page', 'has_next'} o None si el
+        almacén no puede responder (feed no ingerido, desactualizado o página
+        fuera de lo almacenado).
+        """
+        try:
+            if not self.covers(language, country, category, max_age):
+                return None
+            conn = self._connect()
+            total = conn.execute(
+                'SELECT COUNT(*) FROM article_feeds WHERE language = ? AND country = ? AND category = ?',
+                (language, country, category)
+            ).fetchone()[0]
+            offset = (page - 1) * page_size
+            if offset >= total:
+                return None
+            rows = conn.execute(
+                'SELECT a.data FROM article_feeds f JOIN articles a ON a.id = f.article_id'
+                ' WHERE f.language = ? AND f.country = ? AND f.category = ?'
+                ' ORDER BY f.published_at DESC, f.article_id DESC LIMIT ? OFFSET ?',
+                (language, country, category, page_size, offset)
+            ).fetchall()
+        except sqlite3.Error as e:
+            logger.warning(f"Error consultando el almacén de artículos: {str(e)}")
+            return None
+        return {
+            'articles': [deserialize_value(data) for data, in rows],
+            'total': total,
+            'page': page,
+            'has_next': offset + page_size < total
+        }
+
+    def get_articles(self, ids):
+        """
+        Artículos normalizados en el mismo orden que ids (se omiten los que ya no existen)
+        """
+        found = {}
+        conn = self._connect()
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            rows = conn.execute(
+                f'SELECT id, data FROM articles WHERE id IN ({",".join("?" * len(chunk))})', chunk
+            )
+            found.update((article_id, deserialize_value(data)) for article_id, data in rows)
+        return [found[article_id] for article_id in ids if article_id in found]
+
+    def filter_tagged(self, ids, language, country, category):
+        """
+        Conserva, en orden, los ids etiquetados con ese feed
+        """
+        tagged = set()
+        conn = self._connect()
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            tagged.update(row[0] for row in conn.execute(
+                'SELECT article_id FROM article_feeds WHERE language = ? AND country = ? AND category = ?'
+                f' AND article_id IN ({",".join("?" * len(chunk))})',
+                [language, country, category] + list(chunk)
+            ))
+        return [article_id for article_id in ids if article_id in tagged]
+
+    def iter_articles(self):
+        """
+        Recorre (id, idioma, artículo normalizado, cuerpo completo) de todo el almacén
+
+        El cuerpo es el texto que indexa la ingesta; en filas guardadas antes de
+        existir la columna se usa el extracto del artículo.
+        """
+        rows = self._connect().execute(
+            'SELECT a.id, MIN(f.language), a.data, a.body FROM articles a'
+            ' JOIN article_feeds f ON f.article_id = a.id GROUP BY a.id'
+        )
+        for article_id, language, data, body in rows:
+            article = deserialize_value(data)
+            yield article_id, language, article, body if body is not None else article.get('content')
+
+    def prune(self):
+        """
+        Borra los artículos publicados antes del periodo de retención; devuelve sus ids
+        """
+        cutoff = datetime.fromtimestamp(self.clock() - self.retention, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        conn = self._connect()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            removed = [row[0] for row in conn.execute('SELECT id FROM articles WHERE published_at < ?', (cutoff,))]
+            conn.execute('DELETE FROM article_feeds WHERE published_at < ?', (cutoff,))
+            conn.execute('DELETE FROM articles WHERE published_at < ?', (cutoff,))
+        return removed
+
+    def stats(self):
+        try:
+            conn = self._connect()
+            articles = conn.execute('SELECT COUNT(*) FROM articles').fetchone()[0]
+            now = self.clock()
+            feeds = [
+                {
+                    'feed': feed,
+                    'high_water': high_water,
+                    'age_seconds': round(now - last_success, 1) if last_success else None,
+                    'ingested': ingested,
+                    'duplicates': duplicates,
+                    'last_error': last_error,
+                }
+                for feed, high_water, last_success, ingested, duplicates, last_error in conn.execute(
+                    'SELECT feed, high_water, last_success, ingested, duplicates, last_error'
+                    ' FROM ingest_state ORDER BY feed'
+                )
+            ]
+        except sqlite3.Error as e:
+            return {'path': self.path, 'error': str(e)}
+        return {'path': self.path, 'articles': articles, 'feeds': feeds}
+
+
+class ArticleIngester:
+    """
+    Consulta periódicamente los feeds y guarda en el almacén los artículos nuevos
+
+    feeds es una lista de (endpoint, language, country, category).
+    fetch_page(endpoint, language, country, category, page) devuelve
+    (resultados_crudos, hay_mas, error) y normalize_page(resultados) los
+    pares (crudo, normalizado) de los artículos válidos. Si se pasa un índice de búsqueda, los artículos
+    nuevos se indexan al llegar y el índice se guarda tras cada pasada.
+    """
+
+    def __init__(self, store, fetch_page, normalize_page, feeds, interval=300, max_pages=3, index=None):
+        self.store = store
+        self.index = index
+        self.fetch_page = fetch_page
+        self.normalize_page = normalize_page
+        self.feeds = feeds
+        self.interval = interval
+        self.max_pages = max_pages
+        self.runs = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def ingest_feed(self, endpoint, language, country, category):
+        """
+        Baja páginas hasta encontrar una sin artículos nuevos; devuelve (nuevos, duplicados)
+        """
+        feed = feed_name(endpoint, language, country, category)
+        mark = self.store.high_water(feed) or ''
+        newest = mark
+        added = duplicates = 0
+        for page in range(1, self.max_pages + 1):
+            results, has_next, error = self.fetch_page(endpoint, language, country, category, page)
+            if error:
+                logger.warning(f"Ingesta fallida de {feed}: {error}")
+                self.store.record_ingest(feed, language, country, category, error=error)
+                return added, duplicates
+            items = self.normalize_page(results)
+            fresh = False
+            for raw, _ in items:
+                published_at = normalize_published_at(raw.get('published_at')) or ''
+                if published_at > mark or not mark:
+                    fresh = True
+                newest = max(newest, published_at)
+            page_added, page_duplicates = self.store.add_articles(
+                language, country, category, items, on_added=self._index_article(language)
+            )
+            added += page_added
+            duplicates += page_duplicates
+            # Una página sin nada posterior a la marca indica que ya está todo ingerido
+            if not fresh or not has_next:
+                break
+        self.store.record_ingest(feed, language, country, category, high_water=newest,
+                                 added=added, duplicates=duplicates)
+        return added, duplicates
+
+    def _index_article(self, language):
+        if self.index is None:
+            return None
+
+        def index_article(article_id, raw, article):
+            self.index.add(article_id, language, article.get('title'), article.get('description'),
+                           raw.get('body'))
+        return index_article
+
+    def run_once(self):
+        added = 0
+        for endpoint, language, country, category in self.feeds:
+            if self._stop.is_set():
+                break
+            try:
+                added += self.ingest_feed(endpoint, language, country, category)[0]
+            except Exception as e:
+                logger.error(f"Error en la ingesta de {feed_name(endpoint, language, country, category)}: {str(e)}")
+        removed = self.store.prune()
+        if self.index is not None:
+            for article_id in removed:
+                self.index.remove(article_id)
+            if self.index.dirty and self.index.path:
+                self.index.save()
+        self.runs += 1
+        logger.info(f"Ingesta completada: {added} artículos nuevos")
+        return added
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Error en el ingestor de artículos: {str(e)}")
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='article-ingester', daemon=True)
+            self._thread.start()
+            logger.info(f"Ingestor de artículos iniciado con {len(self.feeds)} feeds")
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        return {
+            'running': self._thread is not None and not self._stop.is_set(),
+            'interval': self.interval,
+            'runs': self.runs,
+            'feeds': len(self.feeds),
+        }
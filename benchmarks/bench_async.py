@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Benchmark: ruta síncrona (requests + hilos) frente a la asíncrona (asyncio)
+
+Lanza un APITube.io simulado en otro proceso y mide peticiones por segundo
+de fetch_news / fetch_news_async con 100 y 1000 clientes concurrentes. La
+ruta síncrona se limita a --workers hilos, como un servidor WSGI con un
+número fijo de workers; la asíncrona atiende a todos los clientes a la vez.
+
+Uso:
+    python benchmarks/bench_async.py --latency 0.05 --clients 100 1000
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import mock_apitube  # noqa: E402
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(round(pct / 100.0 * (len(values) - 1))))
+    return values[index]
+
+
+def summarize(name, clients, latencies, elapsed, errors):
+    total = len(latencies)
+    return {
+        'path': name,
+        'clients': clients,
+        'requests': total,
+        'errors': errors,
+        'rps': round(total / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 1),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 1),
+        'mean_ms': round(statistics.mean(latencies) * 1000, 1) if latencies else 0.0,
+    }
+
+
+def bench_sync(app, clients, per_client, workers):
+    def one():
+        start = time.perf_counter()
+        articles, error = app.fetch_news('bench', '', 'es', 'general')
+        return time.perf_counter() - start, error
+
+    total = clients * per_client
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=min(clients, workers)) as pool:
+        results = list(pool.map(lambda _: one(), range(total)))
+    elapsed = time.perf_counter() - start
+    latencies = [latency for latency, _ in results]
+    errors = sum(1 for _, error in results if error)
+    return summarize('sync', clients, latencies, elapsed, errors)
+
+
+def bench_async(app, apitube_client, clients, per_client):
+    loop, _ = apitube_client._get_async_runtime()
+    latencies = []
+    errors = []
+
+    async def client():
+        for _ in range(per_client):
+            start = time.perf_counter()
+            articles, error = await app.fetch_news_async('bench', '', 'es', 'general')
+            latencies.append(time.perf_counter() - start)
+            if error:
+                errors.append(error)
+
+    async def run():
+        await asyncio.gather(*(client() for _ in range(clients)))
+
+    start = time.perf_counter()
+    asyncio.run_coroutine_threadsafe(run(), loop).result()
+    elapsed = time.perf_counter() - start
+    return summarize('async', clients, latencies, elapsed, len(errors))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--clients', type=int, nargs='+', default=[100, 1000])
+    parser.add_argument('--per-client', type=int, default=3, help='peticiones por cliente')
+    parser.add_argument('--workers', type=int, default=32, help='hilos de la ruta síncrona')
+    parser.add_argument('--latency', type=float, default=0.05, help='latencia del upstream simulado')
+    parser.add_argument('--articles', type=int, default=20)
+    args = parser.parse_args()
+
+    process, url = mock_apitube.start_in_process(latency=args.latency, articles=args.articles)
+    os.environ.setdefault('APITUBE_API_KEY', 'at_benchmark_key_0000000000000000')
+    os.environ['APITUBE_POOL_MAXSIZE'] = str(args.workers)
+    os.environ['APITUBE_ASYNC_MAX_CONNECTIONS'] = str(max(args.clients))
+    os.environ['APITUBE_ASYNC_MAX_KEEPALIVE'] = str(max(args.clients))
+    # Sin límite de llamadas propio: se mide el cliente del upstream, no el presupuesto
+    for budget in ('NEWS', 'BACKGROUND', 'INGEST', 'DIAGNOSTICS'):
+        os.environ.setdefault(f'APITUBE_BUDGET_{budget}', '1000000')
+    # Páginas completas (los artículos simulados se parecen tanto que se agruparían)
+    os.environ.setdefault('NEWS_DEDUPE', '0')
+
+    import logging
+    logging.disable(logging.INFO)
+    import app
+    import apitube_client
+    app.APITUBE_BASE_URL = url
+
+    print(f"🏁 Upstream simulado: {url} (latencia {args.latency}s, {args.articles} artículos)")
+    print(f"{'ruta':<6} {'clientes':>8} {'peticiones':>10} {'errores':>7} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    try:
+        for clients in args.clients:
+            for result in (bench_sync(app, clients, args.per_client, args.workers),
+                           bench_async(app, apitube_client, clients, args.per_client)):
+                print(f"{result['path']:<6} {result['clients']:>8} {result['requests']:>10} "
+                      f"{result['errors']:>7} {result['rps']:>9} {result['p50_ms']:>8} {result['p99_ms']:>8}")
+    finally:
+        process.terminate()
+
+
+if __name__ == '__main__':
+    main()
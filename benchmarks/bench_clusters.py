@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la agrupación de casi duplicados (MinHash + LSH)
+
+Genera N artículos sintéticos en los que una parte son copias de la misma
+nota de agencia con pequeñas ediciones (titular retocado, palabras
+cambiadas, párrafo recortado) y mide tiempo, artículos por segundo y la
+calidad de la agrupación frente a la verdad conocida.
+
+Uso:
+    python benchmarks/bench_clusters.py --articles 10000 50000 100000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from news_clusters import collapse_duplicates, cluster, article_text  # noqa: E402
+
+VOCABULARY = ('gobierno economía fútbol elecciones Madrid tecnología inflación mercado salud '
+              'vivienda precios empresas clima energía presidente liga banco ciencia educación '
+              'ministro reforma acuerdo datos crecimiento empleo sector europa ciudad proyecto '
+              'informe tribunal policía investigación campaña partido votos congreso ley').split()
+
+
+def make_story(rng, words=60):
+    return {
+        'title': ' '.join(rng.choices(VOCABULARY, k=9)).capitalize(),
+        'description': ' '.join(rng.choices(VOCABULARY, k=25)),
+        'content': ' '.join(rng.choices(VOCABULARY, k=words))[:200] + '...',
+    }
+
+
+def syndicate(rng, story):
+    """
+    Copia de una nota con ediciones menores, como la publicaría otra fuente
+    """
+    description = story['description'].split()
+    for _ in range(2):
+        description[rng.randrange(len(description))] = rng.choice(VOCABULARY)
+    title = story['title'] + rng.choice(['', ' | Última hora', ' - EFE', ':'])
+    return {'title': title, 'description': ' '.join(description), 'content': story['content']}
+
+
+def make_articles(count, duplicate_ratio=0.4, seed=0):
+    rng = random.Random(seed)
+    articles, truth = [], []
+    stories = []
+    while len(articles) < count:
+        if stories and rng.random() < duplicate_ratio:
+            story_id = rng.randrange(len(stories))
+            articles.append(syndicate(rng, stories[story_id]))
+        else:
+            story_id = len(stories)
+            stories.append(make_story(rng))
+            articles.append(dict(stories[story_id]))
+        truth.append(story_id)
+    return articles, truth
+
+
+def quality(truth, assigned):
+    """
+    Precisión y exhaustividad sobre pares 'es duplicado de su representante'
+    """
+    first_of_story = {}
+    expected = set()
+    for index, story in enumerate(truth):
+        root = first_of_story.setdefault(story, index)
+        if root != index:
+            expected.add(index)
+    predicted = {index for index, root in enumerate(assigned) if root != index}
+    correct = sum(1 for index in predicted if truth[assigned[index]] == truth[index])
+    precision = correct / len(predicted) if predicted else 1.0
+    recall = correct / len(expected) if expected else 1.0
+    return precision, recall
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--articles', type=int, nargs='+', default=[10000, 50000, 100000])
+    parser.add_argument('--duplicates', type=float, default=0.4, help='fracción de copias sindicadas')
+    args = parser.parse_args()
+
+    print(f"{'artículos':>9} {'grupos':>7} {'ms':>8} {'µs/art':>7} {'art/s':>9} {'precisión':>9} {'exhaust.':>8}")
+    for count in args.articles:
+        articles, truth = make_articles(count, args.duplicates)
+        start = time.perf_counter()
+        assigned = cluster([article_text(article) for article in articles])
+        elapsed = time.perf_counter() - start
+        precision, recall = quality(truth, assigned)
+        groups = len(set(assigned))
+        print(f"{count:>9} {groups:>7} {elapsed * 1000:>8.0f} {elapsed / count * 1e6:>7.1f} "
+              f"{count / elapsed:>9.0f} {precision:>9.3f} {recall:>8.3f}")
+
+    # Coste en una página normal de resultados
+    articles, _ = make_articles(50, args.duplicates, seed=1)
+    start = time.perf_counter()
+    for _ in range(100):
+        collapse_duplicates(articles)
+    print(f"página de 50 artículos: {(time.perf_counter() - start) * 10:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark de compresión de respuestas: tamaño y latencia de /api/news y /
+
+Para páginas de 20 y 50 artículos (cuerpos de APITube.io simulados ya en
+la caché de noticias) mide el tamaño sin comprimir, con gzip y con brotli
+(si está instalado), el coste de comprimir, y la latencia por petición con
+el cliente de pruebas de Flask: sin compresión, comprimiendo en cada
+petición y sirviendo el cuerpo comprimido guardado para el ETag.
+
+Uso:
+    python benchmarks/bench_compress.py --articles 20 50 --requests 300
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+os.environ.setdefault('APITUBE_API_KEY', 'benchmark')
+# Páginas completas (los artículos simulados se parecen tanto que se agruparían) y sin red
+os.environ.setdefault('NEWS_DEDUPE', '0')
+os.environ.setdefault('NEWS_PREFETCH_PAGES', '0')
+import mock_apitube  # noqa: E402
+
+logging.disable(logging.INFO)
+import app  # noqa: E402
+import news_compress  # noqa: E402
+
+
+def prime_cache(count):
+    """
+    Deja en la caché la página de count artículos que pedirán /api/news?limit=count y /
+    """
+    result, error = app._news_page(mock_apitube.make_payload(count), count, 1)
+    assert not error, error
+    app.news_cache.set(app.news_cache_key('', '', 'es', 'general', count, 1), result)
+    app.news_cache.set(app.news_cache_key('', '', 'es', 'general', app.INDEX_PAGE_SIZE, 1), result)
+
+
+def per_request(client, path, encoding, requests, cached):
+    headers = {'Accept-Encoding': encoding} if encoding else {}
+    client.get(path, headers=headers)
+    best = float('inf')
+    for _ in range(requests):
+        if not cached:
+            app.compressed_bodies = news_compress.CompressedBodies()
+        start = time.perf_counter()
+        response = client.get(path, headers=headers)
+        best = min(best, time.perf_counter() - start)
+    return best * 1e6, len(response.data)
+
+
+def compress_cost(data, encoding, repeat=50):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        news_compress.compress(data, encoding)
+        best = min(best, time.perf_counter() - start)
+    return best * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--articles', type=int, nargs='+', default=[20, 50])
+    parser.add_argument('--requests', type=int, default=300)
+    args = parser.parse_args()
+
+    client = app.app.test_client()
+    encodings = news_compress.available_encodings()
+    if 'br' not in encodings:
+        print('(brotli no está instalado; solo gzip)')
+    print(f"{'ruta':<22} {'codificación':<13} {'bytes':>8} {'comprimir µs':>13} "
+          f"{'µs/petición':>12} {'µs cacheado':>12}")
+    for count in args.articles:
+        prime_cache(count)
+        # La página HTML siempre tiene INDEX_PAGE_SIZE artículos: se mide solo una vez
+        paths = [f'/api/news?limit={count}'] + (['/'] if count == app.INDEX_PAGE_SIZE else [])
+        for path in paths:
+            plain = client.get(path).data
+            elapsed, size = per_request(client, path, None, args.requests, cached=True)
+            print(f"{path:<22} {'identity':<13} {size:>8} {'-':>13} {elapsed:>12.1f} {'-':>12}")
+            for encoding in encodings:
+                cost = compress_cost(plain, encoding)
+                elapsed, size = per_request(client, path, encoding, args.requests, cached=False)
+                cached, _ = per_request(client, path, encoding, args.requests, cached=True)
+                print(f"{path:<22} {encoding:<13} {size:>8} {cost:>13.1f} {elapsed:>12.1f} {cached:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
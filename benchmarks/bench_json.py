@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: JSON de la biblioteca estándar frente a orjson y msgspec
+
+Decodificación: una página de APITube.io (50 artículos con cuerpo completo
+y los campos que el proyecto no usa: entidades, temas, sentimiento...)
+hasta los artículos normalizados, con json.loads + normalize_articles y con
+decode_news_page de cada backend. Codificación: la respuesta de /api/news
+(50 artículos normalizados) a bytes, con json.dumps y con cada backend.
+Los backends que no estén instalados se omiten.
+
+Uso:
+    python benchmarks/bench_json.py --articles 50 --body-size 4000
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import mock_apitube  # noqa: E402
+
+logging.disable(logging.INFO)
+import app  # noqa: E402
+import news_json  # noqa: E402
+
+
+def upstream_payload(count, body_size):
+    """
+    Respuesta sintética con los campos extra que devuelve APITube.io por artículo
+    """
+    results = mock_apitube.make_results(count, body_size)
+    for i, article in enumerate(results):
+        article.update({
+            'author': {'id': i, 'name': f'Autor {i % 30}'},
+            'categories': [{'id': c, 'name': f'categoría {c}', 'score': 0.5} for c in range(4)],
+            'topics': [{'id': t, 'name': f'tema {t}', 'score': 0.3} for t in range(6)],
+            'entities': [
+                {'id': e, 'name': f'Entidad {e}', 'type': 'organization', 'frequency': e + 1,
+                 'links': {'wikipedia': f'https://es.wikipedia.org/wiki/Entidad_{e}'}}
+                for e in range(12)
+            ],
+            'sentiment': {'overall': {'score': 0.1, 'polarity': 'neutral'},
+                          'title': {'score': 0.2, 'polarity': 'positive'}},
+            'read_time': 4,
+            'is_duplicate': False,
+        })
+    return json.dumps({
+        'status': 'ok', 'page': 1, 'limit': count, 'has_next_pages': True, 'results': results,
+    }, ensure_ascii=False).encode('utf-8')
+
+
+def stdlib_decode(raw):
+    return app.normalize_articles(json.loads(raw)['results'])
+
+
+def backend_decode(backend):
+    def decode(raw):
+        info, columns = backend.decode_news_page(raw)
+        return app.normalize_columns(columns)
+    return decode
+
+
+def stdlib_encode(value):
+    return json.dumps(value, ensure_ascii=False).encode('utf-8')
+
+
+def best_of(fn, value, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(value)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def available_backends():
+    backends = []
+    for name, cls in news_json.BACKENDS.items():
+        try:
+            backends.append(cls())
+        except ImportError:
+            print(f"({name} no está instalado; se omite)")
+    return backends
+
+
+def report(direction, variants, value, repeat):
+    baseline = None
+    for name, fn in variants:
+        elapsed = best_of(fn, value, repeat) * 1e6
+        baseline = baseline or elapsed
+        print(f"{direction:<14} {name:<28} {elapsed:>10.1f} {baseline / elapsed:>6.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--articles', type=int, default=50)
+    parser.add_argument('--body-size', type=int, default=4000)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    raw = upstream_payload(args.articles, args.body_size)
+    backends = available_backends()
+    expected = stdlib_decode(raw)
+    for backend in backends:
+        assert backend_decode(backend)(raw) == expected, backend.name
+    response = {'status': 'ok', 'totalResults': len(expected), 'articles': expected}
+
+    print(f"página de {args.articles} artículos, {len(raw) / 1024:.0f} KiB")
+    print(f"{'dirección':<14} {'variante':<28} {'µs':>10} {'x':>6}")
+    app._format_date_cached.cache_clear()
+    stdlib_decode(raw)  # misma caché de fechas caliente para todas las variantes
+    report('decodificar', [('json.loads + normalize', stdlib_decode)] + [
+        (f'{backend.name}.decode_news_page', backend_decode(backend)) for backend in backends
+    ], raw, args.repeat)
+    report('codificar', [('json.dumps', stdlib_encode)] + [
+        (f'{backend.name}.dumps', backend.dumps) for backend in backends
+    ], response, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
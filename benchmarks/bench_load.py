@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Prueba de carga de extremo a extremo contra un APITube.io simulado
+
+Levanta el APITube.io simulado (latencia, jitter, tamaño de las respuestas,
+fracción de errores o respuestas grabadas con --replay) y la aplicación en
+un servidor HTTP (werkzeug, un hilo por petición) en otros procesos, y
+lanza contra /, /api/news y /api/categories --duration segundos de
+peticiones con cada nivel de concurrencia (cada cliente con su conexión
+keep-alive). Con --keys las búsquedas rotan entre ese número de consultas
+distintas, así que las primeras llegan al upstream y el resto a la caché.
+
+Mide peticiones por segundo, p50/p95/p99, errores y la memoria residente
+(RSS) del servidor, y guarda los resultados en JSON junto con el commit
+para comparar ejecuciones (--compare).
+
+Uso:
+    python benchmarks/bench_load.py --concurrency 1 8 32 --duration 10 --output load.json
+    python benchmarks/bench_load.py --error-rate 0.05 --jitter 0.2 --compare load.json
+"""
+
+import argparse
+import http.client
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import mock_apitube  # noqa: E402
+
+# Ruta -> plantilla de la URL ({key}: número de consulta)
+PATHS = {
+    '/': '/?q=bench{key}',
+    '/api/news': '/api/news?q=bench{key}&limit=20',
+    '/api/categories': '/api/categories',
+}
+
+
+def serve():
+    """
+    Proceso servidor: la aplicación contra el upstream de BENCH_UPSTREAM_URL; imprime el puerto
+    """
+    os.environ.setdefault('APITUBE_API_KEY', 'at_benchmark_key_0000000000000000')
+    # Sin límite de llamadas propio: se mide la aplicación, no el presupuesto
+    for budget in ('NEWS', 'BACKGROUND', 'INGEST', 'DIAGNOSTICS'):
+        os.environ.setdefault(f'APITUBE_BUDGET_{budget}', '1000000')
+    # Páginas completas (los artículos simulados se parecen tanto que se agruparían)
+    os.environ.setdefault('NEWS_DEDUPE', '0')
+    from werkzeug.serving import make_server, WSGIRequestHandler
+    # Los errores del upstream simulado ya se cuentan en la tabla
+    logging.disable(logging.ERROR)
+    import app
+    app.APITUBE_BASE_URL = os.environ['BENCH_UPSTREAM_URL']
+
+    class QuietHandler(WSGIRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server('127.0.0.1', 0, app.app, threaded=True, request_handler=QuietHandler)
+    print(server.server_port, flush=True)
+    server.serve_forever()
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(round(pct / 100.0 * (len(values) - 1))))
+    return values[index]
+
+
+def read_rss(pid):
+    """
+    (RSS, pico de RSS) del proceso en MB, o (None, None) fuera de Linux
+    """
+    values = {}
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith(('VmRSS:', 'VmHWM:')):
+                    name, amount = line.split(':', 1)
+                    values[name] = round(int(amount.split()[0]) / 1024, 1)
+    except OSError:
+        pass
+    return values.get('VmRSS'), values.get('VmHWM')
+
+
+def run_level(port, template, keys, concurrency, duration, warmup):
+    """
+    concurrency clientes durante warmup + duration segundos; cuenta solo las peticiones tras warmup
+    """
+    latencies = []
+    statuses = []
+    start = time.perf_counter()
+    measure_from = start + warmup
+    stop = measure_from + duration
+
+    def client(number):
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        counts = Counter()
+        i = number
+        while True:
+            begin = time.perf_counter()
+            if begin >= stop:
+                break
+            path = template.format(key=i % keys if keys else '')
+            i += concurrency
+            try:
+                conn.request('GET', path)
+                response = conn.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException):
+                status = 'error'
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            if begin >= measure_from:
+                latencies.append(time.perf_counter() - begin)
+                counts[status] += 1
+        conn.close()
+        statuses.append(counts)
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - measure_from
+    status_counts = sum(statuses, Counter())
+    errors = sum(count for status, count in status_counts.items() if status == 'error' or status >= 400)
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'statuses': {str(status): count for status, count in sorted(status_counts.items(), key=str)},
+        'rps': round(len(latencies) / elapsed, 1) if elapsed > 0 else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'max_ms': round(max(latencies, default=0.0) * 1000, 2),
+    }
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True, text=True,
+                                check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+def compare(results, baseline_path):
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    previous = {(row['path'], row['concurrency']): row for row in baseline['results']}
+    print()
+    print(f"Frente a {baseline_path} (commit {(baseline.get('commit') or '?')[:10]})")
+    print(f"{'ruta':<16} {'conc':>5} {'req/s':>9} {'Δ':>8} {'p99 ms':>9} {'Δ':>8}")
+    for row in results:
+        old = previous.get((row['path'], row['concurrency']))
+        if old is None:
+            continue
+        rps_delta = (row['rps'] - old['rps']) / old['rps'] if old['rps'] else 0.0
+        p99_delta = (row['p99_ms'] - old['p99_ms']) / old['p99_ms'] if old['p99_ms'] else 0.0
+        print(f"{row['path']:<16} {row['concurrency']:>5} {row['rps']:>9} {rps_delta:>+8.1%} "
+              f"{row['p99_ms']:>9} {p99_delta:>+8.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--paths', nargs='+', default=list(PATHS), choices=list(PATHS))
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--duration', type=float, default=10.0, help='segundos medidos por nivel')
+    parser.add_argument('--warmup', type=float, default=2.0, help='segundos sin medir antes de cada nivel')
+    parser.add_argument('--keys', type=int, default=20, help='consultas distintas (0 = siempre la misma consulta)')
+    parser.add_argument('--latency', type=float, default=0.05, help='latencia del upstream simulado')
+    parser.add_argument('--jitter', type=float, default=0.0, help='latencia extra aleatoria del upstream')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fracción de 500 del upstream')
+    parser.add_argument('--articles', type=int, default=50, help='artículos por respuesta del upstream')
+    parser.add_argument('--body-size', type=int, default=600, help='caracteres del cuerpo de cada artículo')
+    parser.add_argument('--replay', help='respuestas grabadas del upstream (.json/.jsonl, opcionalmente .gz)')
+    parser.add_argument('--output', default='bench_load.json', help='fichero JSON de resultados')
+    parser.add_argument('--compare', help='resultados anteriores con los que comparar')
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        serve()
+        return
+
+    mock, url = mock_apitube.start_in_process(
+        latency=args.latency, articles=args.articles, body_size=args.body_size,
+        jitter=args.jitter, error_rate=args.error_rate, replay=args.replay
+    )
+    server = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), '--serve'],
+        env=dict(os.environ, BENCH_UPSTREAM_URL=url), stdout=subprocess.PIPE, text=True
+    )
+    results = []
+    try:
+        port = int(server.stdout.readline())
+        print(f"🏁 Upstream simulado: latencia {args.latency}s + {args.jitter}s, errores {args.error_rate:.0%}, "
+              f"{args.replay or f'{args.articles} artículos'}; {args.keys} consultas distintas")
+        print(f"{'ruta':<16} {'conc':>5} {'peticiones':>10} {'errores':>7} {'req/s':>9} "
+              f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'RSS MB':>7}")
+        for path in args.paths:
+            for concurrency in args.concurrency:
+                row = {'path': path, 'concurrency': concurrency}
+                row.update(run_level(port, PATHS[path], args.keys, concurrency, args.duration, args.warmup))
+                row['rss_mb'], row['peak_rss_mb'] = read_rss(server.pid)
+                results.append(row)
+                print(f"{path:<16} {concurrency:>5} {row['requests']:>10} {row['errors']:>7} {row['rps']:>9} "
+                      f"{row['p50_ms']:>8} {row['p95_ms']:>8} {row['p99_ms']:>8} {row['rss_mb'] or '-':>7}")
+    finally:
+        server.terminate()
+        server.wait()
+        mock.terminate()
+
+    commit, dirty = git_commit()
+    report = {
+        'benchmark': 'bench_load',
+        'commit': commit,
+        'dirty': dirty,
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': {name: value for name, value in vars(args).items()
+                   if name not in ('output', 'compare', 'serve')},
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+        f.write('\n')
+    print(f"\n💾 Resultados en {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
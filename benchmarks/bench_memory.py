@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Memoria de los artículos en caché: lista de dicts frente a ArticleColumns
+
+Decodifica N artículos sintéticos como los devuelve APITube.io, los
+normaliza y mide con tracemalloc cuánto ocupa lo que queda retenido en la
+caché en cada representación (por defecto 10.000 artículos en páginas de 20).
+
+Uso:
+    python benchmarks/bench_memory.py --articles 10000 --page-size 20
+"""
+
+import argparse
+import gc
+import json
+import logging
+import os
+import sys
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import mock_apitube  # noqa: E402
+
+logging.disable(logging.INFO)
+import app  # noqa: E402
+from news_articles import ArticleColumns  # noqa: E402
+
+
+def cached_pages(count, page_size, compact):
+    """
+    Páginas normalizadas como quedarían en la caché (cada una con sus propios objetos)
+    """
+    pages = []
+    for start in range(0, count, page_size):
+        raw = json.dumps({'results': mock_apitube.make_results(page_size, seed=start)})
+        articles = app.normalize_articles(json.loads(raw)['results'])
+        pages.append(ArticleColumns.from_dicts(articles) if compact else articles)
+    return pages
+
+
+def retained(count, page_size, compact):
+    gc.collect()
+    tracemalloc.start()
+    pages = cached_pages(count, page_size, compact)
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del pages
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--articles', type=int, default=10000)
+    parser.add_argument('--page-size', type=int, default=20)
+    args = parser.parse_args()
+
+    dicts = retained(args.articles, args.page_size, compact=False)
+    columns = retained(args.articles, args.page_size, compact=True)
+    print(f"{'representación':<16} {'MB':>7} {'bytes/artículo':>15}")
+    for name, size in (('lista de dicts', dicts), ('ArticleColumns', columns)):
+        print(f"{name:<16} {size / 1024 / 1024:>7.2f} {size / args.articles:>15.0f}")
+    print(f"ahorro: {(1 - columns / dicts) * 100:.0f}%")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Benchmark del coste de las métricas: peticiones con NEWS_METRICS=1 frente a NEWS_METRICS=0
+
+Con los artículos ya en la caché de noticias, levanta la aplicación en un
+servidor HTTP (werkzeug, un hilo por petición) en otro proceso, con las
+métricas activadas o desactivadas, y mide desde este proceso la mediana
+por petición de /api/news y / con una conexión keep-alive. Alterna varias
+rondas de cada variante y se queda con la mejor mediana de cada una para
+repartir el ruido. Muestra también el coste de cada operación de news_metrics.
+
+Uso:
+    python benchmarks/bench_metrics.py --requests 3000 --rounds 5
+"""
+
+import argparse
+import http.client
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+PATHS = ('/api/news?limit=20', '/')
+
+
+def serve():
+    """
+    Proceso servidor: la aplicación con la caché cargada; imprime el puerto
+    """
+    os.environ.setdefault('APITUBE_API_KEY', 'benchmark')
+    # Página completa (los artículos simulados se parecen tanto que se agruparían), sin red ni compresión
+    os.environ.setdefault('NEWS_DEDUPE', '0')
+    os.environ.setdefault('NEWS_PREFETCH_PAGES', '0')
+    os.environ.setdefault('NEWS_COMPRESSION', '0')
+    import mock_apitube
+    from werkzeug.serving import make_server, WSGIRequestHandler
+    logging.disable(logging.INFO)
+    import app
+
+    result, error = app._news_page(mock_apitube.make_payload(20), 20, 1)
+    assert not error, error
+    for page_size in (20, app.INDEX_PAGE_SIZE):
+        app.news_cache.set(app.news_cache_key('', '', 'es', 'general', page_size, 1), result)
+
+    class QuietHandler(WSGIRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server('127.0.0.1', 0, app.app, threaded=True, request_handler=QuietHandler)
+    print(server.server_port, flush=True)
+    server.serve_forever()
+
+
+def measure(enabled, requests):
+    env = dict(os.environ, NEWS_METRICS='1' if enabled else '0')
+    server = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), '--serve'],
+        env=env, stdout=subprocess.PIPE, text=True
+    )
+    try:
+        port = int(server.stdout.readline())
+        conn = http.client.HTTPConnection('127.0.0.1', port)
+        timings = {}
+        for path in PATHS:
+            samples = []
+            for i in range(requests + 200):
+                start = time.perf_counter()
+                conn.request('GET', path)
+                conn.getresponse().read()
+                if i >= 200:
+                    samples.append(time.perf_counter() - start)
+            timings[path] = statistics.median(samples) * 1e6
+        conn.close()
+        return timings
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def primitive_costs():
+    from news_metrics import MetricsRegistry
+    metrics = MetricsRegistry()
+    counter = metrics.counter('bench_total', 'bench', ('status',))
+    histogram = metrics.histogram('bench_seconds', 'bench')
+    child_counter = counter.labels(200)
+    number = 200000
+
+    def timed_block():
+        with histogram.time():
+            pass
+
+    costs = {
+        'counter.inc()': timeit.timeit(child_counter.inc, number=number),
+        'counter.labels(200).inc()': timeit.timeit(lambda: counter.labels(200).inc(), number=number),
+        'histogram.observe()': timeit.timeit(lambda: histogram.observe(0.003), number=number),
+        'with histogram.time()': timeit.timeit(timed_block, number=number),
+    }
+    # Varios hilos a la vez: sin locks en el camino caliente
+    threads = [threading.Thread(target=lambda: [child_counter.inc() for _ in range(number)]) for _ in range(4)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    costs['counter.inc() 4 hilos'] = time.perf_counter() - start
+    return {name: elapsed / number * 1e9 for name, elapsed in costs.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--requests', type=int, default=3000)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        serve()
+        return
+
+    print(f"{'operación':<28} {'ns':>8}")
+    for name, cost in primitive_costs().items():
+        print(f"{name:<28} {cost:>8.0f}")
+    print()
+
+    # Mejor mediana de cada variante a lo largo de las rondas
+    best = {True: {}, False: {}}
+    for _ in range(args.rounds):
+        for enabled in (False, True):
+            for path, elapsed in measure(enabled, args.requests).items():
+                best[enabled][path] = min(best[enabled].get(path, float('inf')), elapsed)
+    print(f"{'ruta':<22} {'sin métricas µs':>16} {'con métricas µs':>16} {'coste':>8}")
+    for path in PATHS:
+        off, on = best[False][path], best[True][path]
+        print(f"{path:<22} {off:>16.1f} {on:>16.1f} {(on - off) / off:>8.1%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: normalización artículo a artículo frente a la normalización por lotes
+
+Compara el bucle original (normalize_article + format_date sin memoria) con
+normalize_articles (un recorrido por campo, fechas memorizadas) y su salida
+columnar, con 50, 1.000 y 100.000 artículos sintéticos.
+
+Uso:
+    python benchmarks/bench_normalize.py --articles 50 1000 100000
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import mock_apitube  # noqa: E402
+
+logging.disable(logging.INFO)
+import app  # noqa: E402
+
+
+def per_article_loop(results):
+    """
+    El bucle de process_news_data antes de normalize_articles, sin caché de fechas
+    """
+    format_date = app._format_date
+    processed = []
+    for article in results:
+        if article.get('title') and article.get('title').strip():
+            processed.append({
+                'title': article.get('title', ''),
+                'description': article.get('description', ''),
+                'url': article.get('href', ''),
+                'publishedAt': format_date(article.get('published_at')),
+                'source': {
+                    'name': article.get('source', {}).get('name', 'Fuente desconocida')
+                },
+                'urlToImage': article.get('image', ''),
+                'content': article.get('body', '')[:200] + '...' if article.get('body') else None
+            })
+    return processed
+
+
+def best_of(fn, results, repeat, warm=False):
+    best = float('inf')
+    for _ in range(repeat):
+        if not warm:
+            app._format_date_cached.cache_clear()
+        start = time.perf_counter()
+        fn(results)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--articles', type=int, nargs='+', default=[50, 1000, 100000])
+    args = parser.parse_args()
+
+    # 'caliente': la caché de fechas ya tiene las de peticiones anteriores, como en producción
+    variants = (
+        ('bucle', per_article_loop, False),
+        ('lotes', app.normalize_articles, False),
+        ('columnar', lambda results: app.normalize_articles(results, columnar=True), False),
+        ('lotes, caché caliente', app.normalize_articles, True),
+    )
+    print(f"{'artículos':>9} {'variante':<22} {'µs/artículo':>12} {'x':>6}")
+    for count in args.articles:
+        results = mock_apitube.make_results(count)
+        assert app.normalize_articles(results) == per_article_loop(results)
+        repeat = max(3, min(200, 20000 // count))
+        baseline = None
+        for name, fn, warm in variants:
+            elapsed = best_of(fn, results, repeat, warm) / count * 1e6
+            baseline = baseline or elapsed
+            print(f"{count:>9} {name:<22} {elapsed:>12.2f} {baseline / elapsed:>6.2f}")
+
+
+if __name__ == '__main__':
+    main()
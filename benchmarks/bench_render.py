@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark de la página principal: render completo frente a fragmentos y página en caché
+
+Con los artículos ya en la caché de noticias, mide el tiempo de GET / con
+el cliente de pruebas de Flask: renderizando todo el template, con los
+fragmentos (selectores y resultados) en caché y con la página entera en
+caché (NEWS_PAGE_CACHE=1).
+
+Uso:
+    python benchmarks/bench_render.py --requests 500
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+os.environ.setdefault('APITUBE_API_KEY', 'benchmark')
+# Página completa (los artículos simulados se parecen tanto que se agruparían), sin red ni compresión
+os.environ.setdefault('NEWS_DEDUPE', '0')
+os.environ.setdefault('NEWS_PREFETCH_PAGES', '0')
+os.environ.setdefault('NEWS_COMPRESSION', '0')
+import mock_apitube  # noqa: E402
+
+logging.disable(logging.INFO)
+import app  # noqa: E402
+
+
+def best_of(client, requests, setup):
+    best = float('inf')
+    for _ in range(requests):
+        setup()
+        start = time.perf_counter()
+        client.get('/')
+        best = min(best, time.perf_counter() - start)
+    return best * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--requests', type=int, default=500)
+    args = parser.parse_args()
+
+    result, error = app._news_page(mock_apitube.make_payload(app.INDEX_PAGE_SIZE), app.INDEX_PAGE_SIZE, 1)
+    assert not error, error
+    app.news_cache.set(app.news_cache_key('', '', 'es', 'general', app.INDEX_PAGE_SIZE, 1), result)
+    client = app.app.test_client()
+    client.get('/')
+
+    def cold():
+        app.fragment_cache.clear()
+        app.select_options.cache_clear()
+
+    variants = (
+        ('render completo', False, cold),
+        ('fragmentos en caché', False, lambda: None),
+        ('página en caché', True, lambda: None),
+    )
+    print(f"{'variante':<22} {'µs/petición':>12} {'x':>6}")
+    baseline = None
+    for name, page_cache, setup in variants:
+        app.NEWS_PAGE_CACHE = page_cache
+        client.get('/')
+        elapsed = best_of(client, args.requests, setup)
+        baseline = baseline or elapsed
+        print(f"{name:<22} {elapsed:>12.1f} {baseline / elapsed:>6.2f}")
+
+
+if __name__ == '__main__':
+    main()
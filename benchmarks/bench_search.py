@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Benchmark del índice de búsqueda local (BM25 + mmap)
+
+Indexa N artículos sintéticos, guarda el índice, lo vuelve a abrir con mmap
+y mide la latencia de búsqueda en frío y memorizada para términos comunes,
+medios y raros.
+
+Uso:
+    python benchmarks/bench_search.py --docs 10000 100000
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from search_index import SearchIndex  # noqa: E402
+
+COMMON = ['España', 'gobierno', 'economía', 'fútbol', 'elecciones', 'Madrid', 'tecnología',
+          'inflación', 'mercado', 'salud', 'vivienda', 'precios', 'empresas', 'clima',
+          'energía', 'presidente', 'liga', 'banco', 'ciencia', 'educación']
+RARE = [f'termino{i}' for i in range(5000)]
+QUERIES = ['España', 'vivienda precios', 'termino42', 'elecciones Madrid gobierno']
+
+
+def build(count, seed=0):
+    rng = random.Random(seed)
+    vocabulary = COMMON + RARE
+    index = SearchIndex()
+    for doc_id in range(count):
+        index.add(
+            doc_id, 'es',
+            ' '.join(rng.sample(COMMON, 4) + rng.choices(RARE, k=4)),
+            ' '.join(rng.choices(vocabulary, k=20)),
+            ' '.join(rng.choices(vocabulary, k=60))
+        )
+    return index
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--docs', type=int, nargs='+', default=[10000, 100000])
+    args = parser.parse_args()
+
+    print(f"{'docs':>7} {'consulta':<28} {'hits':>7} {'frío ms':>8} {'memo ms':>8}")
+    for count in args.docs:
+        index, build_ms = timed(lambda: build(count))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'news.idx')
+            _, save_ms = timed(lambda: index.save(path))
+            size = os.path.getsize(path)
+            loaded, load_ms = timed(lambda: SearchIndex(path))
+            print(f"{count:>7} indexado {build_ms:.0f} ms, guardado {save_ms:.0f} ms, "
+                  f"{size / 1024 / 1024:.1f} MB, apertura mmap {load_ms:.0f} ms")
+            for query in QUERIES:
+                hits, cold_ms = timed(lambda: loaded.search(query, 'es'))
+                _, warm_ms = timed(lambda: loaded.search(query, 'es', limit=20))
+                print(f"{count:>7} {query:<28} {len(hits):>7} {cold_ms:>8.2f} {warm_ms:>8.3f}")
+            loaded.close()
+        index.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Servidor local que imita a APITube.io para benchmarks sin clave ni red
+
+Responde a cualquier GET con un JSON al estilo de /v1/news/everything
+('status' + 'results'), con latencia configurable (más un jitter
+aleatorio), una fracción de errores 500 y conexiones keep-alive. Con
+--replay sirve por turnos respuestas grabadas en vez de las sintéticas.
+
+Uso:
+    python benchmarks/mock_apitube.py --port 8765 --latency 0.05 --articles 20
+    python benchmarks/mock_apitube.py --latency 0.05 --jitter 0.1 --error-rate 0.02 --replay respuestas.jsonl.gz
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import multiprocessing
+import random
+import socket
+import time
+
+ERROR_PAYLOAD = b'{"status":"error","message":"Error simulado del upstream"}'
+
+
+def make_results(count, body_size=600, seed=0):
+    """
+    Genera artículos sintéticos con la forma de la respuesta de APITube.io
+    """
+    return [
+        {
+            'id': seed * 100000 + i,
+            'title': f'Noticia de prueba {seed}-{i} sobre economía y tecnología',
+            'description': f'Descripción de la noticia {i} con algo de contexto adicional.',
+            'href': f'https://ejemplo.com/noticias/{seed}/{i}',
+            'published_at': f'2024-05-{(i % 28) + 1:02d}T{(i % 24):02d}:30:00Z',
+            'source': {'name': f'Fuente {i % 12}', 'domain': f'fuente{i % 12}.com'},
+            'image': f'https://ejemplo.com/img/{i}.jpg',
+            'language': 'es',
+            'body': ('Lorem ipsum dolor sit amet, noticia de prueba. ' * (body_size // 47 + 1))[:body_size],
+        }
+        for i in range(count)
+    ]
+
+
+def make_payload(count, body_size=600):
+    return json.dumps({
+        'status': 'ok',
+        'page': 1,
+        'limit': count,
+        'results': make_results(count, body_size),
+    }).encode('utf-8')
+
+
+def load_payloads(path):
+    """
+    Respuestas grabadas de un fichero .json o .jsonl (opcionalmente .gz)
+
+    Vale una respuesta ({'results': [...]}), una lista de respuestas, una
+    lista de artículos, una respuesta por línea o un archivo grabado con
+    APITUBE_FIXTURES_MODE=record (se usan sus respuestas 200).
+    """
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        text = f.read()
+    try:
+        data = json.loads(text)
+    except ValueError:
+        data = [json.loads(line) for line in text.splitlines() if line.strip()]
+    if isinstance(data, dict):
+        data = [data]
+    # Entradas grabadas por news_fixtures: el cuerpo de las respuestas 200
+    if any(isinstance(item, dict) and 'key' in item and 'status' in item for item in data):
+        data = [json.loads(item['body']) for item in data if item.get('status') == 200 and 'body' in item]
+    if data and not any(isinstance(item, dict) and 'results' in item for item in data):
+        # Lista de artículos sueltos
+        data = [{'status': 'ok', 'page': 1, 'limit': len(data), 'results': data}]
+    payloads = [json.dumps(item).encode('utf-8') for item in data if isinstance(item, dict) and 'results' in item]
+    if not payloads:
+        raise ValueError(f"{path} no contiene respuestas con 'results'")
+    return payloads
+
+
+class Responses:
+    """
+    Qué responde el servidor simulado: las respuestas por turnos, con latencia y errores
+    """
+
+    def __init__(self, payloads, latency=0.0, jitter=0.0, error_rate=0.0, seed=0):
+        self.payloads = payloads
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._next = 0
+
+    def next(self):
+        """
+        (segundos de espera, estado HTTP, cuerpo) de la siguiente respuesta
+        """
+        delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if self.error_rate and self._random.random() < self.error_rate:
+            return delay, b'500 Internal Server Error', ERROR_PAYLOAD
+        payload = self.payloads[self._next % len(self.payloads)]
+        self._next += 1
+        return delay, b'200 OK', payload
+
+
+async def _handle(reader, writer, responses):
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            while True:
+                header = await reader.readline()
+                if header in (b'\r\n', b'\n', b''):
+                    break
+            delay, status, payload = responses.next()
+            if delay:
+                await asyncio.sleep(delay)
+            writer.write(
+                b'HTTP/1.1 %s\r\n'
+                b'Content-Type: application/json\r\n'
+                b'Connection: keep-alive\r\n'
+                b'Content-Length: %d\r\n\r\n' % (status, len(payload))
+            )
+            writer.write(payload)
+            await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(port, latency, articles, body_size, ready=None, jitter=0.0, error_rate=0.0, replay=None):
+    payloads = load_payloads(replay) if replay else [make_payload(articles, body_size)]
+    responses = Responses(payloads, latency, jitter, error_rate)
+    server = await asyncio.start_server(
+        lambda r, w: _handle(r, w, responses), '127.0.0.1', port, backlog=4096
+    )
+    if ready is not None:
+        ready.set()
+    async with server:
+        await server.serve_forever()
+
+
+def _run(port, latency, articles, body_size, ready, jitter, error_rate, replay):
+    asyncio.run(serve(port, latency, articles, body_size, ready, jitter, error_rate, replay))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_in_process(latency=0.05, articles=20, body_size=600, port=None, jitter=0.0, error_rate=0.0,
+                     replay=None):
+    """
+    Arranca el servidor en otro proceso (para no competir por el GIL)
+
+    Devuelve (proceso, url_base).
+    """
+    if replay:
+        # Falla aquí, y no en el otro proceso, si el fichero no sirve
+        load_payloads(replay)
+    port = port or free_port()
+    ready = multiprocessing.Event()
+    process = multiprocessing.Process(
+        target=_run, args=(port, latency, articles, body_size, ready, jitter, error_rate, replay), daemon=True
+    )
+    process.start()
+    if not ready.wait(10):
+        process.terminate()
+        raise RuntimeError('El servidor simulado no arrancó a tiempo')
+    time.sleep(0.05)
+    return process, f'http://127.0.0.1:{port}/v1/news/everything'
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='APITube.io simulado')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.05, help='segundos por respuesta')
+    parser.add_argument('--articles', type=int, default=20)
+    parser.add_argument('--body-size', type=int, default=600)
+    parser.add_argument('--jitter', type=float, default=0.0, help='segundos extra aleatorios (0 a jitter)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fracción de respuestas 500')
+    parser.add_argument('--replay', help='respuestas grabadas (.json/.jsonl, opcionalmente .gz)')
+    args = parser.parse_args()
+    print(f"🧪 APITube.io simulado en http://127.0.0.1:{args.port} "
+          f"(latencia {args.latency}s + {args.jitter}s, errores {args.error_rate:.0%}, "
+          f"{args.replay or f'{args.articles} artículos'})")
+    asyncio.run(serve(args.port, args.latency, args.articles, args.body_size,
+                      jitter=args.jitter, error_rate=args.error_rate, replay=args.replay))
@@ -0,0 +1,461 @@
+"""
+Backends intercambiables para la caché de noticias
+
+Todos exponen la misma interfaz que TTLCache (lookup, get, set, delete,
+clear, stats) para que la ruta de obtención de noticias no dependa de
+dónde se guarden los datos:
+
+    memory                      caché en memoria del proceso (TTLCache)
+    sqlite:///ruta/archivo.db   archivo local compartido por los workers de un host
+    redis://host:6379/0         servidor Redis (o compatible con su protocolo)
+
+Los backends compartidos guardan los valores como JSON compacto comprimido
+con zlib y usan hora de pared para que todos los procesos coincidan.
+"""
+
+import os
+import socket
+import sqlite3
+import threading
+import time
+import zlib
+from urllib.parse import urlparse
+
+import news_json
+from news_cache import TTLCache, FRESH, STALE, EXPIRED, MISS
+
+
+def serialize_value(value):
+    """
+    Convierte un valor en bytes compactos (JSON sin espacios con news_json + zlib)
+    """
+    return zlib.compress(news_json.dumps(value), 6)
+
+
+def deserialize_value(blob):
+    return news_json.loads(zlib.decompress(blob))
+
+
+def cache_key_to_str(key, prefix='news:'):
+    """
+    Representación textual estable de una clave de caché (tupla o cadena)
+    """
+    if isinstance(key, str):
+        return prefix + key
+    return prefix + '|'.join(str(part) for part in key)
+
+
+class CacheBackend:
+    """
+    Base común: contadores y clasificación de entradas por antigüedad
+    """
+
+    name = 'base'
+
+    def __init__(self, default_ttl=300, stale_ttl=0, stale_if_error_ttl=0, clock=time.time):
+        self.default_ttl = default_ttl
+        self.stale_ttl = stale_ttl
+        self.stale_if_error_ttl = max(stale_if_error_ttl, stale_ttl)
+        self.clock = clock
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _count(self, name):
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _classify(self, expires_at, allow_stale):
+        age = self.clock() - expires_at
+        if age < 0:
+            self._count('hits')
+            return FRESH
+        if allow_stale and age < self.stale_ttl:
+            self._count('stale_hits')
+            return STALE
+        self._count('misses')
+        if allow_stale and age < self.stale_if_error_ttl:
+            return EXPIRED
+        return MISS
+
+    def _retention(self, ttl):
+        # Tiempo total que debe conservarse la entrada en el almacenamiento
+        return ttl + self.stale_if_error_ttl
+
+    def get(self, key):
+        value, state = self.lookup(key, allow_stale=False)
+        return value if state == FRESH else None
+
+    def lookup(self, key, allow_stale=True):
+        raise NotImplementedError
+
+    def expires_in(self, key):
+        """
+        Segundos hasta que caduca la entrada (negativo si ya caducó) o None si no está; no cuenta como acceso
+        """
+        raise NotImplementedError
+
+    def set(self, key, value, ttl=None):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def stats(self):
+        with self._stats_lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                'backend': self.name,
+                'hits': self.hits,
+                'stale_hits': self.stale_hits,
+                'misses': self.misses,
+                'errors': self.errors,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+class MemoryBackend(TTLCache):
+    """
+    Caché en memoria del proceso
+    """
+
+    name = 'memory'
+
+    def stats(self):
+        stats = super().stats()
+        stats['backend'] = self.name
+        return stats
+
+
+class SQLiteBackend(CacheBackend):
+    """
+    Caché en un archivo SQLite compartido por todos los workers del host
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, path, max_entries=256, max_bytes=16 * 1024 * 1024, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS news_cache ('
+                ' key TEXT PRIMARY KEY,'
+                ' value BLOB NOT NULL,'
+                ' expires_at REAL NOT NULL,'
+                ' drop_at REAL NOT NULL,'
+                ' size INTEGER NOT NULL,'
+                ' accessed_at REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS news_cache_accessed ON news_cache (accessed_at)')
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA mmap_size=67108864')
+            self._local.conn = conn
+        return conn
+
+    def lookup(self, key, allow_stale=True):
+        skey = cache_key_to_str(key)
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                'SELECT value, expires_at, drop_at FROM news_cache WHERE key = ?', (skey,)
+            ).fetchone()
+            if row is None:
+                self._count('misses')
+                return None, MISS
+            blob, expires_at, drop_at = row
+            now = self.clock()
+            if drop_at <= now:
+                conn.execute('DELETE FROM news_cache WHERE key = ?', (skey,))
+                self._count('misses')
+                return None, MISS
+            state = self._classify(expires_at, allow_stale)
+            if state == MISS:
+                return None, MISS
+            conn.execute('UPDATE news_cache SET accessed_at = ? WHERE key = ?', (now, skey))
+            return deserialize_value(blob), state
+        except sqlite3.Error:
+            self._count('errors')
+            return None, MISS
+
+    def expires_in(self, key):
+        try:
+            row = self._connect().execute(
+                'SELECT expires_at FROM news_cache WHERE key = ?', (cache_key_to_str(key),)
+            ).fetchone()
+        except sqlite3.Error:
+            self._count('errors')
+            return None
+        return None if row is None else row[0] - self.clock()
+
+    def set(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        if ttl <= 0:
+            return False
+        blob = serialize_value(value)
+        if len(blob) > self.max_bytes:
+            return False
+        now = self.clock()
+        try:
+            conn = self._connect()
+            conn.execute(
+                'INSERT OR REPLACE INTO news_cache (key, value, expires_at, drop_at, size, accessed_at)'
+                ' VALUES (?, ?, ?, ?, ?, ?)',
+                (cache_key_to_str(key), blob, now + ttl, now + self._retention(ttl), len(blob), now)
+            )
+            self._evict(conn, now)
+            return True
+        except sqlite3.Error:
+            self._count('errors')
+            return False
+
+    def _evict(self, conn, now):
+        conn.execute('DELETE FROM news_cache WHERE drop_at <= ?', (now,))
+        count, total = conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM news_cache').fetchone()
+        while count > self.max_entries or total > self.max_bytes:
+            row = conn.execute(
+                'SELECT key, size FROM news_cache ORDER BY accessed_at LIMIT 1'
+            ).fetchone()
+            if row is None:
+                break
+            conn.execute('DELETE FROM news_cache WHERE key = ?', (row[0],))
+            count -= 1
+            total -= row[1]
+            self._count('evictions')
+
+    def delete(self, key):
+        self._connect().execute('DELETE FROM news_cache WHERE key = ?', (cache_key_to_str(key),))
+
+    def clear(self):
+        self._connect().execute('DELETE FROM news_cache')
+
+    def stats(self):
+        stats = super().stats()
+        try:
+            count, total = self._connect().execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM news_cache'
+            ).fetchone()
+        except sqlite3.Error:
+            count, total = None, None
+        stats.update({
+            'path': self.path,
+            'entries': count,
+            'bytes': total,
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes,
+            'evictions': self.evictions,
+        })
+        return stats
+
+
+class RedisError(Exception):
+    pass
+
+
+class RedisConnection:
+    """
+    Conexión mínima que habla el protocolo RESP de Redis
+    """
+
+    def __init__(self, host, port, db=0, password=None, timeout=2.0):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.sock.makefile('rb')
+        if password:
+            self.execute('AUTH', password)
+        if db:
+            self.execute('SELECT', db)
+
+    def execute(self, *args):
+        parts = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            if isinstance(arg, str):
+                arg = arg.encode('utf-8')
+            elif not isinstance(arg, bytes):
+                arg = str(arg).encode('utf-8')
+            parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        self.sock.sendall(b''.join(parts))
+        return self._read_reply()
+
+    def _read_reply(self):
+        line = self.reader.readline()
+        if not line:
+            raise RedisError('Conexión cerrada por el servidor')
+        kind, payload = line[:1], line[1:-2]
+        if kind == b'+':
+            return payload.decode('utf-8')
+        if kind == b'-':
+            raise RedisError(payload.decode('utf-8'))
+        if kind == b':':
+            return int(payload)
+        if kind == b'$':
+            length = int(payload)
+            if length == -1:
+                return None
+            data = self.reader.read(length + 2)
+            return data[:-2]
+        if kind == b'*':
+            length = int(payload)
+            if length == -1:
+                return None
+            return [self._read_reply() for _ in range(length)]
+        raise RedisError(f'Respuesta RESP desconocida: {line!r}')
+
+    def close(self):
+        try:
+            self.reader.close()
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class RedisBackend(CacheBackend):
+    """
+    Caché en un servidor compatible con el protocolo de Redis
+
+    La expulsión LRU queda a cargo del servidor (maxmemory-policy); aquí
+    solo se fija la caducidad total de cada clave.
+    """
+
+    name = 'redis'
+
+    def __init__(self, host='localhost', port=6379, db=0, password=None,
+                 socket_timeout=2.0, pool_size=8, prefix='news:', **kwargs):
+        super().__init__(**kwargs)
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.socket_timeout = socket_timeout
+        self.pool_size = pool_size
+        self.prefix = prefix
+        self._pool = []
+        self._pool_lock = threading.Lock()
+
+    def _acquire(self):
+        with self._pool_lock:
+            if self._pool:
+                return self._pool.pop()
+        return RedisConnection(self.host, self.port, self.db, self.password, self.socket_timeout)
+
+    def _release(self, conn):
+        with self._pool_lock:
+            if len(self._pool) < self.pool_size:
+                self._pool.append(conn)
+                return
+        conn.close()
+
+    def execute(self, *args):
+        conn = self._acquire()
+        try:
+            reply = conn.execute(*args)
+        except (OSError, RedisError):
+            conn.close()
+            raise
+        self._release(conn)
+        return reply
+
+    def lookup(self, key, allow_stale=True):
+        try:
+            blob = self.execute('GET', cache_key_to_str(key, self.prefix))
+        except (OSError, RedisError):
+            self._count('errors')
+            return None, MISS
+        if blob is None:
+            self._count('misses')
+            return None, MISS
+        # 8 bytes de cabecera con el instante de caducidad en milisegundos
+        expires_at = int.from_bytes(blob[:8], 'big') / 1000.0
+        state = self._classify(expires_at, allow_stale)
+        if state == MISS:
+            return None, MISS
+        return deserialize_value(blob[8:]), state
+
+    def expires_in(self, key):
+        try:
+            blob = self.execute('GET', cache_key_to_str(key, self.prefix))
+        except (OSError, RedisError):
+            self._count('errors')
+            return None
+        if blob is None:
+            return None
+        return int.from_bytes(blob[:8], 'big') / 1000.0 - self.clock()
+
+    def set(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        if ttl <= 0:
+            return False
+        expires_at = int((self.clock() + ttl) * 1000)
+        blob = expires_at.to_bytes(8, 'big') + serialize_value(value)
+        try:
+            self.execute('SET', cache_key_to_str(key, self.prefix), blob,
+                         'PX', int(self._retention(ttl) * 1000))
+            return True
+        except (OSError, RedisError):
+            self._count('errors')
+            return False
+
+    def delete(self, key):
+        self.execute('DEL', cache_key_to_str(key, self.prefix))
+
+    def clear(self):
+        cursor = b'0'
+        while True:
+            cursor, keys = self.execute('SCAN', cursor, 'MATCH', self.prefix + '*', 'COUNT', 500)
+            if keys:
+                self.execute('DEL', *keys)
+            if cursor in (b'0', '0'):
+                break
+
+    def stats(self):
+        stats = super().stats()
+        stats.update({'host': self.host, 'port': self.port, 'db': self.db})
+        return stats
+
+
+def make_backend(url='memory', max_entries=256, max_bytes=16 * 1024 * 1024,
+                 default_ttl=300, stale_ttl=0, stale_if_error_ttl=0):
+    """
+    Crea el backend indicado por una URL de configuración
+    """
+    url = (url or 'memory').strip()
+    common = {
+        'default_ttl': default_ttl,
+        'stale_ttl': stale_ttl,
+        'stale_if_error_ttl': stale_if_error_ttl,
+    }
+    if url == 'memory':
+        return MemoryBackend(max_entries=max_entries, max_bytes=max_bytes, **common)
+
+    parsed = urlparse(url)
+    if parsed.scheme == 'sqlite':
+        if parsed.netloc:
+            path = parsed.netloc + parsed.path
+        else:
+            path = parsed.path or os.path.join('/tmp', 'news_cache.db')
+        return SQLiteBackend(path, max_entries=max_entries, max_bytes=max_bytes, **common)
+    if parsed.scheme == 'redis':
+        db = int(parsed.path.lstrip('/') or 0)
+        return RedisBackend(
+            host=parsed.hostname or 'localhost',
+            port=parsed.port or 6379,
+            db=db,
+            password=parsed.password,
+            **common
+        )
+    raise ValueError(f"Backend de caché no soportado: {url}")
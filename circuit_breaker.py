@@ -0,0 +1,343 @@
+"""
+Circuito y peticiones de cobertura para las llamadas a APITube.io
+
+CircuitBreaker lleva una ventana deslizante (en segundos) de resultados y
+latencias del upstream. Si en la ventana hay al menos min_calls llamadas y
+la proporción de errores o de llamadas lentas supera su umbral, el circuito
+se abre: durante open_seconds las llamadas fallan al momento con
+CircuitOpenError, sin ocupar un worker hasta el timeout, y la aplicación
+responde desde la caché o el almacén local. Después pasa a semiabierto y
+deja pasar unas pocas sondas; si salen bien se cierra y si no vuelve a
+abrirse.
+
+Hedger lanza una segunda petición idéntica si la primera tarda más que el
+p95 de las latencias recientes. En asíncrono se queda con la que responda
+antes, lo que recorta la cola de latencias a cambio de unas pocas llamadas
+extra. En síncrono la primera ocupa el hilo que llama (una llamada
+bloqueante no se puede abandonar) y la segunda, en el executor, la
+sustituye si falla. No se cubre con el circuito semiabierto ni con el
+executor lleno.
+
+El estado es de cada proceso: cada worker detecta la caída por su cuenta.
+"""
+
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# La cobertura no llegó a lanzarse
+_NOT_SENT = object()
+
+
+class CircuitOpenError(Exception):
+    """
+    El circuito está abierto; retry_after son los segundos hasta la siguiente sonda
+    """
+
+    # Estado HTTP con el que se responde si no hay nada en caché
+    status_code = 503
+
+    def __init__(self, retry_after):
+        self.retry_after = max(retry_after, 0.0)
+        super().__init__(
+            "APITube.io no responde (circuito abierto); "
+            f"reintenta en {math.ceil(self.retry_after)} s"
+        )
+
+
+class CircuitBreaker:
+    """
+    Circuito cerrado / abierto / semiabierto sobre una ventana deslizante de llamadas
+
+    Uso: before() antes de llamar (lanza CircuitOpenError si está abierto),
+    y record(ok, elapsed) o release() después. Con enabled=False nunca se
+    abre, pero sigue midiendo latencias para las peticiones de cobertura.
+    """
+
+    def __init__(self, window=60.0, min_calls=10, failure_rate=0.5, slow_call_seconds=8.0,
+                 slow_call_rate=0.8, open_seconds=30.0, half_open_probes=1, latency_samples=200,
+                 enabled=True, clock=time.monotonic):
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.open_seconds = open_seconds
+        self.half_open_probes = max(half_open_probes, 1)
+        self.enabled = enabled
+        self.clock = clock
+        self._lock = threading.Lock()
+        # (instante, ok, lenta) de las llamadas de la ventana
+        self._calls = deque()
+        self._failures = 0
+        self._slow = 0
+        # Latencias de las llamadas correctas más recientes
+        self._latencies = deque(maxlen=latency_samples)
+        self.state = CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+        self._probe_successes = 0
+        self.trips = 0
+        self.rejected = 0
+        self.last_trip_reason = None
+
+    def _expire(self, now):
+        while self._calls and now - self._calls[0][0] > self.window:
+            _, ok, slow = self._calls.popleft()
+            self._failures -= not ok
+            self._slow -= slow
+
+    def _open(self, now, reason):
+        self.state = OPEN
+        self._opened_at = now
+        self._probes = 0
+        self._probe_successes = 0
+        self.trips += 1
+        self.last_trip_reason = reason
+
+    def before(self):
+        """
+        Reserva una llamada o lanza CircuitOpenError
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            now = self.clock()
+            if self.state == OPEN:
+                remaining = self._opened_at + self.open_seconds - now
+                if remaining > 0:
+                    self.rejected += 1
+                    raise CircuitOpenError(remaining)
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN:
+                if self._probes >= self.half_open_probes:
+                    self.rejected += 1
+                    raise CircuitOpenError(min(self.open_seconds, self.slow_call_seconds))
+                self._probes += 1
+
+    def release(self):
+        """
+        Devuelve una reserva de before() sin resultado (la llamada no llegó a hacerse)
+        """
+        with self._lock:
+            if self.state == HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    def record(self, ok, elapsed):
+        """
+        Anota el resultado de una llamada: ok=False para errores de red, timeouts y 5xx
+        """
+        slow = elapsed >= self.slow_call_seconds
+        with self._lock:
+            now = self.clock()
+            if ok:
+                self._latencies.append(elapsed)
+            if not self.enabled:
+                return
+            if self.state == HALF_OPEN:
+                self._probes = max(self._probes - 1, 0)
+                if not ok or slow:
+                    self._open(now, 'sonda fallida' if not ok else 'sonda lenta')
+                    return
+                self._probe_successes += 1
+                if self._probe_successes >= self.half_open_probes:
+                    self.state = CLOSED
+                    self._calls.clear()
+                    self._failures = self._slow = 0
+                return
+            if self.state == OPEN:
+                # Llamadas que empezaron antes de abrirse
+                return
+            self._calls.append((now, ok, slow))
+            self._failures += not ok
+            self._slow += slow
+            self._expire(now)
+            calls = len(self._calls)
+            if calls < self.min_calls:
+                return
+            if self._failures / calls >= self.failure_rate:
+                self._open(now, f'errores {self._failures}/{calls}')
+            elif self._slow / calls >= self.slow_call_rate:
+                self._open(now, f'lentas {self._slow}/{calls}')
+
+    def latency_percentile(self, q, min_samples=1):
+        """
+        Percentil q (0-1) de las latencias correctas recientes, o None con pocas muestras
+        """
+        with self._lock:
+            samples = sorted(self._latencies)
+        if len(samples) < max(min_samples, 1):
+            return None
+        return samples[min(int(q * len(samples)), len(samples) - 1)]
+
+    def stats(self):
+        with self._lock:
+            now = self.clock()
+            self._expire(now)
+            calls = len(self._calls)
+            open_for = self._opened_at + self.open_seconds - now if self.state == OPEN else 0.0
+            return {
+                'enabled': self.enabled,
+                'state': self.state,
+                'open_for': round(max(open_for, 0.0), 1),
+                'trips': self.trips,
+                'rejected': self.rejected,
+                'last_trip_reason': self.last_trip_reason,
+                'window_calls': calls,
+                'window_failures': self._failures,
+                'window_slow': self._slow,
+            }
+
+
+class Hedger:
+    """
+    Repite una llamada si tarda más que el percentil de latencias del circuito
+
+    delay() devuelve el retraso en segundos o None si aún no hay muestras
+    suficientes (entonces no se cubre). allow() decide en el momento si se
+    puede gastar una llamada extra (p. ej. presupuesto del limitador).
+    max_workers es el tamaño del executor: con todas sus tareas ocupadas las
+    llamadas siguen sin cobertura en vez de esperar un hilo libre.
+    """
+
+    def __init__(self, breaker, executor=None, percentile=0.95, min_delay=0.05, max_delay=3.0,
+                 min_samples=20, enabled=True, max_workers=16):
+        self.breaker = breaker
+        self.executor = executor
+        self.max_workers = max_workers
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.min_samples = min_samples
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._busy = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        # Coberturas enviadas cuya respuesta se tiró porque la primera llamada salió bien
+        self.discarded = 0
+        self.skipped = 0
+
+    def delay(self):
+        if not self.enabled:
+            return None
+        latency = self.breaker.latency_percentile(self.percentile, self.min_samples)
+        if latency is None:
+            return None
+        return min(max(latency, self.min_delay), self.max_delay)
+
+    def _count(self, won, discarded=False):
+        with self._lock:
+            self.hedged += 1
+            self.hedge_wins += won
+            self.discarded += discarded
+
+    def _reserve(self):
+        # Un hilo del executor por llamada cubierta; las sondas del circuito semiabierto no se cubren
+        with self._lock:
+            if self.breaker.state == HALF_OPEN or self._busy >= self.max_workers:
+                self.skipped += 1
+                return False
+            self._busy += 1
+            return True
+
+    def _hedge(self, fn, allow, release, delay, finished):
+        # En el executor: espera a la primera hasta delay y, si sigue en curso, lanza la cobertura
+        try:
+            if finished.wait(delay) or self.breaker.state == HALF_OPEN or not allow():
+                return _NOT_SENT
+            # La primera pudo terminar mientras se consultaba el presupuesto: se devuelve lo gastado
+            if finished.is_set():
+                if release is not None:
+                    release()
+                return _NOT_SENT
+            with self._lock:
+                self.hedged += 1
+            return fn()
+        finally:
+            with self._lock:
+                self._busy -= 1
+
+    def _discard(self, hedge):
+        # La primera llamada salió bien: si la cobertura llegó a enviarse, se gastó en balde
+        if hedge.cancelled() or (hedge.exception() is None and hedge.result() is _NOT_SENT):
+            return
+        with self._lock:
+            self.discarded += 1
+
+    def call(self, fn, allow=lambda: True, release=None):
+        """
+        Ejecuta fn() en el hilo que llama y, si tarda más de delay(), lanza una cobertura en el executor
+
+        Devuelve el resultado de la primera llamada o, si esta falla, el de la
+        cobertura si salió bien. Una cobertura ya enviada no se puede cancelar:
+        si la primera gana, se cuenta en discarded. release() deshace un allow()
+        que dio permiso a una cobertura que al final no se envió.
+        """
+        delay = self.delay()
+        if delay is None or self.executor is None or not self._reserve():
+            return fn()
+        finished = threading.Event()
+        hedge = self.executor.submit(self._hedge, fn, allow, release, delay, finished)
+        try:
+            result = fn()
+        except Exception:
+            finished.set()
+            try:
+                result = hedge.result()
+            except Exception:
+                result = _NOT_SENT
+            if result is _NOT_SENT:
+                raise
+            with self._lock:
+                self.hedge_wins += 1
+            return result
+        finally:
+            # La cobertura que ya salió termina sola; su resultado se descarta
+            finished.set()
+        hedge.add_done_callback(self._discard)
+        return result
+
+    async def call_async(self, fn, allow=lambda: True):
+        """
+        Variante asíncrona de call(): fn() devuelve una corrutina; la perdedora se cancela
+        """
+        delay = self.delay()
+        if delay is None or self.breaker.state == HALF_OPEN:
+            return await fn()
+        first = asyncio.ensure_future(fn())
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done or not allow():
+            return await first
+        second = asyncio.ensure_future(fn())
+        pending = {first, second}
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    for other in pending:
+                        other.cancel()
+                    # La cobertura ya estaba enviada: si gana la primera, se gastó en balde
+                    self._count(task is second, task is first)
+                    return task.result()
+                error = error or task.exception()
+        self._count(False)
+        raise error
+
+    def stats(self):
+        delay = self.delay()
+        return {
+            'enabled': self.enabled,
+            'delay': round(delay, 3) if delay is not None else None,
+            'hedged': self.hedged,
+            'hedge_wins': self.hedge_wins,
+            'discarded': self.discarded,
+            'skipped': self.skipped,
+        }
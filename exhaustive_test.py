@@ -1,27 +1,33 @@
 #!/usr/bin/env python3
 """
 Test exhaustivo de parámetros para APITube.io
+
+Con --record las respuestas se guardan en un archivo (news_fixtures) y con
+--replay se reproducen desde él sin red ni clave, para repetir la matriz
+con las mismas respuestas y tiempos comparables:
+
+    python exhaustive_test.py --record fixtures.jsonl.gz
+    python exhaustive_test.py --replay fixtures.jsonl.gz --latency 1
 """
 
+import argparse
 import requests
 import os
 import json
+import time
 from datetime import datetime
 
+from apitube_client import APITubeClient
+from news_fixtures import FixtureArchive, RECORD, REPLAY
+
 # Configuración
 APITUBE_API_KEY = os.environ.get('APITUBE_API_KEY')
-if not APITUBE_API_KEY:
-    print("❌ Error: Configura APITUBE_API_KEY con: set APITUBE_API_KEY=tu_api_key")
-    exit(1)
 
 BASE_URL = 'https://api.apitube.io/v1/news/everything'
 
-headers = {
-    'X-API-Key': APITUBE_API_KEY,
-    'Content-Type': 'application/json'
-}
+client = None
 
-def test_parameter_variations():
+def test_parameter_variations(pause=True):
     """
     Prueba diferentes variaciones de parámetros
     """
@@ -112,10 +118,12 @@ def test_parameter_variations():
         try:
             print(f"Parámetros: {json.dumps(config['params'], indent=2)}")
             
-            response = requests.get(BASE_URL, params=config['params'], headers=headers, timeout=15)
+            start = time.perf_counter()
+            response = client.get(BASE_URL, params=config['params'], timeout=15)
             
             print(f"📡 URL completa: {response.url}")
             print(f"📊 Status Code: {response.status_code}")
+            print(f"⏱️  Tiempo: {(time.perf_counter() - start) * 1000:.1f} ms")
             
             if response.status_code == 200:
                 try:
@@ -159,12 +167,38 @@ def test_parameter_variations():
         except Exception as e:
             print(f"💥 Error inesperado: {e}")
             
-        input("\n⏸️  Presiona Enter para continuar al siguiente test...")
+        if pause:
+            input("\n⏸️  Presiona Enter para continuar al siguiente test...")
+    
+    print(f"\n📊 Estadísticas del pool: {client.pool_stats()}")
+    if client.fixtures is not None:
+        print(f"🎞️  Respuestas grabadas: {client.fixtures.stats()}")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Test exhaustivo de parámetros para APITube.io')
+    parser.add_argument('--record', metavar='ARCHIVO', help='grabar las respuestas en este archivo (.jsonl.gz)')
+    parser.add_argument('--replay', metavar='ARCHIVO', help='reproducir las respuestas grabadas, sin red')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='con --replay, multiplicador de la latencia grabada (0 = sin espera)')
+    parser.add_argument('--no-pause', action='store_true', help='no esperar a Enter entre tests')
+    args = parser.parse_args()
+
+    if not APITUBE_API_KEY and not args.replay:
+        print("❌ Error: Configura APITUBE_API_KEY con: set APITUBE_API_KEY=tu_api_key")
+        exit(1)
+    if args.record:
+        fixtures = FixtureArchive(args.record, RECORD)
+    elif args.replay:
+        fixtures = FixtureArchive(args.replay, REPLAY, latency=args.latency)
+    else:
+        fixtures = None
+    client = APITubeClient(api_key=APITUBE_API_KEY, fixtures=fixtures)
+
     print("🚀 DIAGNÓSTICO EXHAUSTIVO APITube.io")
     print(f"🔑 API Key: {'✅ Configurada' if APITUBE_API_KEY else '❌ No configurada'}")
-    print(f"🔢 Longitud: {len(APITUBE_API_KEY)} caracteres")
+    print(f"🔢 Longitud: {len(APITUBE_API_KEY or '')} caracteres")
     print(f"🏁 Prefijo: {APITUBE_API_KEY[:10]}..." if APITUBE_API_KEY else "N/A")
+    if fixtures is not None:
+        print(f"🎞️  Modo {fixtures.mode}: {fixtures.path}")
     
-    test_parameter_variations()
\ No newline at end of file
+    test_parameter_variations(pause=not (args.no_pause or args.replay))
\ No newline at end of file
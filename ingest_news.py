@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Ingesta de artículos de APITube.io en el almacén local
+
+Pensado para cron o un worker aparte cuando la app corre sin hilos
+persistentes (p. ej. en Vercel). Usa la misma configuración que app.py.
+
+Uso:
+    NEWS_STORE_PATH=/tmp/news_store.db python ingest_news.py          # una pasada
+    NEWS_STORE_PATH=/tmp/news_store.db python ingest_news.py --loop   # cada NEWS_INGEST_INTERVAL
+"""
+
+import argparse
+import json
+import sys
+
+import app
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Ingesta de artículos en el almacén local')
+    parser.add_argument('--loop', action='store_true', help='repetir cada NEWS_INGEST_INTERVAL segundos')
+    args = parser.parse_args()
+
+    if app.article_ingester is None:
+        print("❌ NEWS_STORE_PATH no está configurada")
+        return 1
+    if not app.APITUBE_API_KEY:
+        print("❌ APITUBE_API_KEY no está configurada")
+        return 1
+
+    if args.loop:
+        app.article_ingester.start()
+        app.article_ingester._thread.join()
+        return 0
+
+    added = app.article_ingester.run_once()
+    print(f"✅ {added} artículos nuevos")
+    print(json.dumps(app.article_store.stats(), indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,153 @@
+"""
+Representación compacta de listas de artículos normalizados
+
+La caché guarda miles de artículos por worker; como lista de dicts anidados
+('source': {'name': ...}) cada uno arrastra cientos de bytes de estructura.
+ArticleColumns guarda cada campo en una tupla (una entrada por artículo),
+con los nombres de fuente y las fechas internados, y solo construye los
+dicts habituales al iterar, es decir, al llegar a jsonify o al template.
+"""
+
+import sys
+
+_MARKER = '__articles__'
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class ArticleColumns:
+    """
+    Lista inmutable de artículos guardada por columnas
+
+    Se comporta como una secuencia de dicts con la forma de normalize_article
+    (len, iteración, índices); un corte devuelve otro ArticleColumns.
+    """
+
+    __slots__ = ('titles', 'descriptions', 'urls', 'dates', 'sources', 'images', 'contents', 'related')
+
+    def __init__(self, titles=(), descriptions=(), urls=(), dates=(), sources=(), images=(), contents=(),
+                 related=None):
+        self.titles = tuple(titles)
+        self.descriptions = tuple(descriptions)
+        self.urls = tuple(urls)
+        self.dates = tuple(map(_intern, dates))
+        self.sources = tuple(map(_intern, sources))
+        self.images = tuple(images)
+        self.contents = tuple(contents)
+        # Solo existe si los artículos pasaron por la agrupación de duplicados
+        self.related = tuple(related) if related is not None else None
+
+    @classmethod
+    def from_dicts(cls, articles):
+        """
+        Convierte una lista de artículos normalizados (dicts)
+        """
+        if isinstance(articles, cls):
+            return articles
+        articles = list(articles)
+        related = None
+        if articles and 'related' in articles[0]:
+            related = [article.get('related', 0) for article in articles]
+        return cls(
+            [article.get('title') for article in articles],
+            [article.get('description') for article in articles],
+            [article.get('url') for article in articles],
+            [article.get('publishedAt') for article in articles],
+            [(article.get('source') or {}).get('name') for article in articles],
+            [article.get('urlToImage') for article in articles],
+            [article.get('content') for article in articles],
+            related
+        )
+
+    @classmethod
+    def from_columns(cls, columns):
+        """
+        Convierte la salida columnar de normalize_articles (campo -> lista)
+        """
+        return cls(
+            columns['title'], columns['description'], columns['url'], columns['publishedAt'],
+            [source.get('name') for source in columns['source']],
+            columns['urlToImage'], columns['content'], columns.get('related')
+        )
+
+    def __len__(self):
+        return len(self.titles)
+
+    def _row(self, index):
+        article = {
+            'title': self.titles[index],
+            'description': self.descriptions[index],
+            'url': self.urls[index],
+            'publishedAt': self.dates[index],
+            'source': {'name': self.sources[index]},
+            'urlToImage': self.images[index],
+            'content': self.contents[index],
+        }
+        if self.related is not None:
+            article['related'] = self.related[index]
+        return article
+
+    def __iter__(self):
+        return map(self._row, range(len(self.titles)))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return ArticleColumns(
+                self.titles[index], self.descriptions[index], self.urls[index], self.dates[index],
+                self.sources[index], self.images[index], self.contents[index],
+                self.related[index] if self.related is not None else None
+            )
+        if index < 0:
+            index += len(self.titles)
+        if not 0 <= index < len(self.titles):
+            raise IndexError('índice de artículo fuera de rango')
+        return self._row(index)
+
+    def __eq__(self, other):
+        if isinstance(other, ArticleColumns):
+            return self.to_json() == other.to_json()
+        if isinstance(other, list):
+            return self.to_dicts() == other
+        return NotImplemented
+
+    def __repr__(self):
+        return f'<ArticleColumns {len(self)} artículos>'
+
+    def to_dicts(self):
+        return list(self)
+
+    def to_json(self):
+        """
+        Forma serializable a JSON (columnas con un marcador) para los backends compartidos
+        """
+        data = {
+            _MARKER: 1,
+            'title': self.titles,
+            'description': self.descriptions,
+            'url': self.urls,
+            'publishedAt': self.dates,
+            'source': self.sources,
+            'urlToImage': self.images,
+            'content': self.contents,
+        }
+        if self.related is not None:
+            data['related'] = self.related
+        return data
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(
+            data['title'], data['description'], data['url'], data['publishedAt'], data['source'],
+            data['urlToImage'], data['content'], data.get('related')
+        )
+
+
+def json_object_hook(data):
+    """
+    object_hook para json.loads que reconstruye los ArticleColumns serializados
+    """
+    if _MARKER in data:
+        return ArticleColumns.from_json(data)
+    return data
@@ -0,0 +1,255 @@
+"""
+Caché en memoria con TTL y expulsión LRU para resultados de noticias
+
+Acotada por número de entradas y por bytes aproximados, con contadores
+de aciertos, fallos y expulsiones. Las entradas caducadas se conservan
+un tiempo extra para servirlas obsoletas mientras se refrescan
+(stale-while-revalidate) o cuando el upstream falla (stale-if-error).
+"""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+from news_json import dumps
+
+# Estados devueltos por TTLCache.lookup()
+FRESH = 'fresh'
+STALE = 'stale'
+EXPIRED = 'expired'
+MISS = 'miss'
+
+
+def estimate_size(value):
+    """
+    Tamaño aproximado en bytes de un valor serializable a JSON
+    """
+    return len(dumps(value))
+
+
+class TTLCache:
+    """
+    Caché LRU segura entre hilos con TTL por clave
+    """
+
+    def __init__(self, max_entries=256, max_bytes=16 * 1024 * 1024, default_ttl=300,
+                 stale_ttl=0, stale_if_error_ttl=0, sizeof=estimate_size, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        # Segundos tras caducar en los que se sirve obsoleto y se refresca en segundo plano
+        self.stale_ttl = stale_ttl
+        # Segundos tras caducar en los que se conserva como último resultado bueno
+        self.stale_if_error_ttl = max(stale_if_error_ttl, stale_ttl)
+        self.sizeof = sizeof
+        self.clock = clock
+        self._lock = threading.Lock()
+        # clave -> (valor, expira_en, bytes)
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        """
+        Devuelve el valor vigente o None si no existe o ha caducado
+        """
+        value, state = self.lookup(key, allow_stale=False)
+        return value if state == FRESH else None
+
+    def lookup(self, key, allow_stale=True):
+        """
+        Devuelve (valor, estado) donde estado es FRESH, STALE, EXPIRED o MISS
+
+        STALE indica que puede servirse mientras se refresca; EXPIRED que solo
+        debe usarse si el refresco falla.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None, MISS
+            value, expires_at, size = entry
+            now = self.clock()
+            if expires_at > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value, FRESH
+            age = now - expires_at
+            if age >= self.stale_if_error_ttl:
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None, MISS
+            if allow_stale and age < self.stale_ttl:
+                self._entries.move_to_end(key)
+                self.stale_hits += 1
+                return value, STALE
+            self.misses += 1
+            if not allow_stale:
+                return None, MISS
+            return value, EXPIRED
+
+    def expires_in(self, key):
+        """
+        Segundos hasta que caduca la entrada (negativo si ya caducó) o None si no está; no cuenta como acceso
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            return None if entry is None else entry[1] - self.clock()
+
+    def set(self, key, value, ttl=None):
+        """
+        Guarda un valor con su TTL y expulsa las entradas menos usadas si hace falta
+        """
+        ttl = self.default_ttl if ttl is None else ttl
+        if ttl <= 0:
+            return False
+        size = self.sizeof(value)
+        if size > self.max_bytes:
+            return False
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, self.clock() + ttl, size)
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries
+                                     or self._bytes > self.max_bytes):
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+        return True
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, key):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            # Mismo denominador que los backends compartidos: toda consulta, también las obsoletas
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'stale_hits': self.stale_hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+
+class SingleFlight:
+    """
+    Agrupa llamadas concurrentes con la misma clave en una sola ejecución
+
+    El resultado se publica en un concurrent.futures.Future, de modo que
+    pueden esperarlo tanto hilos como corrutinas de cualquier bucle asyncio.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.executions = 0
+        self.shared = 0
+
+    def _join(self, key):
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.shared += 1
+                return future, False
+            future = self._calls[key] = Future()
+            self.executions += 1
+            return future, True
+
+    def _finish(self, key):
+        with self._lock:
+            self._calls.pop(key, None)
+
+    def do(self, key, fn, timeout=None):
+        """
+        Ejecuta fn() una vez por clave; el resto de hilos esperan su resultado
+
+        Devuelve (resultado, compartido). Lanza TimeoutError si la espera supera
+        timeout y propaga las excepciones de fn a todos los que esperan.
+        """
+        future, leader = self._join(key)
+        if leader:
+            self._run(key, future, fn)
+        try:
+            return future.result(timeout), not leader
+        except FutureTimeoutError:
+            raise TimeoutError(f"Tiempo de espera agotado para {key!r}") from None
+
+    async def do_async(self, key, coro_fn, timeout=None):
+        """
+        Variante asíncrona de do(): coro_fn() devuelve la corrutina a ejecutar
+        """
+        future, leader = self._join(key)
+        if leader:
+            try:
+                future.set_result(await coro_fn())
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                self._finish(key)
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"Tiempo de espera agotado para {key!r}") from None
+        return result, not leader
+
+    def do_background(self, key, fn):
+        """
+        Lanza fn() en un hilo si no hay ya una ejecución en curso para la clave
+        """
+        with self._lock:
+            if key in self._calls:
+                return False
+            future = self._calls[key] = Future()
+            self.executions += 1
+        thread = threading.Thread(target=self._run, args=(key, future, fn), daemon=True)
+        thread.start()
+        return True
+
+    def _run(self, key, future, fn):
+        try:
+            future.set_result(fn())
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            self._finish(key)
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'in_flight': len(self._calls),
+                'executions': self.executions,
+                'shared': self.shared,
+            }
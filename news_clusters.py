@@ -0,0 +1,144 @@
+"""
+Agrupación de noticias casi duplicadas (la misma nota de agencia en muchas fuentes)
+
+Cada artículo se resume en una firma MinHash de sus bigramas de palabras
+(título, descripción y extracto, sin acentos). Se usa MinHash de una sola
+permutación: cada bigrama se hashea una vez y cae en uno de los NUM_BINS
+cubos, así que el coste es lineal en el texto. Un índice LSH por bandas
+propone candidatos y solo se comparan firmas dentro de cada cubo, por lo que
+el conjunto completo se agrupa en tiempo lineal con el número de artículos.
+"""
+
+import hashlib
+import re
+
+from search_index import fold
+
+NUM_BINS = 32
+BANDS = 8
+ROWS = NUM_BINS // BANDS
+MAX_TOKENS = 80
+
+_WORD = re.compile(r'\w+')
+_MASK = (1 << 64) - 1
+_EMPTY = _MASK
+
+
+def article_text(article):
+    return ' '.join(filter(None, (article.get('title'), article.get('description'), article.get('content'))))
+
+
+def _stable_hash(text):
+    # hash() cambia entre procesos (PYTHONHASHSEED): cada worker agruparía distinto y daría otro ETag
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def shingles(text, max_tokens=MAX_TOKENS):
+    """
+    Hashes de los bigramas de palabras del texto normalizado, iguales en todos los procesos
+    """
+    tokens = _WORD.findall(fold(text))[:max_tokens]
+    if len(tokens) < 2:
+        return {_stable_hash(token) for token in tokens}
+    return {_stable_hash(f'{first} {second}') for first, second in zip(tokens, tokens[1:])}
+
+
+def signature(hashes):
+    """
+    Firma MinHash de una permutación con densificación por rotación de los cubos vacíos
+    """
+    bins = [_EMPTY] * NUM_BINS
+    for value in hashes:
+        index = value % NUM_BINS
+        value //= NUM_BINS
+        if value < bins[index]:
+            bins[index] = value
+    if _EMPTY in bins and len(hashes):
+        # Un cubo vacío toma el valor del siguiente no vacío, desplazado por la distancia
+        for index in range(NUM_BINS):
+            if bins[index] == _EMPTY:
+                step = 1
+                while bins[(index + step) % NUM_BINS] == _EMPTY:
+                    step += 1
+                bins[index] = -((bins[(index + step) % NUM_BINS] << 6) | step)
+    return tuple(bins)
+
+
+def similarity(first, second):
+    """
+    Estimación de la similitud de Jaccard entre dos firmas
+    """
+    return sum(1 for a, b in zip(first, second) if a == b) / NUM_BINS
+
+
+def _similar(first, second, threshold):
+    """
+    Compara dos entradas (firma, bigramas o None); los textos cortos se comparan exactamente
+
+    Con pocos bigramas la mayoría de cubos de la firma vienen de la
+    densificación y la estimación no es fiable.
+    """
+    (first_sig, first_set, first_size), (second_sig, second_set, second_size) = first, second
+    if min(first_size, second_size) / max(first_size, second_size) < threshold:
+        return False
+    if first_set is not None and second_set is not None:
+        return len(first_set & second_set) / len(first_set | second_set) >= threshold
+    return similarity(first_sig, second_sig) >= threshold
+
+
+def cluster(texts, threshold=0.6):
+    """
+    Asigna a cada texto el índice del primer texto de su grupo
+
+    Devuelve una lista con, para cada posición, la posición de su representante.
+    """
+    parents = list(range(len(texts)))
+
+    def find(index):
+        while parents[index] != index:
+            parents[index] = parents[parents[index]]
+            index = parents[index]
+        return index
+
+    buckets = {}
+    entries = []
+    for index, text in enumerate(texts):
+        hashes = shingles(text)
+        sig = signature(hashes)
+        entries.append((sig, hashes if len(hashes) < NUM_BINS else None, len(hashes)))
+        if not hashes:
+            continue
+        for band in range(BANDS):
+            key = (band,) + sig[band * ROWS:(band + 1) * ROWS]
+            first = buckets.setdefault(key, index)
+            if first == index:
+                continue
+            # Solo se compara con el primero del cubo para que el coste siga siendo lineal
+            root, other = find(first), find(index)
+            if root != other and _similar(entries[first], entries[index], threshold):
+                # El representante es siempre el que aparece antes
+                if root < other:
+                    parents[other] = root
+                else:
+                    parents[root] = other
+    return [find(index) for index in range(len(texts))]
+
+
+def collapse_duplicates(articles, threshold=0.6):
+    """
+    Deja un artículo por grupo de casi duplicados, con 'related' = nº de artículos agrupados
+
+    Se conserva el orden original y el representante es el primero del grupo.
+    """
+    if len(articles) < 2:
+        return [dict(article, related=0) for article in articles]
+    representatives = cluster([article_text(article) for article in articles], threshold)
+    related = {}
+    for index, root in enumerate(representatives):
+        if index != root:
+            related[root] = related.get(root, 0) + 1
+    return [
+        dict(article, related=related.get(index, 0))
+        for index, article in enumerate(articles)
+        if representatives[index] == index
+    ]
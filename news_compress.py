@@ -0,0 +1,97 @@
+"""
+Compresión de respuestas negociada con Accept-Encoding (brotli y gzip)
+
+gzip viene con Python; brotli se usa si está instalado (pip install brotli),
+y se prefiere a igual calidad porque comprime más el JSON y el HTML. Las
+respuestas con ETag se comprimen una vez: CompressedBodies guarda los bytes
+comprimidos por (ETag, codificación), de modo que una clave caliente se
+sirve sin volver a serializar ni comprimir.
+"""
+
+import gzip
+import time
+
+from news_cache import TTLCache
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Tipos que merece la pena comprimir
+COMPRESSIBLE_TYPES = frozenset((
+    'application/json', 'application/x-ndjson', 'text/html', 'text/plain', 'text/css',
+    'application/javascript',
+))
+
+
+def available_encodings():
+    """
+    Codificaciones soportadas, en orden de preferencia a igual calidad
+    """
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def negotiate(accept_encodings, encodings=None):
+    """
+    Mejor codificación aceptada por el cliente (werkzeug Accept) o None
+    """
+    return accept_encodings.best_match(encodings or available_encodings())
+
+
+def compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    if encoding == 'gzip':
+        # mtime=0: mismos bytes para el mismo contenido en todos los workers
+        return gzip.compress(data, GZIP_LEVEL, mtime=0)
+    raise ValueError(f'Codificación no soportada: {encoding}')
+
+
+class CompressedBodies:
+    """
+    Cuerpos ya comprimidos por (ETag, codificación), acotados en bytes con LRU
+
+    Cada entrada es (mimetype, bytes). Vive lo mismo que una entrada de la
+    caché de noticias (TTL más la ventana de obsoletos): si el contenido
+    cambia, cambia el ETag y la entrada antigua deja de usarse.
+    """
+
+    def __init__(self, max_bytes=32 * 1024 * 1024, ttl=900, max_entries=2048, clock=time.monotonic):
+        self._cache = TTLCache(
+            max_entries=max_entries,
+            max_bytes=max_bytes,
+            default_ttl=ttl,
+            sizeof=lambda entry: len(entry[1]),
+            clock=clock
+        )
+        self.compressions = 0
+        self.compressed_bytes = 0
+        self.original_bytes = 0
+
+    def get(self, etag, encoding):
+        return self._cache.get((etag, encoding))
+
+    def compress(self, etag, encoding, mimetype, data):
+        """
+        Comprime data y lo guarda si hay ETag; devuelve los bytes comprimidos
+        """
+        body = compress(data, encoding)
+        self.compressions += 1
+        self.original_bytes += len(data)
+        self.compressed_bytes += len(body)
+        if etag:
+            self._cache.set((etag, encoding), (mimetype, body))
+        return body
+
+    def stats(self):
+        stats = self._cache.stats()
+        stats.update({
+            'encodings': available_encodings(),
+            'compressions': self.compressions,
+            'ratio': round(self.compressed_bytes / self.original_bytes, 4) if self.original_bytes else None,
+        })
+        return stats
@@ -0,0 +1,185 @@
+"""
+Grabación y reproducción de las respuestas de APITube.io
+
+Con mode='record' cada respuesta del upstream se guarda (ruta, parámetros,
+estado, cabeceras, cuerpo tal cual y tiempo de respuesta) en un archivo
+JSONL comprimido con gzip. Cada entrada se añade como un miembro gzip
+propio, así que el archivo se puede leer aunque el proceso muera a mitad,
+y grabar otra vez sobre el mismo archivo añade entradas. Con mode='replay' se
+responde desde el archivo sin red y, si latency > 0, tras esperar la
+latencia grabada multiplicada por latency: dos ejecuciones ven exactamente
+las mismas respuestas.
+
+Las peticiones se identifican por la ruta y los parámetros ordenados, sin
+el host ni las cabeceras (la clave de la API no se graba). Si la misma
+petición se grabó varias veces, se reproducen por turnos. Una petición que
+no está en el archivo lanza FixtureNotFound, un ConnectionError de
+requests, como si el upstream no respondiera.
+
+Se engancha al cliente síncrono como adaptador de transporte de requests
+(FixtureAdapter, delante del adaptador con el pool) y al asíncrono desde
+AsyncAPITubeClient.get.
+"""
+
+import base64
+import gzip
+import http.client
+import io
+import json
+import logging
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+logger = logging.getLogger(__name__)
+
+RECORD = 'record'
+REPLAY = 'replay'
+MODES = (RECORD, REPLAY)
+
+# Cabeceras que no se graban: el cuerpo se guarda ya descomprimido y sin trocear
+SKIPPED_HEADERS = frozenset((
+    'content-encoding', 'content-length', 'transfer-encoding', 'connection', 'keep-alive', 'set-cookie'
+))
+
+
+class FixtureNotFound(requests.exceptions.ConnectionError):
+    """
+    La petición no está en el archivo de respuestas grabadas
+    """
+
+
+def request_key(url):
+    """
+    Clave de una petición: la ruta y los parámetros ordenados de la URL completa
+    """
+    parts = urlsplit(url)
+    return f'{parts.path}?{urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))}'
+
+
+class FixtureArchive:
+    """
+    Archivo de respuestas grabadas (.jsonl.gz) en modo record o replay
+    """
+
+    def __init__(self, path, mode, latency=0.0):
+        if mode not in MODES:
+            raise ValueError(f"Modo de fixtures desconocido: {mode!r} (usa {' o '.join(MODES)})")
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self._lock = threading.Lock()
+        # clave -> respuestas grabadas, en orden
+        self._entries = {}
+        self._turns = {}
+        self.recorded = 0
+        self.replayed = 0
+        self.missing = 0
+        if mode == REPLAY:
+            self._load()
+
+    def _load(self):
+        with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._entries.setdefault(entry['key'], []).append(entry)
+        logger.info(f"Respuestas grabadas de APITube.io: {sum(map(len, self._entries.values()))} "
+                    f"para {len(self._entries)} peticiones ({self.path})")
+
+    def record(self, url, status, headers, body, elapsed):
+        """
+        Añade una respuesta al archivo
+        """
+        entry = {
+            'key': request_key(url),
+            'status': status,
+            'headers': {name: value for name, value in headers.items() if name.lower() not in SKIPPED_HEADERS},
+            'elapsed': round(elapsed, 4),
+            'recorded_at': round(time.time(), 3),
+        }
+        try:
+            entry['body'] = body.decode('utf-8')
+        except UnicodeDecodeError:
+            entry['body_base64'] = base64.b64encode(body).decode('ascii')
+        line = json.dumps(entry, ensure_ascii=False) + '\n'
+        with self._lock:
+            with gzip.open(self.path, 'at', encoding='utf-8') as f:
+                f.write(line)
+            self.recorded += 1
+
+    def lookup(self, url):
+        """
+        (estado, cabeceras, cuerpo, segundos de espera) de la siguiente respuesta grabada para url
+        """
+        key = request_key(url)
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                self.missing += 1
+                raise FixtureNotFound(f"Sin respuesta grabada para {key} en {self.path}")
+            turn = self._turns.get(key, 0)
+            self._turns[key] = turn + 1
+            self.replayed += 1
+        entry = entries[turn % len(entries)]
+        body = entry['body'].encode('utf-8') if 'body' in entry else base64.b64decode(entry['body_base64'])
+        return entry['status'], entry['headers'], body, entry.get('elapsed', 0.0) * self.latency
+
+    def stats(self):
+        with self._lock:
+            return {
+                'mode': self.mode,
+                'path': self.path,
+                'latency': self.latency,
+                'requests': len(self._entries),
+                'recorded': self.recorded,
+                'replayed': self.replayed,
+                'missing': self.missing,
+            }
+
+
+def _replayed_response(request, status, headers, body):
+    response = requests.Response()
+    response.status_code = status
+    response.reason = http.client.responses.get(status, '')
+    response.headers = CaseInsensitiveDict(headers)
+    response.encoding = get_encoding_from_headers(response.headers)
+    # Como un cuerpo sin leer: sirve tanto .content como iter_content() con stream=True
+    response.raw = io.BytesIO(body)
+    response.url = request.url
+    response.request = request
+    return response
+
+
+class FixtureAdapter(BaseAdapter):
+    """
+    Adaptador de transporte de requests que graba o reproduce las respuestas de adapter
+    """
+
+    def __init__(self, archive, adapter):
+        super().__init__()
+        self.archive = archive
+        self.adapter = adapter
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        if self.archive.mode == REPLAY:
+            status, headers, body, delay = self.archive.lookup(request.url)
+            if delay:
+                time.sleep(delay)
+            return _replayed_response(request, status, headers, body)
+        start = time.perf_counter()
+        response = self.adapter.send(request, stream=stream, timeout=timeout, verify=verify, cert=cert,
+                                     proxies=proxies)
+        # Lee el cuerpo entero también con stream=True; iter_content() reutiliza lo leído
+        body = response.content
+        self.archive.record(request.url, response.status_code, response.headers, body,
+                            time.perf_counter() - start)
+        return response
+
+    def close(self):
+        self.adapter.close()
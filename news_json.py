@@ -0,0 +1,215 @@
+"""
+Serialización JSON intercambiable: orjson, msgspec o la biblioteca estándar
+
+Se usa para leer las respuestas de APITube.io, para guardar en los backends
+de caché compartidos y para las respuestas de la API. NEWS_JSON_BACKEND
+elige el backend (auto, orjson, msgspec o stdlib); con 'auto' se usa el más
+rápido que esté instalado. dumps() siempre devuelve bytes UTF-8 compactos.
+
+decode_news_page() lee una página del upstream y devuelve directamente las
+columnas de campos que necesita la normalización: con msgspec solo se
+decodifican esos campos y el resto del artículo (entidades, temas,
+sentimiento...) se salta sin crear objetos.
+"""
+
+import json
+import logging
+import os
+
+from news_articles import ArticleColumns, json_object_hook
+
+logger = logging.getLogger(__name__)
+
+# Campos de primer nivel de la respuesta que se conservan en la info de página
+PAGE_FIELDS = ('status', 'message', 'page', 'total_results', 'totalResults', 'total', 'has_next_pages')
+
+
+def json_default(value):
+    """
+    default/enc_hook de los codificadores: los objetos compactos (p. ej. ArticleColumns) exponen to_json()
+    """
+    to_json = getattr(value, 'to_json', None)
+    if to_json is None:
+        raise TypeError(f'{type(value).__name__} no es serializable a JSON')
+    return to_json()
+
+
+def restore_compact(value):
+    """
+    Reconstruye los ArticleColumns de un valor decodificado (para backends sin object_hook)
+    """
+    if isinstance(value, dict):
+        if '__articles__' in value:
+            return ArticleColumns.from_json(value)
+        for key, item in value.items():
+            if isinstance(item, dict):
+                value[key] = restore_compact(item)
+    return value
+
+
+def is_titled(article):
+    """
+    True si normalize_article conservaría el artículo (tiene título no vacío)
+    """
+    title = article.get('title')
+    return bool(title and title.strip())
+
+
+def raw_columns(articles):
+    """
+    Columnas crudas de los artículos con título, a partir de dicts del upstream
+    """
+    kept = [article for article in articles if is_titled(article)]
+    return {
+        'title': [article['title'] for article in kept],
+        'description': [article.get('description', '') for article in kept],
+        'href': [article.get('href', '') for article in kept],
+        'published_at': [article.get('published_at') for article in kept],
+        'source_name': [(article.get('source') or {}).get('name', 'Fuente desconocida') for article in kept],
+        'image': [article.get('image', '') for article in kept],
+        'body': [article.get('body') for article in kept],
+    }
+
+
+def split_news_page(data):
+    """
+    Separa una respuesta ya decodificada en (info de página, columnas crudas)
+    """
+    results = data.get('results', [])
+    info = {field: data[field] for field in PAGE_FIELDS if field in data}
+    info['result_count'] = len(results)
+    return info, raw_columns(results)
+
+
+class StdlibBackend:
+    name = 'stdlib'
+
+    def __init__(self):
+        self._encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'), default=json_default)
+
+    def dumps(self, value):
+        return self._encoder.encode(value).encode('utf-8')
+
+    def loads(self, data):
+        return json.loads(data, object_hook=json_object_hook)
+
+    def decode_news_page(self, data):
+        return split_news_page(json.loads(data))
+
+
+class OrjsonBackend:
+    name = 'orjson'
+
+    def __init__(self):
+        import orjson
+        self._orjson = orjson
+        # Claves no str (p. ej. enteros en estadísticas) como hace la biblioteca estándar
+        self._options = orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, value):
+        return self._orjson.dumps(value, default=json_default, option=self._options)
+
+    def loads(self, data):
+        return restore_compact(self._orjson.loads(data))
+
+    def decode_news_page(self, data):
+        return split_news_page(self._orjson.loads(data))
+
+
+class MsgspecBackend:
+    name = 'msgspec'
+
+    def __init__(self):
+        from typing import Any, List
+        import msgspec
+
+        # Solo los campos declarados se decodifican; el resto del artículo se salta
+        class UpstreamArticle(msgspec.Struct):
+            title: Any = None
+            description: Any = ''
+            href: Any = ''
+            published_at: Any = None
+            source: Any = None
+            image: Any = ''
+            body: Any = None
+
+        class UpstreamPage(msgspec.Struct):
+            status: Any = True
+            message: Any = None
+            page: Any = None
+            total_results: Any = None
+            totalResults: Any = None
+            total: Any = None
+            has_next_pages: Any = None
+            results: List[UpstreamArticle] = []
+
+        self._encoder = msgspec.json.Encoder(enc_hook=json_default)
+        self._decoder = msgspec.json.Decoder()
+        self._page_decoder = msgspec.json.Decoder(UpstreamPage)
+
+    def dumps(self, value):
+        return self._encoder.encode(value)
+
+    def loads(self, data):
+        return restore_compact(self._decoder.decode(data))
+
+    def decode_news_page(self, data):
+        page = self._page_decoder.decode(data)
+        info = {field: getattr(page, field) for field in PAGE_FIELDS if getattr(page, field) is not None}
+        info.setdefault('status', True)
+        info['result_count'] = len(page.results)
+        kept = [article for article in page.results
+                if isinstance(article.title, str) and article.title.strip()]
+        return info, {
+            'title': [article.title for article in kept],
+            'description': [article.description for article in kept],
+            'href': [article.href for article in kept],
+            'published_at': [article.published_at for article in kept],
+            'source_name': [(article.source or {}).get('name', 'Fuente desconocida')
+                            if isinstance(article.source, dict) else 'Fuente desconocida'
+                            for article in kept],
+            'image': [article.image for article in kept],
+            'body': [article.body for article in kept],
+        }
+
+
+BACKENDS = {
+    'msgspec': MsgspecBackend,
+    'orjson': OrjsonBackend,
+    'stdlib': StdlibBackend,
+}
+
+
+def get_backend(name='auto'):
+    """
+    Crea el backend pedido; con 'auto' prueba msgspec, orjson y la biblioteca estándar
+    """
+    name = (name or 'auto').strip().lower()
+    candidates = ('msgspec', 'orjson', 'stdlib') if name == 'auto' else (name, 'stdlib')
+    for candidate in candidates:
+        try:
+            return BACKENDS[candidate]()
+        except ImportError:
+            if name != 'auto':
+                logger.warning(f"El backend JSON '{candidate}' no está instalado; se usa la biblioteca estándar")
+        except KeyError:
+            raise ValueError(f"Backend JSON no soportado: {name}") from None
+    return StdlibBackend()
+
+
+backend = get_backend(os.environ.get('NEWS_JSON_BACKEND', 'auto'))
+
+
+def dumps(value):
+    return backend.dumps(value)
+
+
+def loads(data):
+    return backend.loads(data)
+
+
+def decode_news_page(data):
+    """
+    (info de página, columnas crudas de los artículos con título) de una respuesta de APITube.io
+    """
+    return backend.decode_news_page(data)
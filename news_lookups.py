@@ -0,0 +1,107 @@
+"""
+Tablas fijas de categorías, países e idiomas
+
+Se construyen una vez al importar el módulo: las listas que usan el
+formulario y la API, conjuntos para validar en O(1) los filtros que llegan
+en cada petición (antes de gastar una llamada a APITube.io en ellos) y el
+JSON ya serializado de /api/categories y /api/countries con su ETag.
+"""
+
+import hashlib
+
+import news_json
+
+# Categorías disponibles en APITube.io según su documentación
+CATEGORIES = (
+    {'id': 'general', 'name': 'General'},
+    {'id': 'business', 'name': 'Negocios'},
+    {'id': 'entertainment', 'name': 'Entretenimiento'},
+    {'id': 'health', 'name': 'Salud'},
+    {'id': 'science', 'name': 'Ciencia'},
+    {'id': 'sports', 'name': 'Deportes'},
+    {'id': 'technology', 'name': 'Tecnología'},
+    {'id': 'politics', 'name': 'Política'},
+    {'id': 'finance', 'name': 'Finanzas'},
+    {'id': 'education', 'name': 'Educación'},
+    {'id': 'travel', 'name': 'Viajes'},
+    {'id': 'food', 'name': 'Comida'},
+    {'id': 'lifestyle', 'name': 'Estilo de vida'},
+)
+
+COUNTRIES = (
+    {'code': '', 'name': 'Todos los países'},
+    {'code': 'es', 'name': 'España'},
+    {'code': 'mx', 'name': 'México'},
+    {'code': 'ar', 'name': 'Argentina'},
+    {'code': 'co', 'name': 'Colombia'},
+    {'code': 'pe', 'name': 'Perú'},
+    {'code': 'cl', 'name': 'Chile'},
+    {'code': 'us', 'name': 'Estados Unidos'},
+    {'code': 'gb', 'name': 'Reino Unido'},
+    {'code': 'fr', 'name': 'Francia'},
+    {'code': 'de', 'name': 'Alemania'},
+    {'code': 'it', 'name': 'Italia'},
+    {'code': 'br', 'name': 'Brasil'},
+    {'code': 'cn', 'name': 'China'},
+    {'code': 'jp', 'name': 'Japón'},
+    {'code': 'in', 'name': 'India'},
+)
+
+LANGUAGES = (
+    {'code': 'es', 'name': '🇪🇸 Español'},
+    {'code': 'en', 'name': '🇺🇸 English'},
+    {'code': 'fr', 'name': '🇫🇷 Français'},
+    {'code': 'de', 'name': '🇩🇪 Deutsch'},
+    {'code': 'it', 'name': '🇮🇹 Italiano'},
+    {'code': 'pt', 'name': '🇵🇹 Português'},
+    {'code': 'ru', 'name': '🇷🇺 Русский'},
+    {'code': 'zh', 'name': '🇨🇳 中文'},
+)
+
+
+class LookupResponse:
+    """
+    Cuerpo JSON ya serializado de una respuesta fija y su ETag
+    """
+
+    __slots__ = ('body', 'etag')
+
+    def __init__(self, value):
+        self.body = news_json.dumps(value) + b'\n'
+        self.etag = hashlib.blake2b(self.body, digest_size=16).hexdigest()
+
+
+class LookupRegistry:
+    """
+    Categorías, países e idiomas con sus conjuntos de validación y respuestas JSON
+    """
+
+    def __init__(self, categories=CATEGORIES, countries=COUNTRIES, languages=LANGUAGES):
+        self.categories = tuple(categories)
+        self.countries = tuple(countries)
+        self.languages = tuple(languages)
+        self.category_ids = frozenset(category['id'] for category in self.categories)
+        self.country_codes = frozenset(country['code'] for country in self.countries)
+        self.language_codes = frozenset(language['code'] for language in self.languages)
+        self.categories_response = LookupResponse({'status': 'success', 'categories': self.categories})
+        self.countries_response = LookupResponse({'status': 'success', 'countries': self.countries})
+
+    def validate(self, country, language, category):
+        """
+        Normaliza y valida los filtros; devuelve (country, language, category) o lanza ValueError
+
+        country y language vacíos significan "todos"; una categoría vacía es 'general'.
+        """
+        country = (country or '').strip().lower()
+        language = (language or '').strip().lower()
+        category = (category or '').strip().lower() or 'general'
+        if country not in self.country_codes:
+            raise ValueError(f"País no soportado: '{country}'")
+        if language and language not in self.language_codes:
+            raise ValueError(f"Idioma no soportado: '{language}'")
+        if category not in self.category_ids:
+            raise ValueError(f"Categoría no soportada: '{category}'")
+        return country, language, category
+
+
+lookups = LookupRegistry()
@@ -0,0 +1,374 @@
+"""
+Métricas en proceso exportadas en el formato de texto de Prometheus
+
+Contadores, gauges e histogramas con etiquetas. En el camino caliente no
+hay locks: cada hilo escribe en su propia celda (una lista indexada por
+el objeto Thread) y /metrics suma las celdas al leer. Las celdas de los
+hilos terminados se suman al total acumulado cuando se juntan demasiadas,
+así que los servidores que crean un hilo por petición no crecen sin fin.
+
+Con MetricsRegistry(enabled=False) todas las métricas son operaciones
+vacías y /metrics no exporta nada.
+"""
+
+import bisect
+import threading
+import time
+from collections import deque
+from threading import current_thread
+
+# Celdas por métrica antes de recoger las de hilos terminados
+MAX_CELLS = 256
+# Límites (en segundos) de los histogramas de latencia: de 0,5 ms al timeout del upstream
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 15.0)
+# Para pasos en proceso (decodificar, normalizar, renderizar): de 50 µs a 100 ms
+FAST_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+
+
+class _Shards:
+    """
+    Celdas de tamaño fijo por hilo (por threading.current_thread()); totals() las suma
+
+    Las series heredan de esta clase para leer su celda con una consulta a
+    un diccionario, sin llamadas intermedias. La clave es el objeto Thread y
+    no su id, que el sistema recicla: un hilo terminado ya no escribe en su
+    celda, así que al pasar de MAX_CELLS las de hilos que ya no existen se
+    pasan al total acumulado sin perder incrementos.
+    """
+
+    def __init__(self, size):
+        self._size = size
+        self._lock = threading.Lock()
+        self._cells = {}
+        self._retired = [0] * size
+
+    def _new_cell(self):
+        with self._lock:
+            if len(self._cells) >= MAX_CELLS:
+                self._compact()
+            return self._cells.setdefault(current_thread(), [0] * self._size)
+
+    def _compact(self):
+        for thread in [thread for thread in self._cells if not thread.is_alive()]:
+            for i, value in enumerate(self._cells.pop(thread)):
+                self._retired[i] += value
+
+    def totals(self):
+        with self._lock:
+            totals = list(self._retired)
+            cells = list(self._cells.values())
+        for cell in cells:
+            for i, value in enumerate(cell):
+                totals[i] += value
+        return totals
+
+
+class _CounterChild(_Shards):
+    def __init__(self):
+        super().__init__(1)
+
+    def inc(self, amount=1):
+        cell = self._cells.get(current_thread()) or self._new_cell()
+        cell[0] += amount
+
+    def dec(self, amount=1):
+        cell = self._cells.get(current_thread()) or self._new_cell()
+        cell[0] -= amount
+
+    def samples(self):
+        yield '', (), self.totals()[0]
+
+
+class _Timer:
+    __slots__ = ('_child', '_start')
+
+    def __init__(self, child):
+        self._child = child
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._child.observe(time.perf_counter() - self._start)
+
+
+class _HistogramChild(_Shards):
+    def __init__(self, bounds):
+        # Un contador por límite, uno para +Inf y la suma de los valores
+        super().__init__(len(bounds) + 2)
+        self._bounds = bounds
+
+    def observe(self, value):
+        cell = self._cells.get(current_thread()) or self._new_cell()
+        cell[bisect.bisect_left(self._bounds, value)] += 1
+        cell[-1] += value
+
+    def time(self):
+        """
+        Context manager que observa la duración del bloque en segundos
+        """
+        return _Timer(self)
+
+    def samples(self):
+        totals = self.totals()
+        cumulative = 0
+        for bound, count in zip(self._bounds + (float('inf'),), totals):
+            cumulative += count
+            yield '_bucket', (('le', _format_value(bound)),), cumulative
+        yield '_sum', (), totals[-1]
+        yield '_count', (), cumulative
+
+
+class _NoopChild:
+    __slots__ = ()
+
+    def inc(self, amount=1):
+        pass
+
+    def dec(self, amount=1):
+        pass
+
+    def observe(self, value):
+        pass
+
+    def time(self):
+        return self
+
+    def labels(self, *values):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+_NOOP = _NoopChild()
+
+
+class _Metric:
+    """
+    Familia de series con el mismo nombre; labels(*valores) devuelve la serie de esas etiquetas
+    """
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children = {}
+        # Valores tal cual los pasa el llamador (p. ej. 200 en vez de '200') -> serie
+        self._lookup = {}
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def _make_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        try:
+            return self._lookup[values]
+        except KeyError:
+            return self._add_child(values)
+
+    def _add_child(self, values):
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} espera las etiquetas {self.labelnames}")
+        key = tuple(str(value) for value in values)
+        with self._lock:
+            child = self._children.get(key)
+            if child is None:
+                child = self._children[key] = self._make_child()
+            self._lookup[values] = child
+        return child
+
+    def collect(self):
+        for values, child in list(self._children.items()):
+            labels = tuple(zip(self.labelnames, values))
+            for suffix, extra, value in child.samples():
+                yield self.name + suffix, labels + extra, value
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def _make_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self._default.inc(amount)
+
+
+class Gauge(_Metric):
+    """
+    Gauge que sube y baja (inc/dec) o, con function, se lee al exportar
+    """
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=(), function=None):
+        self.function = function
+        super().__init__(name, documentation, labelnames)
+
+    def _make_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self._default.inc(amount)
+
+    def dec(self, amount=1):
+        self._default.dec(amount)
+
+    def collect(self):
+        if self.function is None:
+            yield from super().collect()
+            return
+        value = self.function()
+        if value is not None:
+            yield self.name, (), value
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _make_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self._default.observe(value)
+
+    def time(self):
+        return self._default.time()
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+class RequestMetricsMiddleware:
+    """
+    Middleware WSGI que mide cada petición por endpoint, método y estado
+
+    Más barato que los hooks before/after_request de Flask y sus proxies de
+    contexto. En la petición solo se añade (ruta, método, estado, segundos)
+    a una deque (append y popleft son atómicos); flush() vuelca las
+    pendientes al histograma en bloque cada FLUSH_EVERY peticiones y antes
+    de exportar. El endpoint sale de la ruta con un diccionario de las
+    reglas sin parámetros ('other' para el resto y las 404), y las
+    peticiones en curso son la longitud de una lista. Mide hasta que la
+    aplicación devuelve la respuesta (con la compresión), no el envío del
+    cuerpo en streaming.
+    """
+
+    FLUSH_EVERY = 1024
+
+    def __init__(self, wsgi_app, request_seconds, url_map):
+        self.wsgi_app = wsgi_app
+        self.request_seconds = request_seconds
+        self.url_map = url_map
+        self.active = []
+        self.pending = deque()
+        self._endpoints = None
+
+    def flush(self):
+        """
+        Pasa al histograma las peticiones pendientes
+        """
+        if self._endpoints is None:
+            # Las rutas se registran después de crear el middleware
+            self._endpoints = {
+                rule.rule: rule.endpoint for rule in self.url_map.iter_rules() if not rule.arguments
+            }
+        endpoints = self._endpoints
+        labels = self.request_seconds.labels
+        pending = self.pending
+        while True:
+            try:
+                path, method, status, elapsed = pending.popleft()
+            except IndexError:
+                break
+            labels(endpoints.get(path, 'other'), method, status).observe(elapsed)
+
+    def __call__(self, environ, start_response):
+        status = '500'
+
+        def record_status(status_line, headers, exc_info=None):
+            nonlocal status
+            status = status_line[:3]
+            return start_response(status_line, headers, exc_info)
+
+        active = self.active
+        active.append(None)
+        start = time.perf_counter()
+        try:
+            return self.wsgi_app(environ, record_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            active.pop()
+            self.pending.append((environ.get('PATH_INFO'), environ.get('REQUEST_METHOD'), status, elapsed))
+            if len(self.pending) >= self.FLUSH_EVERY:
+                self.flush()
+
+
+class MetricsRegistry:
+    """
+    Registro de métricas de la aplicación y su exportación para /metrics
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._metrics = []
+        # Funciones que vuelcan datos pendientes antes de exportar
+        self._before_render = []
+
+    def _register(self, metric):
+        if not self.enabled:
+            return _NOOP
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=(), function=None):
+        return self._register(Gauge(name, documentation, labelnames, function))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def before_render(self, function):
+        """
+        Registra una función a llamar antes de cada render() (p. ej. RequestMetricsMiddleware.flush)
+        """
+        self._before_render.append(function)
+
+    def render(self):
+        """
+        Todas las métricas en el formato de texto de Prometheus (versión 0.0.4)
+        """
+        for function in self._before_render:
+            function()
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, labels, value in metric.collect():
+                if labels:
+                    label_text = ','.join(f'{key}="{_escape(str(val))}"' for key, val in labels)
+                    name = f'{name}{{{label_text}}}'
+                lines.append(f'{name} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Perfilador por muestreo para peticiones en producción
+
+Un hilo lee cada `interval` segundos las pilas (sys._current_frames()) de
+los hilos que atienden una petición marcada para perfilar y cuenta cada
+pila en formato "colapsado" (raíz;...;hoja), el que entienden
+flamegraph.pl, speedscope o inferno. Es tiempo de reloj: una petición
+esperando a APITube.io aparece en la llamada de red.
+
+El coste está acotado: solo se recorren los hilos marcados, el hilo
+duerme mientras no hay ninguno y, tras cada muestra, espera lo necesario
+para no pasar de `max_overhead` del tiempo ocupado (y con él del GIL).
+El número de pilas distintas también tiene un máximo; las nuevas se
+cuentan juntas como "[otras pilas]".
+
+ProfilerMiddleware marca una fracción de las peticiones (rate) y las que
+traen la cabecera X-News-Profile con un token firmado. El token se genera
+con la SECRET_KEY de la aplicación:
+
+    SECRET_KEY=... python news_profiler.py token
+"""
+
+import argparse
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from threading import get_ident
+
+from itsdangerous import URLSafeTimedSerializer, BadSignature
+from werkzeug.wsgi import ClosingIterator
+
+logger = logging.getLogger(__name__)
+
+TOKEN_SALT = 'news-profile'
+# Pila que sustituye a las nuevas cuando se llega a max_stacks
+OTHER_STACKS = '[otras pilas]'
+
+
+def make_token(secret_key):
+    """
+    Token para la cabecera X-News-Profile y para /admin/profile
+    """
+    return URLSafeTimedSerializer(secret_key, salt=TOKEN_SALT).dumps('profile')
+
+
+def check_token(secret_key, token, max_age):
+    """
+    True si el token está firmado con secret_key y tiene menos de max_age segundos
+    """
+    try:
+        return URLSafeTimedSerializer(secret_key, salt=TOKEN_SALT).loads(token, max_age=max_age) == 'profile'
+    except BadSignature:
+        return False
+
+
+class SamplingProfiler:
+    """
+    Muestreo de las pilas de los hilos registrados con begin()/end()
+
+    Las pilas se cortan en los marcos de stop_at() (el middleware), así que
+    empiezan en la etiqueta de la petición ("GET /api/news") sin los marcos
+    del servidor. Con path, las pilas colapsadas se escriben en ese fichero
+    cada flush_seconds (escritura atómica).
+    """
+
+    def __init__(self, interval=0.01, max_overhead=0.01, max_depth=64, max_stacks=10000,
+                 path='', flush_seconds=60):
+        self.interval = interval
+        self.max_overhead = max_overhead
+        self.max_depth = max_depth
+        self.max_stacks = max_stacks
+        self.path = path
+        self.flush_seconds = flush_seconds
+        self._lock = threading.Lock()
+        # id del hilo -> etiqueta de la petición que atiende
+        self._active = {}
+        self._stacks = {}
+        self._names = {}
+        self._stop_codes = {self._run_bound.__code__}
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        # El hilo está dormido esperando peticiones (o aún no existe)
+        self._idle = True
+        self._last_flush = time.monotonic()
+        self._dirty = False
+        self.requests = 0
+        self.samples = 0
+        self.dropped = 0
+        self.busy_seconds = 0.0
+
+    def stop_at(self, function):
+        """
+        Corta las pilas en los marcos de function (p. ej. el __call__ de un middleware)
+        """
+        self._stop_codes.add(function.__code__)
+
+    def begin(self, label):
+        """
+        Empieza a muestrear el hilo actual; devuelve el id que se pasa a end()
+        """
+        ident = get_ident()
+        self._active[ident] = label
+        self.requests += 1
+        if self._idle:
+            if self._thread is None:
+                self.start()
+            self._wake.set()
+        return ident
+
+    def end(self, ident):
+        self._active.pop(ident, None)
+
+    def bind(self, fn):
+        """
+        Si el hilo actual se está muestreando, fn envuelta para muestrear también el hilo que la ejecute
+
+        Para las tareas que una petición manda a un executor (p. ej. los elementos de un lote).
+        """
+        label = self._active.get(get_ident())
+        if label is None:
+            return fn
+        label = f'{label};[hilo auxiliar]'
+        return lambda *args, **kwargs: self._run_bound(label, fn, args, kwargs)
+
+    def _run_bound(self, label, fn, args, kwargs):
+        ident = get_ident()
+        self._active[ident] = label
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self.end(ident)
+
+    def _frame_name(self, code):
+        # Con el directorio padre para distinguir p. ej. app.py de flask/app.py
+        directory, filename = os.path.split(code.co_filename)
+        filename = f'{os.path.basename(directory)}/{filename}'.replace(';', '_').replace(' ', '_')
+        name = f'{getattr(code, "co_qualname", code.co_name)} ({filename}:{code.co_firstlineno})'
+        self._names[code] = name
+        return name
+
+    def _sample(self):
+        frames = sys._current_frames()
+        names = self._names
+        stop_codes = self._stop_codes
+        collected = []
+        for ident, label in list(self._active.items()):
+            frame = frames.get(ident)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                if code in stop_codes:
+                    break
+                stack.append(names.get(code) or self._frame_name(code))
+                frame = frame.f_back
+            if len(stack) > self.max_depth:
+                # Se conserva el lado de la hoja, que es donde se gasta el tiempo
+                stack = stack[:self.max_depth]
+                stack.append('[...]')
+            stack.append(label)
+            stack.reverse()
+            collected.append(';'.join(stack))
+        del frames
+        with self._lock:
+            for key in collected:
+                if key not in self._stacks and len(self._stacks) >= self.max_stacks:
+                    key = f'{key.split(";", 1)[0]};{OTHER_STACKS}'
+                    self.dropped += 1
+                self._stacks[key] = self._stacks.get(key, 0) + 1
+            self.samples += len(collected)
+            self._dirty = self._dirty or bool(collected)
+
+    def _run(self):
+        while not self._stop.is_set():
+            if not self._active:
+                self._idle = True
+                # Se comprueba otra vez por si begin() llegó antes de marcarlo
+                if not self._active:
+                    self._wake.wait(self.flush_seconds)
+                self._wake.clear()
+                self._idle = False
+            else:
+                start = time.perf_counter()
+                try:
+                    self._sample()
+                except Exception as e:
+                    logger.error(f"Error en el perfilador: {str(e)}")
+                elapsed = time.perf_counter() - start
+                self.busy_seconds += elapsed
+                # Espera para que el muestreo no ocupe más de max_overhead del tiempo
+                self._stop.wait(max(self.interval, elapsed / self.max_overhead - elapsed))
+            if self.path and self._dirty and time.monotonic() - self._last_flush >= self.flush_seconds:
+                self.flush()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='news-profiler', daemon=True)
+                self._thread.start()
+                logger.info(f"Perfilador por muestreo iniciado (cada {self.interval * 1000:g} ms)")
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def collapsed(self):
+        """
+        Pilas colapsadas ("raíz;...;hoja muestras" por línea), de más a menos muestras
+        """
+        with self._lock:
+            stacks = sorted(self._stacks.items(), key=lambda item: item[1], reverse=True)
+        return ''.join(f'{stack} {count}\n' for stack, count in stacks)
+
+    def flush(self):
+        """
+        Escribe las pilas colapsadas en path (fichero temporal y os.replace)
+        """
+        if not self.path:
+            return
+        text = self.collapsed()
+        tmp_path = f'{self.path}.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(text)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.error(f"No se pudo escribir el perfil en {self.path}: {str(e)}")
+        self._last_flush = time.monotonic()
+        self._dirty = False
+
+    def top(self, n=20, sort='self'):
+        """
+        Los n marcos con más muestras: propias (el marco es la hoja) o totales (está en la pila)
+        """
+        own = {}
+        total = {}
+        with self._lock:
+            stacks = list(self._stacks.items())
+            samples = sum(count for _, count in stacks)
+        for stack, count in stacks:
+            frames = stack.split(';')[1:]
+            if not frames:
+                continue
+            own[frames[-1]] = own.get(frames[-1], 0) + count
+            # Una vez por pila aunque el marco se repita (recursión)
+            for frame in set(frames):
+                total[frame] = total.get(frame, 0) + count
+        counts = own if sort == 'self' else total
+        hottest = sorted(counts, key=counts.get, reverse=True)[:n]
+        return [
+            {
+                'frame': frame,
+                'self': own.get(frame, 0),
+                'total': total[frame],
+                'self_pct': round(100.0 * own.get(frame, 0) / samples, 1) if samples else 0.0,
+                'total_pct': round(100.0 * total[frame] / samples, 1) if samples else 0.0,
+            }
+            for frame in hottest
+        ]
+
+    def reset(self):
+        with self._lock:
+            self._stacks.clear()
+            self.samples = 0
+            self.dropped = 0
+            self._dirty = True
+
+    def stats(self):
+        since_flush = time.monotonic() - self._last_flush
+        with self._lock:
+            stacks = len(self._stacks)
+        return {
+            'running': self._thread is not None and not self._stop.is_set(),
+            'interval': self.interval,
+            'max_overhead': self.max_overhead,
+            'profiled_requests': self.requests,
+            'active': len(self._active),
+            'samples': self.samples,
+            'stacks': stacks,
+            'dropped_stacks': self.dropped,
+            'busy_seconds': round(self.busy_seconds, 3),
+            'path': self.path or None,
+            'seconds_since_flush': round(since_flush, 1) if self.path else None,
+        }
+
+
+class ProfilerMiddleware:
+    """
+    Middleware WSGI que muestrea las peticiones a `paths` elegidas al azar (rate) o con token
+
+    authorize(token) valida la cabecera X-News-Profile; con authorize=None
+    se ignora. Para el resto de rutas solo cuesta una consulta a un conjunto.
+    """
+
+    def __init__(self, wsgi_app, profiler, paths, rate=0.0, authorize=None):
+        self.wsgi_app = wsgi_app
+        self.profiler = profiler
+        self.paths = frozenset(paths)
+        self.rate = rate
+        self.authorize = authorize
+        profiler.stop_at(ProfilerMiddleware.__call__)
+        # El servidor recorre el cuerpo (p. ej. el streaming NDJSON) después de volver __call__
+        profiler.stop_at(ClosingIterator.__next__)
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO')
+        if path not in self.paths:
+            return self.wsgi_app(environ, start_response)
+        token = environ.get('HTTP_X_NEWS_PROFILE')
+        signed = token is not None and self.authorize is not None and self.authorize(token)
+        if not signed and (not self.rate or random.random() >= self.rate):
+            return self.wsgi_app(environ, start_response)
+        ident = self.profiler.begin(f"{environ.get('REQUEST_METHOD')} {path}")
+        try:
+            app_iter = self.wsgi_app(environ, start_response)
+        except BaseException:
+            self.profiler.end(ident)
+            raise
+        # Se sigue muestreando mientras se envía el cuerpo; el servidor llama a close() al terminar
+        return ClosingIterator(app_iter, lambda: self.profiler.end(ident))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Utilidades del perfilador por muestreo')
+    parser.add_argument('command', choices=['token'], help='token: genera un token X-News-Profile con SECRET_KEY')
+    parser.parse_args()
+    secret_key = os.environ.get('SECRET_KEY')
+    if not secret_key:
+        print("❌ SECRET_KEY no está configurada")
+        return 1
+    print(make_token(secret_key))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,124 @@
+"""
+Lectura incremental de respuestas JSON de APITube.io
+
+Permite recorrer los elementos del array 'results' a medida que llegan los
+bytes del upstream, sin construir el documento completo en memoria.
+"""
+
+import codecs
+import json
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\r\n'
+_SEPARATORS = _WHITESPACE + ','
+_TERMINATORS = _SEPARATORS + ']'
+
+
+class ArrayNotFound(Exception):
+    """
+    El documento terminó sin contener el array buscado; lleva el documento parseado
+    """
+
+    def __init__(self, document):
+        super().__init__('El array buscado no está en la respuesta')
+        self.document = document
+
+
+def _find_array_start(text, key, state):
+    """
+    Busca la clave de primer nivel seguida de '[' y devuelve la posición tras el corchete
+
+    state conserva el progreso del escaneo entre trozos: (pos, depth, in_string,
+    escape, string_start, expecting_key, last_key).
+    """
+    pos, depth, in_string, escape, string_start, expecting_key, last_key = state
+    length = len(text)
+    while pos < length:
+        char = text[pos]
+        if in_string:
+            if escape:
+                escape = False
+            elif char == '\\':
+                escape = True
+            elif char == '"':
+                in_string = False
+                if depth == 1 and expecting_key:
+                    last_key = json.loads(text[string_start:pos + 1])
+                    expecting_key = False
+        elif char == '"':
+            in_string = True
+            string_start = pos
+        elif char in '{[':
+            if char == '[' and depth == 1 and last_key == key:
+                return pos + 1, None
+            depth += 1
+            expecting_key = char == '{' and depth == 1
+        elif char in '}]':
+            depth -= 1
+        elif char == ',' and depth == 1:
+            expecting_key = True
+            last_key = None
+        elif char == ':' and depth == 1:
+            pass
+        elif char not in _WHITESPACE and depth == 1:
+            last_key = None
+        pos += 1
+    return None, (pos, depth, in_string, escape, string_start, expecting_key, last_key)
+
+
+def iter_json_array(chunks, key='results'):
+    """
+    Genera uno a uno los elementos del array de primer nivel 'key'
+
+    chunks es un iterable de bytes (p. ej. response.iter_content()). Si el
+    documento no contiene el array se lanza ArrayNotFound con el documento.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    buffer = ''
+    state = (0, 0, False, False, 0, False, None)
+    start = None
+    chunks = iter(chunks)
+    exhausted = False
+
+    # Fase 1: localizar el comienzo del array
+    while start is None:
+        try:
+            buffer += decoder.decode(next(chunks))
+        except StopIteration:
+            buffer += decoder.decode(b'', final=True)
+            exhausted = True
+        start, state = _find_array_start(buffer, key, state)
+        if start is None and exhausted:
+            raise ArrayNotFound(json.loads(buffer) if buffer.strip() else None)
+
+    # Fase 2: decodificar cada elemento en cuanto está completo
+    buffer = buffer[start:]
+    pos = 0
+    while True:
+        while pos < len(buffer) and buffer[pos] in _SEPARATORS:
+            pos += 1
+        if pos < len(buffer):
+            if buffer[pos] == ']':
+                return
+            try:
+                item, end = _decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if exhausted:
+                    raise
+            else:
+                # Un número podría estar cortado ('2.' de '2.5'): solo se acepta
+                # el valor cuando ya ha llegado el separador que lo sigue
+                if exhausted or (end < len(buffer) and buffer[end] in _TERMINATORS):
+                    yield item
+                    pos = end
+                    continue
+        if exhausted:
+            raise json.JSONDecodeError('Respuesta JSON incompleta', buffer, pos)
+        # Descartar lo ya consumido y leer más datos
+        buffer = buffer[pos:]
+        pos = 0
+        try:
+            buffer += decoder.decode(next(chunks))
+        except StopIteration:
+            buffer += decoder.decode(b'', final=True)
+            exhausted = True
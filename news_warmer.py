@@ -0,0 +1,251 @@
+"""
+Precalentador de noticias en segundo plano
+
+Mantiene en caché un conjunto de búsquedas "calientes" refrescándolas antes
+de que caduquen: un conjunto fijo (configuración por defecto, categorías) más
+las N búsquedas más pedidas recientemente. Reparte los refrescos con jitter,
+limita la concurrencia y espacia las llamadas para no agotar la cuota.
+
+Una búsqueda entra en el top-N con al menos min_hits peticiones; los
+contadores se reducen a la mitad una vez por intervalo, no en cada vuelta
+del bucle, y también al llegar a max_tracked búsquedas distintas (si aun así
+no cabe una nueva, se descartan las menos pedidas). Con expires_in, las búsquedas que siguen vigentes en la caché
+(porque las acaba de descargar una visita) no se descargan de nuevo: se
+reprograman para refresh_ahead segundos antes de que caduquen.
+"""
+
+import logging
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, wait
+
+logger = logging.getLogger(__name__)
+
+
+class _WarmedKey:
+    def __init__(self, params, static):
+        self.params = params
+        self.static = static
+        self.next_due = 0.0
+        self.last_refresh = None
+        self.last_error = None
+        self.refreshes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+
+
+class FeedWarmer:
+    """
+    Refresca periódicamente un conjunto de búsquedas para que las visitas no esperen al upstream
+
+    warm(params) debe descargar y guardar en caché la búsqueda y devolver un
+    mensaje de error o None. key_fn(*params) normaliza los parámetros a la
+    clave de caché y expires_in(key) devuelve los segundos que le quedan a
+    esa clave en la caché, o None si no está.
+    """
+
+    def __init__(self, warm, key_fn, interval=240, jitter=0.1, max_concurrency=2,
+                 max_calls_per_minute=30, top_n=10, tick=5, max_backoff=3600,
+                 min_hits=2, expires_in=None, refresh_ahead=30, max_tracked=1000, clock=time.time):
+        self.warm = warm
+        self.key_fn = key_fn
+        self.interval = interval
+        self.jitter = jitter
+        self.max_concurrency = max_concurrency
+        self.min_spacing = 60.0 / max_calls_per_minute if max_calls_per_minute > 0 else 0.0
+        self.top_n = top_n
+        self.tick = tick
+        self.max_backoff = max_backoff
+        self.min_hits = min_hits
+        self.expires_in = expires_in
+        self.refresh_ahead = refresh_ahead
+        self.max_tracked = max(max_tracked, top_n)
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._keys = {}
+        self._popular = Counter()
+        self._popular_params = {}
+        self._last_decay = clock()
+        self._last_call = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+        self._executor = None
+        self.cycles = 0
+        self.skipped = 0
+
+    def add_static(self, params):
+        """
+        Añade una búsqueda que se mantiene caliente siempre
+        """
+        key = self.key_fn(*params)
+        with self._lock:
+            entry = self._keys.get(key)
+            if entry is None:
+                self._keys[key] = _WarmedKey(params, static=True)
+            else:
+                entry.static = True
+
+    def record(self, params):
+        """
+        Anota una petición real para calcular las búsquedas más populares
+
+        Sin el precalentador en marcha no se anota nada.
+        """
+        if not self.running:
+            return
+        key = self.key_fn(*params)
+        with self._lock:
+            if key not in self._popular and len(self._popular) >= self.max_tracked:
+                self._evict()
+            self._popular[key] += 1
+            self._popular_params.setdefault(key, params)
+
+    @property
+    def running(self):
+        return self._thread is not None and not self._stop.is_set()
+
+    def _decay(self):
+        # Con el lock tomado
+        for key in list(self._popular):
+            self._popular[key] //= 2
+            if not self._popular[key]:
+                del self._popular[key]
+                self._popular_params.pop(key, None)
+
+    def _evict(self):
+        # Con el lock tomado: envejece y, si sigue lleno, deja solo la mitad más pedida
+        self._decay()
+        if len(self._popular) >= self.max_tracked:
+            for key, _ in self._popular.most_common()[self.max_tracked // 2:]:
+                del self._popular[key]
+                self._popular_params.pop(key, None)
+
+    def _refresh_popular(self):
+        # Sustituye las claves dinámicas por el top-N actual y envejece los contadores una vez por intervalo
+        now = self.clock()
+        with self._lock:
+            top = [key for key, hits in self._popular.most_common() if hits >= self.min_hits
+                   and (key not in self._keys or not self._keys[key].static)][:self.top_n]
+            for key in [k for k, entry in self._keys.items() if not entry.static and k not in top]:
+                del self._keys[key]
+            for key in top:
+                if key not in self._keys:
+                    self._keys[key] = _WarmedKey(self._popular_params[key], static=False)
+            if now - self._last_decay < self.interval:
+                return
+            self._last_decay = now
+            self._decay()
+
+    def due_keys(self, now=None):
+        now = self.clock() if now is None else now
+        with self._lock:
+            due = [(key, entry) for key, entry in self._keys.items() if entry.next_due <= now]
+        due.sort(key=lambda item: (not item[1].static, item[1].next_due))
+        return due
+
+    def _still_fresh(self, key, entry, now):
+        # Si la caché aún tiene la clave vigente, reprograma el refresco según su caducidad
+        if self.expires_in is None:
+            return False
+        remaining = self.expires_in(key)
+        if remaining is None or remaining <= self.refresh_ahead:
+            return False
+        with self._lock:
+            entry.next_due = now + remaining - self.refresh_ahead
+            self.skipped += 1
+        return True
+
+    def _pace(self):
+        # Espaciar las llamadas al upstream según la cuota configurada
+        with self._lock:
+            wait_for = self._last_call + self.min_spacing - time.monotonic()
+            self._last_call = max(time.monotonic(), self._last_call + self.min_spacing)
+        if wait_for > 0:
+            self._stop.wait(wait_for)
+
+    def _warm_key(self, key, entry):
+        try:
+            error = self.warm(entry.params)
+        except Exception as e:
+            error = f"Error inesperado: {str(e)}"
+        now = self.clock()
+        with self._lock:
+            if error:
+                entry.failures += 1
+                entry.consecutive_failures += 1
+                entry.last_error = error
+                delay = min(self.interval * (2 ** entry.consecutive_failures), self.max_backoff)
+                logger.warning(f"Precalentamiento fallido para {key}: {error}")
+            else:
+                entry.refreshes += 1
+                entry.consecutive_failures = 0
+                entry.last_error = None
+                entry.last_refresh = now
+                delay = self.interval
+            entry.next_due = now + delay * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def run_once(self):
+        """
+        Refresca las búsquedas que toca ahora; devuelve cuántas se lanzaron
+        """
+        self._refresh_popular()
+        due = self.due_keys()
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency,
+                                                thread_name_prefix='news-warmer')
+        futures = []
+        now = self.clock()
+        for key, entry in due:
+            if self._stop.is_set():
+                break
+            if self._still_fresh(key, entry, now):
+                continue
+            self._pace()
+            futures.append(self._executor.submit(self._warm_key, key, entry))
+        wait(futures)
+        self.cycles += 1
+        return len(futures)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Error en el precalentador de noticias: {str(e)}")
+            self._stop.wait(self.tick)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='news-warmer', daemon=True)
+            self._thread.start()
+            logger.info(f"Precalentador de noticias iniciado con {len(self._keys)} búsquedas fijas")
+
+    def stop(self):
+        self._stop.set()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+    def stats(self):
+        now = self.clock()
+        with self._lock:
+            keys = [
+                {
+                    'key': list(key),
+                    'static': entry.static,
+                    'age_seconds': round(now - entry.last_refresh, 1) if entry.last_refresh else None,
+                    'next_refresh_in': round(max(entry.next_due - now, 0), 1),
+                    'refreshes': entry.refreshes,
+                    'failures': entry.failures,
+                    'last_error': entry.last_error,
+                }
+                for key, entry in self._keys.items()
+            ]
+        return {
+            'running': self.running,
+            'interval': self.interval,
+            'cycles': self.cycles,
+            'skipped_fresh': self.skipped,
+            'keys': keys,
+        }
@@ -0,0 +1,419 @@
+"""
+Limitador de llamadas a APITube.io por presupuestos (cubetas de fichas)
+
+Cada llamada al upstream gasta una ficha de su presupuesto ('news',
+'background', 'ingest', 'diagnostics') y otra del presupuesto global 'plan'.
+Si no quedan fichas no se espera: se lanza RateLimitExceeded con los
+segundos hasta la siguiente, para servir la caché o responder 429 al
+momento en lugar de encolar la petición hasta el timeout.
+
+Las cubetas viven en un almacén intercambiable para compartirlas entre
+workers: memoria (un proceso), SQLite (todos los workers del host) o Redis.
+Con Redis cada presupuesto es un contador por ventana fija (INCR), que
+admite la misma tasa media con ráfagas algo mayores en el cambio de ventana.
+Las cabeceras de límite del upstream (Retry-After, X-RateLimit-*) bloquean
+todas las llamadas hasta que el plan se recupera.
+"""
+
+import math
+import sqlite3
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+from cache_backends import RedisConnection, RedisError
+
+# Segundos de bloqueo tras un 429 sin Retry-After ni X-RateLimit-Reset
+DEFAULT_BLOCK = 60
+# Fila o clave con el instante hasta el que el upstream pidió no llamar
+BLOCK_KEY = '__blocked__'
+
+
+class RateLimitExceeded(Exception):
+    """
+    No quedan llamadas en el presupuesto; retry_after son los segundos hasta la siguiente
+    """
+
+    # Estado HTTP con el que se responde si no hay nada en caché
+    status_code = 429
+
+    def __init__(self, budget, retry_after):
+        self.budget = budget
+        self.retry_after = max(retry_after, 0.0)
+        super().__init__(
+            f"Límite de llamadas a APITube.io alcanzado ({budget}); "
+            f"reintenta en {math.ceil(self.retry_after)} s"
+        )
+
+
+def _refill(tokens, updated, now, rate, capacity):
+    return min(capacity, tokens + max(now - updated, 0.0) * rate)
+
+
+class MemoryBucketStore:
+    """
+    Cubetas en memoria, compartidas por los hilos de un proceso
+    """
+
+    name = 'memory'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # presupuesto -> (fichas, actualizado_en)
+        self._buckets = {}
+        self._blocked_until = 0.0
+
+    def take(self, name, rate, capacity, now):
+        """
+        Gasta una ficha; devuelve 0 si se concedió o los segundos hasta la siguiente
+        """
+        with self._lock:
+            tokens, updated = self._buckets.get(name, (capacity, now))
+            tokens = _refill(tokens, updated, now, rate, capacity)
+            if tokens >= 1:
+                self._buckets[name] = (tokens - 1, now)
+                return 0.0
+            self._buckets[name] = (tokens, now)
+            return (1 - tokens) / rate
+
+    def refund(self, name, rate, capacity, now):
+        """
+        Devuelve una ficha gastada con take()
+        """
+        with self._lock:
+            tokens, updated = self._buckets.get(name, (capacity, now))
+            self._buckets[name] = (min(_refill(tokens, updated, now, rate, capacity) + 1, capacity), now)
+
+    def level(self, name, rate, capacity, now):
+        with self._lock:
+            tokens, updated = self._buckets.get(name, (capacity, now))
+            return _refill(tokens, updated, now, rate, capacity)
+
+    def block(self, until):
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, until)
+
+    def blocked_until(self):
+        return self._blocked_until
+
+
+class SQLiteBucketStore:
+    """
+    Cubetas en un archivo SQLite compartido por todos los workers del host
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._connect().execute(
+            'CREATE TABLE IF NOT EXISTS rate_buckets ('
+            ' name TEXT PRIMARY KEY,'
+            ' tokens REAL NOT NULL,'
+            ' updated_at REAL NOT NULL)'
+        )
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def take(self, name, rate, capacity, now):
+        conn = self._connect()
+        # BEGIN IMMEDIATE: leer y actualizar la cubeta sin que otro worker se cuele
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT tokens, updated_at FROM rate_buckets WHERE name = ?', (name,)).fetchone()
+            tokens = _refill(row[0], row[1], now, rate, capacity) if row else capacity
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / rate
+            conn.execute('INSERT OR REPLACE INTO rate_buckets (name, tokens, updated_at) VALUES (?, ?, ?)',
+                         (name, tokens, now))
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return wait
+
+    def refund(self, name, rate, capacity, now):
+        self._connect().execute(
+            'UPDATE rate_buckets SET tokens = MIN(tokens + 1, ?) WHERE name = ?', (capacity, name)
+        )
+
+    def level(self, name, rate, capacity, now):
+        row = self._connect().execute(
+            'SELECT tokens, updated_at FROM rate_buckets WHERE name = ?', (name,)
+        ).fetchone()
+        return _refill(row[0], row[1], now, rate, capacity) if row else capacity
+
+    def block(self, until):
+        self._connect().execute(
+            'INSERT INTO rate_buckets (name, tokens, updated_at) VALUES (?, ?, 0)'
+            ' ON CONFLICT (name) DO UPDATE SET tokens = MAX(tokens, excluded.tokens)',
+            (BLOCK_KEY, until)
+        )
+
+    def blocked_until(self):
+        row = self._connect().execute('SELECT tokens FROM rate_buckets WHERE name = ?', (BLOCK_KEY,)).fetchone()
+        return row[0] if row else 0.0
+
+
+class RedisBucketStore:
+    """
+    Contadores por ventana fija en Redis: capacity llamadas cada capacity / rate segundos
+    """
+
+    name = 'redis'
+
+    def __init__(self, host='localhost', port=6379, db=0, password=None, socket_timeout=2.0,
+                 prefix='ratelimit:'):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.socket_timeout = socket_timeout
+        self.prefix = prefix
+        self._local = threading.local()
+
+    def execute(self, *args):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = RedisConnection(self.host, self.port, self.db, self.password,
+                                                      self.socket_timeout)
+        try:
+            return conn.execute(*args)
+        except (OSError, RedisError):
+            conn.close()
+            self._local.conn = None
+            raise
+
+    def _window(self, name, rate, capacity, now):
+        length = capacity / rate
+        start = math.floor(now / length) * length
+        return f'{self.prefix}{name}:{int(start * 1000)}', start + length
+
+    def take(self, name, rate, capacity, now):
+        key, window_end = self._window(name, rate, capacity, now)
+        count = self.execute('INCR', key)
+        if count == 1:
+            self.execute('PEXPIRE', key, int((window_end - now) * 1000) + 1000)
+        return 0.0 if count <= capacity else window_end - now
+
+    def refund(self, name, rate, capacity, now):
+        key, _ = self._window(name, rate, capacity, now)
+        self.execute('DECR', key)
+
+    def level(self, name, rate, capacity, now):
+        key, _ = self._window(name, rate, capacity, now)
+        count = self.execute('GET', key)
+        return max(capacity - int(count or 0), 0)
+
+    def block(self, until):
+        ttl = int((until - time.time()) * 1000)
+        if ttl > 0 and until > self.blocked_until():
+            self.execute('SET', self.prefix + BLOCK_KEY, repr(until), 'PX', ttl)
+
+    def blocked_until(self):
+        value = self.execute('GET', self.prefix + BLOCK_KEY)
+        return float(value) if value else 0.0
+
+
+def make_store(url='memory'):
+    """
+    Crea el almacén de cubetas indicado por una URL (como NEWS_CACHE_BACKEND)
+    """
+    url = (url or 'memory').strip()
+    if url == 'memory':
+        return MemoryBucketStore()
+    parsed = urlparse(url)
+    if parsed.scheme == 'sqlite':
+        path = parsed.netloc + parsed.path if parsed.netloc else parsed.path or '/tmp/news_cache.db'
+        return SQLiteBucketStore(path)
+    if parsed.scheme == 'redis':
+        return RedisBucketStore(
+            host=parsed.hostname or 'localhost',
+            port=parsed.port or 6379,
+            db=int(parsed.path.lstrip('/') or 0),
+            password=parsed.password
+        )
+    raise ValueError(f"Almacén de límites no soportado: {url}")
+
+
+def _header_seconds(value, now):
+    """
+    Segundos de una cabecera Retry-After/Reset: número de segundos, instante epoch o fecha HTTP
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            return max(parsedate_to_datetime(value).timestamp() - now, 0.0)
+        except (TypeError, ValueError):
+            return None
+    # Valores enormes son un instante epoch, no una duración
+    return max(seconds - now, 0.0) if seconds > 1e9 else max(seconds, 0.0)
+
+
+class UpstreamLimiter:
+    """
+    Presupuestos de llamadas por minuto (0 = sin límite) más el global 'plan'
+
+    Cada cubeta admite ráfagas de hasta un minuto de llamadas y se rellena a
+    ritmo constante. Los contadores de uso son de este proceso; las fichas y
+    el bloqueo, del almacén compartido.
+    """
+
+    def __init__(self, store, budgets, plan_per_minute=0, clock=time.time):
+        self.store = store
+        self.budgets = {name: per_minute for name, per_minute in budgets.items()}
+        self.plan_per_minute = plan_per_minute
+        self.clock = clock
+        self._lock = threading.Lock()
+        self.used = {name: 0 for name in self.budgets}
+        self.denied = {name: 0 for name in self.budgets}
+        self.store_errors = 0
+        # Último estado informado por el upstream en sus cabeceras
+        self.upstream = {}
+
+    def _limits(self, budget):
+        yield budget, self.budgets.get(budget, 0)
+        yield 'plan', self.plan_per_minute
+
+    def acquire(self, budget):
+        """
+        Gasta una llamada de budget y del plan o lanza RateLimitExceeded
+
+        Si una cubeta deniega la llamada, las fichas ya gastadas en las
+        anteriores se devuelven: una llamada denegada no consume presupuesto.
+        """
+        now = self.clock()
+        taken = []
+        try:
+            blocked = self.store.blocked_until()
+            if blocked > now:
+                self._count(self.denied, budget)
+                raise RateLimitExceeded('upstream', blocked - now)
+            for name, per_minute in self._limits(budget):
+                if per_minute and per_minute > 0:
+                    rate, capacity = per_minute / 60.0, max(per_minute, 1)
+                    wait = self.store.take(name, rate, capacity, now)
+                    if wait > 0:
+                        self._refund(taken, now)
+                        self._count(self.denied, budget)
+                        raise RateLimitExceeded(name, wait)
+                    taken.append((name, rate, capacity))
+        except (OSError, RedisError, sqlite3.Error):
+            # Sin almacén no se bloquea el tráfico: el upstream sigue teniendo su propio límite.
+            # Las fichas ya gastadas se devuelven para no cobrar a medias la llamada
+            with self._lock:
+                self.store_errors += 1
+            self._refund(taken, now)
+        self._count(self.used, budget)
+
+    def release(self, budget):
+        """
+        Devuelve la llamada que acquire(budget) gastó si al final no se hizo
+        """
+        taken = [(name, per_minute / 60.0, max(per_minute, 1))
+                 for name, per_minute in self._limits(budget) if per_minute and per_minute > 0]
+        self._refund(taken, self.clock())
+        with self._lock:
+            self.used[budget] = max(self.used.get(budget, 0) - 1, 0)
+
+    def _refund(self, taken, now):
+        """
+        Devuelve las fichas gastadas en taken; si el almacén falla, las que falten se pierden
+        """
+        for name, rate, capacity in taken:
+            try:
+                self.store.refund(name, rate, capacity, now)
+            except (OSError, RedisError, sqlite3.Error):
+                with self._lock:
+                    self.store_errors += 1
+
+    def _count(self, counter, budget):
+        with self._lock:
+            counter[budget] = counter.get(budget, 0) + 1
+
+    def observe(self, headers, status_code=200):
+        """
+        Lee las cabeceras de límite de una respuesta del upstream y bloquea si el plan se agotó
+        """
+        now = self.clock()
+        # requests y el cliente asíncrono no coinciden en mayúsculas
+        headers = {name.lower(): value for name, value in headers.items()}
+        remaining = headers.get('x-ratelimit-remaining') or headers.get('ratelimit-remaining')
+        limit = headers.get('x-ratelimit-limit') or headers.get('ratelimit-limit')
+        reset = _header_seconds(headers.get('x-ratelimit-reset') or headers.get('ratelimit-reset'), now)
+        retry_after = _header_seconds(headers.get('retry-after'), now)
+        if remaining is not None or limit is not None:
+            with self._lock:
+                self.upstream = {
+                    'limit': int(limit) if limit and limit.isdigit() else limit,
+                    'remaining': int(remaining) if remaining and remaining.isdigit() else remaining,
+                    'reset_in': round(reset, 1) if reset is not None else None,
+                    'observed_at': now,
+                }
+        block = None
+        if status_code == 429:
+            block = retry_after if retry_after is not None else (reset if reset is not None else DEFAULT_BLOCK)
+        elif remaining is not None and remaining.strip() == '0' and reset:
+            block = reset
+        if block:
+            try:
+                self.store.block(now + block)
+            except (OSError, RedisError, sqlite3.Error):
+                with self._lock:
+                    self.store_errors += 1
+
+    def check_response(self, response):
+        """
+        observe() y, si el upstream respondió 429, RateLimitExceeded con la espera que pidió
+        """
+        self.observe(response.headers, response.status_code)
+        if response.status_code == 429:
+            try:
+                retry_after = self.store.blocked_until() - self.clock()
+            except (OSError, RedisError, sqlite3.Error):
+                retry_after = DEFAULT_BLOCK
+            raise RateLimitExceeded('upstream', retry_after)
+
+    def stats(self):
+        now = self.clock()
+        budgets = {}
+        for name, per_minute in list(self.budgets.items()) + [('plan', self.plan_per_minute)]:
+            entry = {'per_minute': per_minute or None}
+            if name != 'plan':
+                entry.update({'used': self.used.get(name, 0), 'denied': self.denied.get(name, 0)})
+            if per_minute and per_minute > 0:
+                try:
+                    entry['available'] = round(self.store.level(name, per_minute / 60.0, max(per_minute, 1), now), 2)
+                except (OSError, RedisError, sqlite3.Error):
+                    entry['available'] = None
+            budgets[name] = entry
+        try:
+            blocked_for = max(self.store.blocked_until() - now, 0.0)
+        except (OSError, RedisError, sqlite3.Error):
+            blocked_for = None
+        with self._lock:
+            upstream = dict(self.upstream)
+        if upstream:
+            upstream['age_seconds'] = round(now - upstream.pop('observed_at'), 1)
+        return {
+            'store': self.store.name,
+            'blocked_for': round(blocked_for, 1) if blocked_for is not None else None,
+            'budgets': budgets,
+            'upstream': upstream or None,
+            'store_errors': self.store_errors,
+        }
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Servidor local que imita a Redis para probar RedisBackend sin instalar Redis
+
+Implementa solo los comandos que usa la caché: PING, AUTH, SELECT, GET,
+SET (con EX/PX), DEL, SCAN, DBSIZE y FLUSHDB, más INCR y PEXPIRE para los
+límites de llamadas compartidos.
+
+Uso:
+    python redis_standin.py 6379
+    NEWS_CACHE_BACKEND=redis://127.0.0.1:6379/0 python app.py
+"""
+
+import fnmatch
+import socketserver
+import sys
+import threading
+import time
+
+
+class RedisStandIn(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, address):
+        super().__init__(address, _Handler)
+        self.lock = threading.Lock()
+        # clave -> (valor, caduca_en o None)
+        self.data = {}
+
+    def read(self, key):
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.time():
+            del self.data[key]
+            return None
+        return value
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        while True:
+            try:
+                args = self._read_command()
+            except (ConnectionError, ValueError):
+                return
+            if args is None:
+                return
+            self.wfile.write(self._dispatch(args))
+
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b'*'):
+            return line.strip().split()
+        args = []
+        for _ in range(int(line[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def _dispatch(self, args):
+        server = self.server
+        command = args[0].upper()
+        with server.lock:
+            if command in (b'PING', b'AUTH', b'SELECT'):
+                return b'+PONG\r\n' if command == b'PING' else b'+OK\r\n'
+            if command == b'GET':
+                return _bulk(server.read(args[1]))
+            if command == b'SET':
+                expires_at = None
+                options = [arg.upper() for arg in args[3:]]
+                if b'PX' in options:
+                    expires_at = time.time() + int(args[3 + options.index(b'PX') + 1]) / 1000.0
+                elif b'EX' in options:
+                    expires_at = time.time() + int(args[3 + options.index(b'EX') + 1])
+                server.data[args[1]] = (args[2], expires_at)
+                return b'+OK\r\n'
+            if command in (b'INCR', b'DECR'):
+                value = server.read(args[1])
+                expires_at = server.data[args[1]][1] if value is not None else None
+                count = int(value or 0) + (1 if command == b'INCR' else -1)
+                server.data[args[1]] = (b'%d' % count, expires_at)
+                return b':%d\r\n' % count
+            if command == b'PEXPIRE':
+                if server.read(args[1]) is None:
+                    return b':0\r\n'
+                server.data[args[1]] = (server.data[args[1]][0], time.time() + int(args[2]) / 1000.0)
+                return b':1\r\n'
+            if command == b'DEL':
+                removed = sum(1 for key in args[1:] if server.data.pop(key, None) is not None)
+                return b':%d\r\n' % removed
+            if command == b'SCAN':
+                pattern = '*'
+                if b'MATCH' in [arg.upper() for arg in args]:
+                    pattern = args[[arg.upper() for arg in args].index(b'MATCH') + 1].decode('utf-8')
+                keys = [key for key in list(server.data)
+                        if server.read(key) is not None and fnmatch.fnmatchcase(key.decode('utf-8'), pattern)]
+                return b'*2\r\n' + _bulk(b'0') + b'*%d\r\n' % len(keys) + b''.join(_bulk(k) for k in keys)
+            if command == b'DBSIZE':
+                return b':%d\r\n' % len(server.data)
+            if command == b'FLUSHDB':
+                server.data.clear()
+                return b'+OK\r\n'
+        return b'-ERR unknown command\r\n'
+
+
+def _bulk(value):
+    if value is None:
+        return b'$-1\r\n'
+    return b'$%d\r\n%s\r\n' % (len(value), value)
+
+
+def start(host='127.0.0.1', port=0):
+    """
+    Arranca el servidor en un hilo y lo devuelve (útil para pruebas y benchmarks)
+    """
+    server = RedisStandIn((host, port))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == '__main__':
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 6379
+    print(f"🧪 Redis de prueba escuchando en 127.0.0.1:{port}")
+    RedisStandIn(('127.0.0.1', port)).serve_forever()
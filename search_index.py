@@ -0,0 +1,374 @@
+"""
+Índice invertido en proceso para búsquedas de texto con BM25
+
+Indexa título, descripción y cuerpo de los artículos del almacén local con
+una tokenización insensible a acentos y con palabras vacías y plurales por
+idioma (es, en, fr, de, it, pt). Los documentos nuevos van a un segmento en
+memoria; save() fusiona todo en un archivo compacto que se abre con mmap,
+de modo que los workers comparten las listas de apariciones sin copiarlas.
+
+Formato del archivo (little endian):
+
+    cabecera  b'NIDX', versión, nº de documentos, nº de términos, longitud total
+    documentos  (doc_id u32, longitud u32, idioma 2 bytes) por documento
+    términos    (desplazamiento u32, nº u32, longitud u16, término utf-8) por término
+    apariciones  doc_id u32 de todos los términos, seguidos de sus frecuencias u16
+"""
+
+import math
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+import unicodedata
+from array import array
+from collections import Counter, OrderedDict
+
+MAGIC = b'NIDX'
+VERSION = 1
+_HEADER = struct.Struct('<4sIIIQ')
+_DOC = struct.Struct('<II2s')
+_TERM = struct.Struct('<IIH')
+
+_WORD = re.compile(r'\w+')
+# El título pesa más que el cuerpo: sus términos cuentan varias veces
+TITLE_WEIGHT = 3
+
+STOPWORDS = {
+    'es': 'a al algo como con de del desde donde el ella en entre era es esta este esto fue ha han hay la las le lo los mas me muy no nos o para pero por que se ser si sin sobre son su sus tambien te un una uno y ya',
+    'en': 'a about after all also an and are as at be been but by can for from had has have he her his how i if in into is it its more new no not of on or our out over said she so than that the their they this to up was we were what when which who will with would you',
+    'fr': 'a au aux avec ce ces dans de des du elle en est et il ils je la le les leur lui mais me ne nous on ou par pas plus pour qu que qui sa se ses son sur un une vous y',
+    'de': 'aber als am an auch auf aus bei das dass dem den der des die ein eine einem einen einer es fur hat im in ist mit nach nicht noch oder sich sie sind so uber um und von vor war wie wird zu zum zur',
+    'it': 'a ai al alla alle anche che chi con da dei del della delle di e gli ha i il in la le lo ma nel nella non per piu se si sono su tra un una',
+    'pt': 'a ao aos as com da das de do dos e em entre foi mais mas na nas no nos o os ou para pela pelo por que se sem sua suas seu seus um uma',
+}
+STOPWORDS = {language: frozenset(words.split()) for language, words in STOPWORDS.items()}
+
+# Idiomas en los que quitar la 's' final une singular y plural
+_PLURAL_S = frozenset(('es', 'en', 'fr', 'pt'))
+
+
+def fold(text):
+    """
+    Minúsculas y sin diacríticos ('España' -> 'espana')
+    """
+    text = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(char for char in text if not unicodedata.combining(char))
+
+
+def tokenize(text, language=None):
+    """
+    Términos normalizados de un texto según las reglas del idioma
+    """
+    if not text:
+        return []
+    stopwords = STOPWORDS.get(language, ())
+    plural = language in _PLURAL_S
+    tokens = []
+    for word in _WORD.findall(fold(text)):
+        if word in stopwords or (len(word) < 2 and not word.isdigit()):
+            continue
+        if plural and len(word) > 4 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        tokens.append(word)
+    return tokens
+
+
+class SearchIndex:
+    """
+    Índice BM25 con un segmento base en disco (mmap) y otro incremental en memoria
+    """
+
+    def __init__(self, path=None, k1=1.2, b=0.75, refresh_interval=5.0, max_cached_queries=256):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self.refresh_interval = refresh_interval
+        self.max_cached_queries = max_cached_queries
+        self._lock = threading.RLock()
+        self._reset()
+        if path and os.path.exists(path):
+            self.load(path)
+
+    def _reset(self):
+        self._mmap = None
+        self._file = None
+        self._mtime = None
+        self._checked_at = 0.0
+        self._base_terms = {}
+        self._base_view = None
+        self._base_ids = None
+        self._base_tfs = None
+        # Documentos vivos: doc_id -> (longitud, idioma)
+        self._docs = {}
+        self._total_length = 0
+        self._base_docs = set()
+        # Documentos del segmento base borrados o reindexados en memoria
+        self._shadowed = set()
+        # Segmento en memoria: término -> {doc_id: tf}, y términos de cada documento
+        self._delta = {}
+        self._delta_terms = {}
+        self._languages = Counter()
+        self._norms = None
+        self._results = OrderedDict()
+        self.dirty = False
+
+    def _changed(self):
+        self._norms = None
+        self._results.clear()
+        self.dirty = True
+
+    def __len__(self):
+        return len(self._docs)
+
+    # -- actualización ------------------------------------------------------
+
+    def add(self, doc_id, language, title='', description='', body=''):
+        """
+        Indexa (o reindexa) un documento
+        """
+        terms = {}
+        for token in tokenize(title, language):
+            terms[token] = terms.get(token, 0) + TITLE_WEIGHT
+        for text in (description, body):
+            for token in tokenize(text, language):
+                terms[token] = terms.get(token, 0) + 1
+        with self._lock:
+            self.remove(doc_id)
+            for term, tf in terms.items():
+                self._delta.setdefault(term, {})[doc_id] = min(tf, 0xFFFF)
+            self._delta_terms[doc_id] = tuple(terms)
+            length = sum(terms.values())
+            language = (language or '')[:2]
+            self._docs[doc_id] = (length, language)
+            self._languages[language] += 1
+            self._total_length += length
+            self._changed()
+
+    def remove(self, doc_id):
+        with self._lock:
+            doc = self._docs.pop(doc_id, None)
+            if doc is None:
+                return False
+            self._total_length -= doc[0]
+            self._languages[doc[1]] -= 1
+            for term in self._delta_terms.pop(doc_id, ()):
+                postings = self._delta[term]
+                del postings[doc_id]
+                if not postings:
+                    del self._delta[term]
+            if doc_id in self._base_docs:
+                self._shadowed.add(doc_id)
+            self._changed()
+            return True
+
+    # -- búsqueda -----------------------------------------------------------
+
+    def _postings(self, term):
+        """
+        Pares (doc_id, tf) vivos de un término en ambos segmentos
+        """
+        shadowed = self._shadowed
+        base = self._base_terms.get(term)
+        if base is not None:
+            offset, count = base
+            ids = self._base_ids[offset:offset + count]
+            tfs = self._base_tfs[offset:offset + count]
+            for doc_id, tf in zip(ids, tfs):
+                if doc_id not in shadowed:
+                    yield doc_id, tf
+        delta = self._delta.get(term)
+        if delta is not None:
+            yield from delta.items()
+
+    def _document_frequency(self, term):
+        # Sin contar las filas del segmento base que un documento nuevo o un borrado dejaron obsoletas
+        df = len(self._delta.get(term, ()))
+        base = self._base_terms.get(term)
+        if base is not None:
+            offset, count = base
+            shadowed = self._shadowed
+            if shadowed:
+                df += sum(1 for doc_id in self._base_ids[offset:offset + count] if doc_id not in shadowed)
+            else:
+                df += count
+        return df
+
+    def _doc_norms(self):
+        # Parte del denominador de BM25 que solo depende de la longitud del documento
+        if self._norms is None:
+            k1, b = self.k1, self.b
+            # Si ningún documento tiene términos (solo signos o palabras vacías) la media es 0
+            avg_length = (self._total_length / len(self._docs)) or 1.0
+            self._norms = {doc_id: k1 * (1 - b + b * length / avg_length)
+                           for doc_id, (length, _) in self._docs.items()}
+        return self._norms
+
+    def _rank(self, terms, language, require_all):
+        docs = self._docs
+        total_docs = len(docs)
+        if not total_docs:
+            return []
+        norms = self._doc_norms()
+        # Si todo el índice está en ese idioma no hace falta filtrar
+        check_language = language is not None and self._languages.get(language, 0) != total_docs
+        k1_plus = self.k1 + 1
+        scores = None
+        # Los términos raros primero: acotan los candidatos cuanto antes
+        frequencies = {term: self._document_frequency(term) for term in terms}
+        for term in sorted(terms, key=frequencies.get):
+            df = frequencies[term]
+            idf = math.log(1 + (total_docs - df + 0.5) / (df + 0.5))
+            if scores is None:
+                scores = {}
+                for doc_id, tf in self._postings(term):
+                    if check_language and docs[doc_id][1] != language:
+                        continue
+                    scores[doc_id] = idf * tf * k1_plus / (tf + norms[doc_id])
+            elif require_all:
+                matched = {}
+                for doc_id, tf in self._postings(term):
+                    score = scores.get(doc_id)
+                    if score is not None:
+                        matched[doc_id] = score + idf * tf * k1_plus / (tf + norms[doc_id])
+                scores = matched
+            else:
+                for doc_id, tf in self._postings(term):
+                    if check_language and docs[doc_id][1] != language:
+                        continue
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * k1_plus / (tf + norms[doc_id])
+            if not scores and require_all:
+                return []
+        return sorted(scores.items(), key=lambda item: (-item[1], -item[0]))
+
+    def search(self, query, language=None, limit=None, require_all=True):
+        """
+        Documentos ordenados por BM25: lista de (doc_id, puntuación)
+
+        Con require_all solo cuentan los documentos que contienen todos los
+        términos de la consulta. language filtra por idioma del documento.
+        Las clasificaciones se memorizan hasta el siguiente cambio del índice.
+        """
+        self.maybe_reload()
+        terms = tuple(dict.fromkeys(tokenize(query, language)))
+        if not terms:
+            return []
+        key = (terms, language, require_all)
+        with self._lock:
+            ranked = self._results.get(key)
+            if ranked is None:
+                ranked = self._results[key] = self._rank(terms, language, require_all)
+                if len(self._results) > self.max_cached_queries:
+                    self._results.popitem(last=False)
+            else:
+                self._results.move_to_end(key)
+        return ranked[:limit] if limit else list(ranked)
+
+    # -- persistencia -------------------------------------------------------
+
+    def save(self, path=None):
+        """
+        Fusiona ambos segmentos en un archivo nuevo (escritura atómica) y lo reabre con mmap
+        """
+        path = path or self.path
+        with self._lock:
+            terms = {}
+            for term in set(self._base_terms) | set(self._delta):
+                postings = sorted(self._postings(term))
+                if postings:
+                    terms[term] = postings
+            tmp_path = f'{path}.tmp{os.getpid()}'
+            with open(tmp_path, 'wb') as handle:
+                handle.write(_HEADER.pack(MAGIC, VERSION, len(self._docs), len(terms), self._total_length))
+                for doc_id, (length, language) in self._docs.items():
+                    handle.write(_DOC.pack(doc_id, length, language.encode('ascii', 'replace')[:2]))
+                offset = 0
+                for term, postings in terms.items():
+                    encoded = term.encode('utf-8')
+                    handle.write(_TERM.pack(offset, len(postings), len(encoded)))
+                    handle.write(encoded)
+                    offset += len(postings)
+                # Alinear las apariciones a 4 bytes
+                handle.write(b'\0' * (-handle.tell() % 4))
+                for postings in terms.values():
+                    handle.write(array('I', (doc_id for doc_id, _ in postings)).tobytes())
+                for postings in terms.values():
+                    handle.write(array('H', (tf for _, tf in postings)).tobytes())
+            os.replace(tmp_path, path)
+            self.path = path
+            self.load(path)
+
+    def load(self, path):
+        with self._lock:
+            self.close()
+            self._reset()
+            handle = open(path, 'rb')
+            data = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, n_docs, n_terms, total_length = _HEADER.unpack_from(data, 0)
+            if magic != MAGIC or version != VERSION:
+                data.close()
+                handle.close()
+                raise ValueError(f'Formato de índice no reconocido: {path}')
+            pos = _HEADER.size
+            for _ in range(n_docs):
+                doc_id, length, language = _DOC.unpack_from(data, pos)
+                self._docs[doc_id] = (length, language.rstrip(b'\0').decode('ascii'))
+                pos += _DOC.size
+            self._base_docs = set(self._docs)
+            self._languages.update(language for _, language in self._docs.values())
+            postings = 0
+            for _ in range(n_terms):
+                offset, count, size = _TERM.unpack_from(data, pos)
+                pos += _TERM.size
+                self._base_terms[data[pos:pos + size].decode('utf-8')] = (offset, count)
+                pos += size
+                postings += count
+            pos += -pos % 4
+            self._base_view = memoryview(data)
+            self._base_ids = self._base_view[pos:pos + postings * 4].cast('I')
+            self._base_tfs = self._base_view[pos + postings * 4:pos + postings * 6].cast('H')
+            self._total_length = total_length
+            self._mmap, self._file = data, handle
+            self._mtime = os.stat(path).st_mtime_ns
+            self._checked_at = time.monotonic()
+            self.path = path
+            if self._docs:
+                self._doc_norms()
+
+    def maybe_reload(self):
+        """
+        Recarga el archivo si otro proceso lo ha reescrito (como mucho cada refresh_interval)
+        """
+        if not self.path or self.dirty or time.monotonic() - self._checked_at < self.refresh_interval:
+            return False
+        self._checked_at = time.monotonic()
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return False
+        if mtime == self._mtime:
+            return False
+        self.load(self.path)
+        return True
+
+    def close(self):
+        with self._lock:
+            if self._mmap is not None:
+                # Las vistas (y la vista completa de la que salen) deben soltarse antes de cerrar el mmap
+                self._base_ids.release()
+                self._base_tfs.release()
+                self._base_view.release()
+                self._base_view = self._base_ids = self._base_tfs = None
+                self._mmap.close()
+                self._file.close()
+                self._mmap = self._file = None
+
+    def stats(self):
+        return {
+            'path': self.path,
+            'documents': len(self._docs),
+            'terms': len(self._base_terms) + sum(1 for term in self._delta if term not in self._base_terms),
+            'pending': self.dirty,
+        }
@@ -7,6 +7,8 @@ import requests
 import os
 from pprint import pprint
 
+from apitube_client import APITubeClient
+
 # Configuración
 APITUBE_API_KEY = os.environ.get('APITUBE_API_KEY')
 APITUBE_BASE_URL = 'https://api.apitube.io/v1/news/everything'
@@ -20,10 +22,7 @@ def test_api_parameters():
         print("Configúrala con: set APITUBE_API_KEY=tu_api_key")
         return
     
-    headers = {
-        'X-API-Key': APITUBE_API_KEY,
-        'Content-Type': 'application/json'
-    }
+    client = APITubeClient(api_key=APITUBE_API_KEY)
     
     # Diferentes configuraciones de prueba
     test_cases = [
@@ -76,10 +75,9 @@ def test_api_parameters():
             print(f"URL: {APITUBE_BASE_URL}")
             print(f"Parámetros: {test_case['params']}")
             
-            response = requests.get(
+            response = client.get(
                 APITUBE_BASE_URL, 
                 params=test_case['params'], 
-                headers=headers, 
                 timeout=15
             )
             
@@ -114,6 +112,8 @@ def test_api_parameters():
             print(f"❌ Error inesperado: {e}")
             
         input("\nPresiona Enter para continuar...")
+    
+    print(f"\n📊 Estadísticas del pool: {client.pool_stats()}")
 
 if __name__ == "__main__":
     print("🔍 Probando parámetros de APITube.io")
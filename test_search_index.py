@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+"""
+Test del índice de búsqueda local con documentos sin términos
+"""
+
+from search_index import SearchIndex
+
+
+def test_search_with_only_empty_documents():
+    """Documentos solo con signos o palabras vacías: la búsqueda no falla"""
+    index = SearchIndex()
+    index.add(1, 'es', '¡!')
+    index.add(2, 'es', 'de la')
+    assert index.search('de') == []
+    assert index.search('de', language='es') == []
+
+
+def test_save_and_load_with_only_empty_documents(tmp_path):
+    """El índice guardado con documentos vacíos se reabre y se consulta"""
+    path = str(tmp_path / 'news.idx')
+    index = SearchIndex(path)
+    index.add(1, 'es', '¡!')
+    index.add(2, 'es', 'de la')
+    index.save()
+    reopened = SearchIndex(path)
+    assert len(reopened) == 2
+    assert reopened.search('de') == []
+    reopened.add(3, 'es', 'Elecciones en Chile')
+    assert [doc_id for doc_id, _ in reopened.search('elecciones', language='es')] == [3]